@@ -0,0 +1,316 @@
+"""
+================================== USAGE ===============================
+
+Benchmarks of the processing and plotting pipeline on synthetic signals.
+
+    python Benchmarks/benchmarkPipeline.py [--quick] [--durations SECS ...]
+        [--rates HZ ...] [--channels N ...] [--stages NAME ...]
+        [--save results.json] [--compare baseline.json] [--tolerance 0.2]
+
+Every stage is timed separately (best of --repeats runs) and reported as
+time, throughput in samples/second and peak traced memory. --save
+writes the results as a baseline, --compare reports the change against
+one and exits with 1 if any stage got slower than the tolerance allows.
+
+===============================================================================
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append('./')
+from Source.arrayTransport import ArrayTransport
+from Source.dspWorker import DspWorker
+from Source.gainAnalysis import computeGain, computeGainReduction
+from Source.wavReader import WavWriter, readWavSegment
+
+DEFAULT_DURATIONS = [1, 10, 60, 600, 1800]
+QUICK_DURATIONS = [1, 10]
+DEFAULT_RATES = [44100, 48000, 96000]
+DEFAULT_CHANNELS = [1, 2]
+
+PASSTHROUGH_SCRIPT = '''import numpy as np
+
+def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):
+    return input * 0.5
+'''
+
+# The script processAudio runs when there is no DSP worker (see initAssetScripts)
+LEGACY_RUNNER_SCRIPT = '''from bloscpack import unpack_ndarray_from_file, pack_ndarray_to_file
+import pickle
+import sys
+from userCode import userCode
+
+inS = unpack_ndarray_from_file(sys.argv[1])
+with open(sys.argv[5], "rb") as p:
+    pList = pickle.load(p)
+output = userCode(inS, int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]),
+                  pList[0], pList[1], pList[2], pList[3])
+pack_ndarray_to_file(output, sys.argv[1])
+'''
+
+
+class SkipStage(Exception):
+    """Raised by a stage that can not run in this environment"""
+
+
+def makeSignal(duration, sampleRate, numChannels, seed=0):
+    """Noise with a slow amplitude envelope, shaped like librosa's output"""
+    numSamples = int(duration * sampleRate)
+    rng = np.random.default_rng(seed)
+    signal = rng.standard_normal((numChannels, numSamples), dtype=np.float32) * 0.1
+    signal *= (1.1 + np.sin(np.linspace(0, 20 * np.pi, numSamples, dtype=np.float32)))
+    return signal[0] if numChannels == 1 else signal
+
+
+# ===================== Stages =====================
+# Each stage takes a case and returns the callable that gets timed
+
+
+def decodeLibrosaStage(case):
+    try:
+        from librosa.core import load
+    except ImportError:
+        raise SkipStage('librosa not available')
+    return lambda: load(case['wavPath'], sr=None, mono=case['numChannels'] == 1)
+
+
+def decodeWavReaderStage(case):
+    return lambda: readWavSegment(case['wavPath'], mono=case['numChannels'] == 1)
+
+
+def bloscpackStage(case):
+    try:
+        from bloscpack import pack_ndarray_to_file, unpack_ndarray_from_file
+    except Exception:
+        raise SkipStage('bloscpack not available')
+    path = os.path.join(case['tempDir'], 'bloscpack.blp')
+
+    def roundTrip():
+        pack_ndarray_to_file(case['signal'], path)
+        return unpack_ndarray_from_file(path)
+    return roundTrip
+
+
+def subprocessHandOffStage(case):
+    """Full legacy hand-off: pack, pickle, start an interpreter, unpack"""
+    try:
+        from bloscpack import pack_ndarray_to_file, unpack_ndarray_from_file
+    except Exception:
+        raise SkipStage('bloscpack not available')
+    runnerPath = os.path.join(case['tempDir'], 'applyUserCode.py')
+    with open(runnerPath, 'w') as f:
+        f.write(LEGACY_RUNNER_SCRIPT)
+    arrayPath = os.path.join(case['tempDir'], 'dspVisInputArray.txt')
+    parPath = os.path.join(case['tempDir'], 'DSPVisParList.dat')
+    signal = case['signal']
+
+    def handOff():
+        with open(parPath, 'wb') as f:
+            pickle.dump([0, 0, 0, 0], f)
+        pack_ndarray_to_file(signal, arrayPath)
+        subprocess.run([sys.executable, runnerPath, arrayPath,
+                        str(case['numChannels']), str(signal.shape[-1]),
+                        str(case['sampleRate']), parPath],
+                       check=True, capture_output=True, cwd=case['tempDir'])
+        return unpack_ndarray_from_file(arrayPath)
+    return handOff
+
+
+def workerHandOffStage(case):
+    """Current hand-off: warm DSP worker with memory-mapped arrays"""
+    worker = DspWorker(ArrayTransport(case['tempDir']))
+    worker.start()
+    case['cleanUp'].append(worker.stop)
+    signal = case['signal']
+    return lambda: worker.run(case['scriptPath'], signal, case['numChannels'],
+                              signal.shape[-1], case['sampleRate'], [0, 0, 0, 0])
+
+
+def computeGainStage(case):
+    output = case['signal'] * 0.5
+    return lambda: computeGain(case['signal'], output)
+
+
+def gainReductionStage(case):
+    output = case['signal'] * 0.5
+    return lambda: computeGainReduction(case['signal'], output)
+
+
+def plotGainStage(case):
+    """What plotGain does, drawn on an off-screen canvas"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from Source.waveformDecimation import DecimatedTrace
+    signal = case['signal']
+    output = signal * 0.5
+    timeStep = 1 / case['sampleRate']
+
+    def plot():
+        fig, ax = plt.subplots(2, 1, sharex=True)
+        DecimatedTrace(ax[0], computeGain(signal, output), timeStep)
+        DecimatedTrace(ax[1], signal, timeStep)
+        DecimatedTrace(ax[1], output, timeStep)
+        fig.canvas.draw()
+        plt.close(fig)
+    return plot
+
+
+STAGES = {'decodeLibrosa': decodeLibrosaStage,
+          'decodeWavReader': decodeWavReaderStage,
+          'bloscpackRoundTrip': bloscpackStage,
+          'subprocessHandOff': subprocessHandOffStage,
+          'workerHandOff': workerHandOffStage,
+          'computeGain': computeGainStage,
+          'gainReductionRms': gainReductionStage,
+          'plotGain': plotGainStage}
+
+
+# ===================== Running =====================
+
+def timeStage(run, repeats):
+    """Best wall time of repeats runs, then one traced run for peak memory.
+    An untimed first run keeps imports, JIT and worker start-up out of it"""
+    run()
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def runCase(duration, sampleRate, numChannels, stages, repeats):
+    """Run every stage on one synthetic signal. Returns a list of result dicts"""
+    results = []
+    with tempfile.TemporaryDirectory() as tempDir:
+        case = {'duration': duration, 'sampleRate': sampleRate,
+                'numChannels': numChannels, 'tempDir': tempDir, 'cleanUp': [],
+                'signal': makeSignal(duration, sampleRate, numChannels),
+                'wavPath': os.path.join(tempDir, 'signal.wav'),
+                'scriptPath': os.path.join(tempDir, 'userCode.py')}
+        with WavWriter(case['wavPath'], numChannels, sampleRate) as writer:
+            writer.write(case['signal'])
+        with open(case['scriptPath'], 'w') as f:
+            f.write(PASSTHROUGH_SCRIPT)
+
+        numSamples = case['signal'].shape[-1]
+        try:
+            for name in stages:
+                result = {'stage': name, 'duration': duration,
+                          'sampleRate': sampleRate, 'numChannels': numChannels}
+                try:
+                    seconds, peak = timeStage(STAGES[name](case), repeats)
+                    result.update(seconds=seconds, peakBytes=peak,
+                                  samplesPerSecond=numSamples * numChannels / seconds)
+                except SkipStage as e:
+                    result['skipped'] = str(e)
+                results.append(result)
+        finally:
+            for cleanUp in case['cleanUp']:
+                cleanUp()
+    return results
+
+
+def runBenchmarks(durations, rates, channels, stages, repeats=3, log=print):
+    results = []
+    for duration in durations:
+        for sampleRate in rates:
+            for numChannels in channels:
+                for result in runCase(duration, sampleRate, numChannels, stages, repeats):
+                    results.append(result)
+                    log(formatResult(result))
+    return results
+
+
+def resultKey(result):
+    return (result['stage'], result['duration'], result['sampleRate'],
+            result['numChannels'])
+
+
+def formatResult(result):
+    name = '{stage:<20}{duration:>8}s {sampleRate:>6}Hz {numChannels}ch'.format(**result)
+    if 'skipped' in result:
+        return f'{name}  skipped: {result["skipped"]}'
+    return (f'{name}  {result["seconds"] * 1000:>10.2f} ms'
+            f'  {result["samplesPerSecond"] / 1e6:>9.2f} MS/s'
+            f'  {result["peakBytes"] / 2 ** 20:>9.1f} MiB')
+
+
+def compareToBaseline(results, baseline, tolerance):
+    """Return a line per stage found in both runs and the keys that regressed"""
+    previous = {resultKey(r): r for r in baseline if 'seconds' in r}
+    lines = []
+    regressions = []
+    for result in results:
+        old = previous.get(resultKey(result))
+        if old is None or 'seconds' not in result:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(resultKey(result))
+        lines.append(f'{formatResult(result)}  x{ratio:.2f} of baseline{flag}')
+    return lines, regressions
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(description='Benchmark the processing and plotting pipeline')
+    parser.add_argument('--quick', action='store_true',
+                        help=f'Only durations {QUICK_DURATIONS} at 44100Hz')
+    parser.add_argument('--durations', nargs='+', type=float, help='Signal lengths (secs)')
+    parser.add_argument('--rates', nargs='+', type=int, help='Sample rates (Hz)')
+    parser.add_argument('--channels', nargs='+', type=int, help='Channel counts')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES),
+                        default=list(STAGES), help='Stages to run')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per stage, the best one counts')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare against a JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slow down against the baseline (0.2 = 20%%)')
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    durations = args.durations or (QUICK_DURATIONS if args.quick else DEFAULT_DURATIONS)
+    rates = args.rates or ([44100] if args.quick else DEFAULT_RATES)
+    channels = args.channels or DEFAULT_CHANNELS
+
+    results = runBenchmarks(durations, rates, channels, args.stages, args.repeats)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.platform(),
+                       'results': results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        lines, regressions = compareToBaseline(results, baseline, args.tolerance)
+        print('\n'.join(lines))
+        if regressions:
+            print(f'{len(regressions)} stage(s) slower than the baseline allows')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
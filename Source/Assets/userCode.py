@@ -7,6 +7,7 @@ def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):
     # if P1 is disabled then p1 = 0, so it would be nice to keep an eye on it
 
     # output is the ndarray that contains your processed data. Must be same shape as input
+    # (add an outBuffer=None argument to write straight into the preallocated output)
     output = input.copy()
 
     # Your code goes here....
@@ -16,3 +17,15 @@ def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):
 
 
     return output
+
+
+# For streaming mode define processBlock instead. It gets one block at a time
+# and state is a dict kept between the blocks of a run
+# def processBlock(block, numChannels, numSamples, sampleRate, state, p1, p2, p3, p4):
+#     return block
+
+# Instead of p1-p4 you can declare any number of typed parameters,
+# they are passed by name (see Source/parameterSchema.py)
+# PARAMETERS = [{'name': 'gain', 'type': 'float', 'range': (0, 2), 'default': 1},
+#               {'name': 'taps', 'type': 'array', 'default': [0.5, 0.5]}]
+# def userCode(input, numChannels, numSamples, sampleRate, gain, taps):
@@ -0,0 +1,58 @@
+"""
+Memory-mapped files used to hand arrays to the DSP worker.
+
+The parent writes the input signal once into a raw mapped file and the
+worker maps the same file, so userCode gets a view of the signal instead
+of an unpickled copy. The output goes through a second, preallocated
+mapped file that userCode can write into directly.
+"""
+import os
+
+import numpy as np
+
+
+def openArray(descriptor, mode='r+'):
+    """Map the array described by descriptor (see ArrayTransport)"""
+    return np.memmap(descriptor['path'], dtype=descriptor['dtype'],
+                     mode=mode, shape=descriptor['shape'])
+
+
+class ArrayTransport:
+    def __init__(self, directory, name='dspVis'):
+        self.inputPath = os.path.join(directory, name + 'InputArray.mmap')
+        self.outputPath = os.path.join(directory, name + 'OutputArray.mmap')
+
+    @staticmethod
+    def describe(path, shape, dtype):
+        return {'path': path, 'shape': tuple(shape), 'dtype': np.dtype(dtype).str}
+
+    def writeInput(self, inS):
+        """Copy inS into the input file and return its descriptor"""
+        inS = np.asarray(inS)
+        descriptor = self.describe(self.inputPath, inS.shape, inS.dtype)
+        mapped = openArray(descriptor, 'w+')
+        mapped[...] = inS
+        mapped.flush()
+        del mapped
+        return descriptor
+
+    def allocateOutput(self, shape, dtype):
+        """Create a zeroed output file and return its descriptor"""
+        descriptor = self.describe(self.outputPath, shape, dtype)
+        mapped = openArray(descriptor, 'w+')
+        mapped.flush()
+        del mapped
+        return descriptor
+
+    def readOutput(self, descriptor):
+        """Return an in-memory copy of the output, so the next run
+        can reuse the file without touching the returned array"""
+        mapped = openArray(descriptor, 'r')
+        output = np.array(mapped)
+        del mapped
+        return output
+
+    def cleanUp(self):
+        for path in (self.inputPath, self.outputPath):
+            if os.path.isfile(path):
+                os.remove(path)
@@ -0,0 +1,57 @@
+"""
+LRU cache of decoded audio segments.
+
+Re-running the user's code on the same part of a file should not decode
+it again. Segments are keyed by everything that changes the decoded
+result (path, file mtime, offset, duration, mono and sample rate) and
+the least recently used ones are dropped once the memory budget is hit.
+"""
+from collections import OrderedDict
+import os
+
+import numpy as np
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class DecodedAudioCache:
+    def __init__(self, loadSegment, maxBytes=DEFAULT_CACHE_BYTES):
+        """loadSegment(path, offset, duration, mono, sampleRate) must
+        return the decoded (signal, sampleRate)"""
+        self.loadSegment = loadSegment
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.totalBytes = 0
+
+    def load(self, path, offset, duration, mono, sampleRate=None):
+        """Return (signal, sampleRate) of the segment, decoding it only on a miss.
+        Cached signals are read-only, since every caller shares them"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Let the loader report missing files the way it always did
+            return self.loadSegment(path, offset, duration, mono, sampleRate)
+
+        key = (os.path.abspath(path), stat.st_mtime_ns, offset, duration,
+               mono, sampleRate)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        signal, sr = self.loadSegment(path, offset, duration, mono, sampleRate)
+        if isinstance(signal, np.ndarray) and signal.nbytes <= self.maxBytes:
+            signal.flags.writeable = False
+            self.entries[key] = (signal, sr)
+            self.totalBytes += signal.nbytes
+            self.evict()
+        return signal, sr
+
+    def evict(self):
+        """Drop the least recently used segments until the cache fits its budget"""
+        while self.totalBytes > self.maxBytes and self.entries:
+            _, (signal, _) = self.entries.popitem(last=False)
+            self.totalBytes -= signal.nbytes
+
+    def clear(self):
+        self.entries.clear()
+        self.totalBytes = 0
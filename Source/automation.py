@@ -0,0 +1,152 @@
+"""
+Sample-accurate automation of declared parameters.
+
+A float parameter declared with 'automation': 'sample' or 'block' (see
+parameterSchema) takes an Envelope instead of a single value: breakpoints
+(time in secs from the start of the processed range, value), each
+followed by a linear or exponential segment to the next one. The value
+is held before the first and after the last breakpoint.
+
+Envelopes are sent to the process running the user code as breakpoints
+and only rendered there, with numpy over the whole range at once:
+
+    'sample'  userCode gets a value per sample (numSamples of them) and
+              processBlock the values of the samples of its block
+    'block'   the value is only updated every blockSize samples, the way
+              a plugin host updates parameters once per processBlock call.
+              userCode gets one value per block of blockSize samples and
+              processBlock a single value per call, taken at its first
+              sample
+
+Comparing both modes on the same envelope shows how the user code
+smooths parameter changes, or how much zipper noise it lets through.
+"""
+import numpy as np
+
+AUTOMATION_MODES = ('sample', 'block')
+CURVES = ('linear', 'exp')
+DEFAULT_AUTOMATION_BLOCK_SIZE = 64
+
+
+class Envelope:
+    def __init__(self, points, mode='sample', blockSize=DEFAULT_AUTOMATION_BLOCK_SIZE):
+        """points = (time, value) or (time, value, curve) breakpoints,
+        curve being the shape of the segment to the next one"""
+        if mode not in AUTOMATION_MODES:
+            raise ValueError(f'Unknown automation mode {mode!r}, expected sample or block')
+        if int(blockSize) <= 0:
+            raise ValueError('Automation block size must be positive')
+        points = [tuple(p) for p in points]
+        if not points:
+            raise ValueError('An envelope needs at least one breakpoint')
+        for point in points:
+            if len(point) not in (2, 3) or (len(point) == 3 and point[2] not in CURVES):
+                raise ValueError(f'Invalid breakpoint {point!r}, expected (time, value) '
+                                 f'or (time, value, "linear" or "exp")')
+        # Stable, so breakpoints at the same time keep their order (a step)
+        points.sort(key=lambda p: p[0])
+        self.mode = mode
+        self.blockSize = int(blockSize)
+        self.times = np.array([p[0] for p in points], dtype=np.float64)
+        self.values = np.array([p[1] for p in points], dtype=np.float64)
+        self.curves = [p[2] if len(p) == 3 else 'linear' for p in points]
+        if self.times[0] < 0:
+            raise ValueError('Breakpoint times can not be negative')
+
+        # Ratio of the end to the start value of every exponential segment
+        self.isExp = np.array([c == 'exp' for c in self.curves[:-1]], dtype=bool)
+        starts, ends = self.values[:-1], self.values[1:]
+        if np.any(self.isExp & ((starts * ends) <= 0)):
+            raise ValueError('Exponential segments need non-zero values of the same sign')
+        self.ratios = np.ones(len(starts))
+        self.ratios[self.isExp] = ends[self.isExp] / starts[self.isExp]
+
+    @property
+    def points(self):
+        return [(float(t), float(v), c) for t, v, c in zip(self.times, self.values, self.curves)]
+
+    def __eq__(self, other):
+        return (isinstance(other, Envelope) and self.points == other.points
+                and self.mode == other.mode and self.blockSize == other.blockSize)
+
+    def __repr__(self):
+        return f'Envelope({self.points!r}, mode={self.mode!r}, blockSize={self.blockSize})'
+
+    def valuesAt(self, seconds):
+        """Values at the times (secs) in seconds"""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if len(self.times) == 1:
+            return np.full(seconds.shape, self.values[0])
+        # Segment of every time, the first one before it starts
+        segment = np.clip(np.searchsorted(self.times, seconds, side='right') - 1,
+                          0, len(self.times) - 2)
+        start = self.times[segment]
+        length = self.times[segment + 1] - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(length > 0, (seconds - start) / length, 1.0)
+        fraction = np.clip(fraction, 0, 1)
+        first = self.values[segment]
+        linear = first + (self.values[segment + 1] - first) * fraction
+        if not self.isExp.any():
+            return linear
+        return np.where(self.isExp[segment], first * self.ratios[segment] ** fraction, linear)
+
+    def render(self, numSamples, sampleRate, offset=0):
+        """Values for samples offset to offset + numSamples of the range:
+        one per sample, or one per block of blockSize samples"""
+        step = 1 if self.mode == 'sample' else self.blockSize
+        return self.valuesAt((offset + np.arange(0, numSamples, step)) / sampleRate)
+
+    def perSample(self, numSamples, sampleRate):
+        """The value of every sample, block values held over their block"""
+        values = self.render(numSamples, sampleRate)
+        if self.mode == 'sample':
+            return values
+        return np.repeat(values, self.blockSize)[:numSamples]
+
+    def blockValue(self, numSamples, sampleRate, offset):
+        """Value for a processBlock call on samples offset to offset + numSamples"""
+        if self.mode == 'sample':
+            return self.render(numSamples, sampleRate, offset)
+        return float(self.valuesAt(offset / sampleRate))
+
+
+def renderAutomation(parameters, numSamples, sampleRate, offset=0, perBlock=False):
+    """parameters with every Envelope replaced by its values for samples
+    offset to offset + numSamples of the range. perBlock gives the values
+    of a processBlock call. The list p1-p4 is returned as it is"""
+    if not isinstance(parameters, dict):
+        return parameters
+    if not any(isinstance(value, Envelope) for value in parameters.values()):
+        return parameters
+    rendered = {}
+    for name, value in parameters.items():
+        if isinstance(value, Envelope):
+            value = (value.blockValue(numSamples, sampleRate, offset) if perBlock
+                     else value.render(numSamples, sampleRate, offset))
+        rendered[name] = value
+    return rendered
+
+
+def parseEnvelopeText(text, mode='sample', blockSize=DEFAULT_AUTOMATION_BLOCK_SIZE):
+    """Envelope of comma separated time:value breakpoints, each optionally
+    followed by exp for an exponential segment to the next one,
+    e.g. 0:0.1 exp, 1.5:1, 3:0.5. A single number is a constant"""
+    points = []
+    for item in text.split(','):
+        item = item.strip()
+        if item == "":
+            continue
+        words = item.split()
+        if ':' not in words[0]:
+            if len(words) != 1 or points or text.count(',') > 0:
+                raise ValueError(f'Invalid breakpoint {item!r}, expected time:value')
+            return Envelope([(0, float(words[0]))], mode, blockSize)
+        time, value = words[0].split(':')
+        curve = words[1] if len(words) > 1 else 'linear'
+        if curve == 'lin':
+            curve = 'linear'
+        if len(words) > 2 or curve not in CURVES:
+            raise ValueError(f'Invalid breakpoint {item!r}, the curve is lin or exp')
+        points.append((float(time), float(value), curve))
+    return Envelope(points, mode, blockSize)
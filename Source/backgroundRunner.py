@@ -0,0 +1,182 @@
+"""
+Background runs of the processing pipeline, so the Tk mainloop never
+waits for decoding, the user code or the analysis.
+
+BackgroundRunner runs one task at a time on a worker thread. The heavy
+parts are numpy and the DSP worker process, so a thread is enough, and
+one thread means runs never see each other's half-written state.
+Every task gets a Run to report its progress on. Run.checkpoint raises
+RunCancelledException once the run is cancelled, and work that blocks
+for long (a job in the DSP worker) can be aborted with Run.cancelWith.
+
+Submitting a task under the name of a pending or running one supersedes
+it: the old run is cancelled and its result dropped. Progress, results
+and errors are queued by the worker thread and handed to the callbacks
+on the Tk thread by poll(), which start() schedules with after().
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import queue
+import threading
+from tkinter import TclError
+import traceback
+
+from Source.exceptions import RunCancelledException
+
+POLL_INTERVAL_MS = 50
+
+
+class Run:
+    def __init__(self, name, events=None, onDone=None, onError=None, onProgress=None,
+                 onCancelled=None):
+        """A run of name. Progress is put on events (a queue) if given"""
+        self.name = name
+        self.events = events
+        self.onDone = onDone
+        self.onError = onError
+        self.onProgress = onProgress
+        self.onCancelled = onCancelled
+        self.cancelEvent = threading.Event()
+        self.lock = threading.Lock()
+        self.abort = None
+
+    @property
+    def cancelled(self):
+        return self.cancelEvent.is_set()
+
+    def cancel(self):
+        """Cancel the run, aborting the blocking call it is in if any"""
+        with self.lock:
+            self.cancelEvent.set()
+            abort = self.abort
+        if abort is not None:
+            abort()
+
+    def checkpoint(self, fraction=None, message=None):
+        """Raise RunCancelledException if the run was cancelled, otherwise
+        report fraction (0 to 1) and message as its progress"""
+        if self.cancelled:
+            raise RunCancelledException('Run cancelled', f'{self.name} was cancelled or superseded')
+        if self.events is not None and (fraction is not None or message is not None):
+            self.events.put((self, 'progress', (fraction, message)))
+
+    @contextmanager
+    def cancelWith(self, abort):
+        """Call abort() if the run is cancelled while in this block.
+        Whatever abort makes the block raise becomes a RunCancelledException"""
+        self.checkpoint()
+        with self.lock:
+            self.abort = abort
+        try:
+            yield
+        except Exception as e:
+            if self.cancelled:
+                raise RunCancelledException('Run cancelled', f'{self.name}: {e}') from e
+            raise
+        finally:
+            with self.lock:
+                self.abort = None
+        self.checkpoint()
+
+
+class BackgroundRunner:
+    def __init__(self):
+        # The thread is only started by the first submit
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        # Newest run of every name
+        self.latest = {}
+        self.window = None
+        self.interval = POLL_INTERVAL_MS
+        self.afterId = None
+
+    def submit(self, name, task, *args, onDone=None, onError=None, onProgress=None,
+               onCancelled=None):
+        """Run task(run, *args) in the background, superseding the previous
+        run of name. onDone(result), onError(error, tracebackText),
+        onProgress(run, fraction, message) and onCancelled(run) are called
+        from poll(). Returns the Run"""
+        previous = self.latest.get(name)
+        if previous is not None:
+            previous.cancel()
+        run = Run(name, self.events, onDone, onError, onProgress, onCancelled)
+        self.latest[name] = run
+        self.executor.submit(self.execute, run, task, args)
+        return run
+
+    def execute(self, run, task, args):
+        try:
+            run.checkpoint()
+            result = task(run, *args)
+        except RunCancelledException:
+            self.events.put((run, 'cancelled', None))
+        except Exception as e:
+            if run.cancelled:
+                self.events.put((run, 'cancelled', None))
+            else:
+                self.events.put((run, 'error', (e, traceback.format_exc())))
+        else:
+            self.events.put((run, 'done', result))
+
+    def cancel(self, name=None):
+        """Cancel the newest run of name, or of every name if None"""
+        names = list(self.latest) if name is None else [name]
+        for n in names:
+            run = self.latest.get(n)
+            if run is not None:
+                run.cancel()
+
+    def isBusy(self, name=None):
+        """True if a run of name (any run if None) has not been polled as finished"""
+        if name is None:
+            return bool(self.latest)
+        return name in self.latest
+
+    def poll(self):
+        """Hand the queued events to the callbacks of their runs.
+        Call this from the Tk thread"""
+        while True:
+            try:
+                run, kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'progress':
+                if not run.cancelled and run.onProgress is not None:
+                    run.onProgress(run, *payload)
+                continue
+
+            if self.latest.get(run.name) is run:
+                del self.latest[run.name]
+            if run.cancelled or kind == 'cancelled':
+                # Superseded runs are dropped quietly
+                if run.onCancelled is not None and run.name not in self.latest:
+                    run.onCancelled(run)
+            elif kind == 'done':
+                if run.onDone is not None:
+                    run.onDone(payload)
+            elif run.onError is not None:
+                run.onError(*payload)
+            else:
+                print(payload[1])
+
+    def start(self, window, interval=POLL_INTERVAL_MS):
+        """Poll every interval ms on the mainloop of window"""
+        self.window = window
+        self.interval = interval
+        self.pollLoop()
+
+    def pollLoop(self):
+        self.poll()
+        self.afterId = self.window.after(self.interval, self.pollLoop)
+
+    def shutdown(self):
+        """Cancel every run and wait for the worker thread"""
+        self.cancel()
+        self.executor.shutdown(wait=True)
+        if self.afterId is not None:
+            try:
+                self.window.after_cancel(self.afterId)
+            except TclError:
+                # The window may already be destroyed
+                pass
+            self.afterId = None
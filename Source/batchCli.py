@@ -0,0 +1,278 @@
+"""
+================================== USAGE ===============================
+
+Headless batch processing, for CI or render servers:
+
+    python Source/batchCli.py INPUT [INPUT ...] --script path/to/userCode.py
+        [--start SECS] [--end SECS] [--params P1 P2 P3 P4] [--set NAME=VALUE]
+        [--mono] [--out DIR] [--jobs N] [--reference DIR] [--threshold DB]
+
+INPUT is a .wav file, a directory (every .wav in it) or a glob pattern.
+Every file is loaded, run through userCode and analysed the same way the
+GUI does it. For each file DIR gets <name>_processed.wav and
+<name>_report.json (metrics and the gain reduction curve), plus a
+report.csv summary of the whole batch.
+
+Scripts that declare their PARAMETERS (see parameterSchema) take
+--set NAME=VALUE once per parameter instead of --params, e.g.
+--set gain=0.5 --set "taps=0.25, 0.5, 0.25". The rest keep their default.
+Automated parameters take breakpoints, --set "cutoff=0:200 exp, 2:8000".
+
+With --reference, every <name>_processed.wav is null tested against the
+file of the same name in the reference directory (an earlier --out), and
+files whose peak error is above the threshold (dBFS) fail the batch.
+
+===============================================================================
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+sys.path.append('./')
+from Source.dspWorker import loadUserFunction
+from Source.exceptions import UserInputExeption
+from Source.gainAnalysis import computeGainReduction
+from Source.nullTest import DEFAULT_THRESHOLD_DB, compareFiles, passesNullTest
+from Source.parameterSchema import parseText, plainParameters, readSchemaFile, resolveValues
+from Source.parameterSweep import sweepMetrics
+from Source.renderPipeline import decodeSegment, runUserCode
+from Source.wavReader import WavWriter
+
+REPORT_COLUMNS = ['file', 'status', 'seconds', 'peakDb', 'rmsDb',
+                  'meanGainDb', 'maxReductionDb', 'nullTest', 'peakErrorDb',
+                  'snrDb', 'latencySamples', 'error']
+
+# Imported user scripts of this process, see loadUserFunction
+scriptCache = {}
+
+
+def findInputFiles(inputs):
+    """Expand files, directories and glob patterns to a sorted list of .wav files"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, '*.wav')))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            files.extend(glob.glob(item))
+    return sorted(set(f for f in files if f.lower().endswith('.wav')))
+
+
+def parseParameter(text):
+    """Parameters are ints unless they need to be floats, like in the GUI"""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def declaredParameters(args):
+    """Parameters for the script of args: a dict of its declared
+    parameters, or p1-p4 if it declares none"""
+    try:
+        schema = readSchemaFile(args.script)
+        if schema is None:
+            if args.set:
+                raise ValueError('The script declares no PARAMETERS, use --params')
+            return list(args.params) + [0] * (4 - len(args.params))
+        if args.params:
+            raise ValueError('The script declares its PARAMETERS, use --set NAME=VALUE')
+        specs = {spec['name']: spec for spec in schema}
+        values = {}
+        for assignment in args.set:
+            name, _, text = assignment.partition('=')
+            name = name.strip()
+            if name not in specs:
+                raise ValueError(f'Unknown parameter {name!r}')
+            values[name] = parseText(specs[name], text)
+        return resolveValues(schema, values)
+    except (OSError, ValueError) as e:
+        raise UserInputExeption('Invalid parameters', str(e))
+
+
+def jsonValue(value):
+    """JSON has no NaN or inf, write them as null"""
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def processFile(path, options):
+    """Load, process and analyse one file. Returns its row of the summary report"""
+    started = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    row = {'file': path}
+    try:
+        duration = None if options['end'] is None else options['end'] - options['start']
+        # Decoded and run the same way as in the GUI
+        inS, sampleRate = decodeSegment(path, options['start'], duration, options['mono'])
+        numChannels = 1 if inS.ndim == 1 else inS.shape[0]
+
+        userCode = loadUserFunction(options['script'], scriptCache)
+        # A copy, the metrics need the input as it was
+        output = runUserCode(userCode, np.array(inS), sampleRate, options['params'])
+
+        outPath = os.path.join(options['out'], name + '_processed.wav')
+        with WavWriter(outPath, numChannels, sampleRate) as writer:
+            writer.write(output)
+
+        metrics = sweepMetrics(inS, output)
+        centers, gainDb = computeGainReduction(inS, output, options['window'],
+                                               options['hop'])
+        report = {'file': path,
+                  'sampleRate': sampleRate,
+                  'numChannels': numChannels,
+                  'numSamples': inS.shape[-1],
+                  'parameters': plainParameters(options['params']),
+                  'metrics': {k: jsonValue(v) for k, v in metrics.items()},
+                  'gainReduction': {
+                      'times': (centers / sampleRate).tolist(),
+                      'gainDb': [[jsonValue(v) for v in channel]
+                                 for channel in np.atleast_2d(gainDb).tolist()]}}
+        row['status'] = 'ok'
+        if options.get('reference'):
+            row.update(nullTestFile(outPath, options))
+            report['nullTest'] = {k: jsonValue(v) for k, v in row.items()
+                                  if k in ('nullTest', 'peakErrorDb', 'snrDb',
+                                           'latencySamples', 'error')}
+        with open(os.path.join(options['out'], name + '_report.json'), 'w') as f:
+            json.dump(report, f, indent=1)
+
+        row.update(metrics)
+    except Exception:
+        row['status'] = 'failed'
+        row['error'] = traceback.format_exc(limit=3)
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def nullTestFile(outPath, options):
+    """Null test of a processed file against the reference file of the same
+    name. Returns the fields for its row of the summary report"""
+    referencePath = os.path.join(options['reference'], os.path.basename(outPath))
+    if not os.path.isfile(referencePath):
+        return {'nullTest': 'missing'}
+    result = compareFiles(referencePath, outPath)
+    fields = {k: result[k] for k in ('peakErrorDb', 'snrDb', 'latencySamples')}
+    if passesNullTest(result, options['threshold']):
+        fields['nullTest'] = 'passed'
+    else:
+        fields['nullTest'] = 'failed'
+        fields['status'] = 'regression'
+        fields['error'] = (f'Peak error {result["peakErrorDb"]:.1f} dBFS is above '
+                           f'{options["threshold"]} dBFS (frame {result["maxOffsetFrame"]})')
+    return fields
+
+
+def runBatch(files, options, jobs=None):
+    """Process files on a pool of at most jobs processes. Returns the report rows"""
+    rows = {}
+    try:
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(processFile, path, options): path for path in files}
+            for future, path in futures.items():
+                rows[path] = future.result()
+    except BrokenProcessPool as e:
+        # A crash takes the whole pool down, report what did not finish
+        for path in files:
+            if path not in rows:
+                rows[path] = {'file': path, 'status': 'failed',
+                              'error': f'Process pool exited: {e}'}
+    return [rows[path] for path in files]
+
+
+def writeSummary(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(
+        description='Process .wav files with a userCode script, without the GUI')
+    parser.add_argument('inputs', nargs='+',
+                        help='.wav files, directories or glob patterns')
+    parser.add_argument('--script', required=True,
+                        help='Python file defining userCode')
+    parser.add_argument('--start', type=float, default=0, help='Start time (secs)')
+    parser.add_argument('--end', type=float, default=None,
+                        help='End time (secs), defaults to the end of each file')
+    parser.add_argument('--params', nargs='*', type=parseParameter, default=[],
+                        help='p1 p2 p3 p4, missing ones are 0')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Value of a parameter the script declares, once per parameter')
+    parser.add_argument('--mono', action='store_true', help='Convert to mono')
+    parser.add_argument('--out', default='batchOutput', help='Output directory')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Number of files processed at the same time')
+    parser.add_argument('--window', type=int, default=1024,
+                        help='Window of the gain reduction analysis (samples)')
+    parser.add_argument('--hop', type=int, default=512,
+                        help='Hop of the gain reduction analysis (samples)')
+    parser.add_argument('--reference', default=None,
+                        help='Directory of reference renders to null test against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_DB,
+                        help='Highest peak error (dBFS) of the null test that still passes')
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    try:
+        if args.start < 0 or (args.end is not None and args.end <= args.start):
+            raise UserInputExeption("Invalid time range",
+                                    f'Start = {args.start}, End = {args.end}')
+        if len(args.params) > 4:
+            raise UserInputExeption('Too many parameters', f'Got {args.params}')
+        if not os.path.isfile(args.script):
+            raise UserInputExeption('Script path invalid or does not exist',
+                                    f'Chosen path: {args.script}')
+        params = declaredParameters(args)
+        files = findInputFiles(args.inputs)
+        if not files:
+            raise UserInputExeption('No .wav files found', f'Inputs: {args.inputs}')
+        if args.reference is not None and not os.path.isdir(args.reference):
+            raise UserInputExeption('Reference directory does not exist',
+                                    f'Chosen path: {args.reference}')
+    except UserInputExeption as e:
+        print(e)
+        return 2
+
+    os.makedirs(args.out, exist_ok=True)
+    options = {'script': os.path.abspath(args.script),
+               'start': args.start,
+               'end': args.end,
+               'params': params,
+               'mono': args.mono,
+               'out': args.out,
+               'window': args.window,
+               'hop': args.hop,
+               'reference': args.reference,
+               'threshold': args.threshold}
+    rows = runBatch(files, options, args.jobs)
+    writeSummary(rows, os.path.join(args.out, 'report.csv'))
+
+    failed = [row for row in rows if row['status'] != 'ok']
+    print(f'Processed {len(rows) - len(failed)}/{len(rows)} files, '
+          f'report in {os.path.join(args.out, "report.csv")}')
+    for row in failed:
+        print(f'{row["file"]} failed:\n{row["error"]}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
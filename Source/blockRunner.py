@@ -0,0 +1,41 @@
+"""
+Block by block processing, the way a plugin host calls processBlock.
+
+Instead of getting the whole selected range at once, the user's
+processBlock function is called with consecutive blocks of at most
+blockSize samples and a state dict that is kept between the calls of a
+run. Blocks are read and written through callables, so a long file can
+be streamed from and to disk with constant memory.
+"""
+import numpy as np
+
+from Source.automation import renderAutomation
+from Source.parameterSchema import splitParameters
+
+DEFAULT_BLOCK_SIZE = 4096
+
+
+def runBlocks(processBlock, readBlock, writeBlock, start, stop, blockSize,
+              numChannels, sampleRate, parameters):
+    """Feed samples start to stop to processBlock in blocks of blockSize.
+    readBlock(blockStart, blockStop) returns the input of a block and
+    writeBlock(output) receives every processed block in order.
+    Automated parameters get the values of the samples of each block.
+    Returns the state dict processBlock used"""
+    if blockSize <= 0:
+        raise ValueError('Block size must be positive')
+    parameters, kwargs = splitParameters(parameters)
+    state = {}
+    for blockStart in range(start, stop, blockSize):
+        blockStop = min(blockStart + blockSize, stop)
+        block = readBlock(blockStart, blockStop)
+        output = processBlock(block, numChannels, blockStop - blockStart,
+                              sampleRate, state, *parameters,
+                              **renderAutomation(kwargs, blockStop - blockStart, sampleRate,
+                                                 blockStart - start, perBlock=True))
+        output = np.asarray(output)
+        if output.shape != np.shape(block):
+            raise ValueError(f'processBlock returned shape {output.shape}, '
+                             f'expected {np.shape(block)}')
+        writeBlock(output)
+    return state
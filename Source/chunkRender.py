@@ -0,0 +1,93 @@
+"""
+Chunk-parallel rendering of one long range.
+
+For stateless or short-memory effects the selected range is split in
+chunks that are processed on a process pool. Every chunk also gets the
+overlap samples before it as pre-roll, so filters and envelopes have
+settled by the time its own part starts. The last crossfade samples of
+that pre-roll are blended with the end of the previous chunk to hide
+any remaining discontinuity. The pool is run by processPool.
+"""
+import os
+import traceback
+
+import numpy as np
+
+from Source.arrayTransport import openArray
+from Source.dspWorker import loadUserFunction
+from Source.exceptions import ScriptReturnCodeException
+from Source.processPool import runOnPool
+from Source.renderPipeline import runUserCode
+
+# Per process state of the pool, set by initChunkWorker
+chunkState = {}
+
+
+def chunkBounds(numSamples, chunkSize, overlap):
+    """Return (readStart, start, stop) of every chunk: the chunk owns samples
+    start to stop and is processed from readStart, up to overlap samples earlier"""
+    if chunkSize <= 0 or overlap < 0:
+        raise ValueError('Chunk size must be positive and overlap not negative')
+    return [(max(0, start - overlap), start, min(start + chunkSize, numSamples))
+            for start in range(0, numSamples, chunkSize)]
+
+
+def initChunkWorker(inputDesc, outputDesc, scriptPath, sampleRate, parameters):
+    chunkState['userCode'] = loadUserFunction(scriptPath, {})
+    chunkState['input'] = openArray(inputDesc, 'r')
+    chunkState['output'] = openArray(outputDesc, 'r+')
+    chunkState['sampleRate'] = sampleRate
+    chunkState['parameters'] = parameters
+
+
+def renderChunkTask(readStart, start, stop, crossfade):
+    """Process one chunk and write the part it owns to the output. Returns
+    the processed crossfade samples before start, for the parent to blend"""
+    try:
+        inS = chunkState['input']
+        # A private copy, the user code may edit its input in place
+        chunk = np.array(inS[..., readStart:stop])
+        # Automation of the chunk, pre-roll included
+        output = runUserCode(chunkState['userCode'], chunk, chunkState['sampleRate'],
+                             chunkState['parameters'], readStart)
+        owned = start - readStart
+        chunkState['output'][..., start:stop] = output[..., owned:]
+        chunkState['output'].flush()
+        return 'ok', output[..., owned - min(crossfade, owned):owned]
+    except Exception:
+        return 'error', traceback.format_exc()
+
+
+def renderChunked(scriptPath, inS, sampleRate, parameters, directory,
+                  chunkSize=None, overlap=4096, crossfade=1024, maxWorkers=None, run=None):
+    """Render userCode of scriptPath over inS in parallel chunks and return
+    the stitched output. crossfade can not be longer than overlap.
+    run = Run reporting the progress, that can cancel it (see runOnPool)"""
+    inS = np.asarray(inS)
+    numSamples = inS.shape[-1]
+    if maxWorkers is None:
+        maxWorkers = os.cpu_count() or 1
+    if chunkSize is None:
+        chunkSize = -(-numSamples // maxWorkers)
+    crossfade = min(crossfade, overlap)
+    bounds = chunkBounds(numSamples, chunkSize, overlap)
+
+    results, output = runOnPool(inS, inS.shape, directory, 'dspVisChunk', initChunkWorker,
+                                (scriptPath, sampleRate, parameters), renderChunkTask,
+                                [(readStart, start, stop, crossfade)
+                                 for readStart, start, stop in bounds],
+                                'Chunk', maxWorkers, run)
+    for status, payload in results:
+        if status != 'ok':
+            raise ScriptReturnCodeException('Running the audio processing script failed',
+                                            payload)
+
+    # Fade from the end of every chunk into the pre-roll of the next one
+    for (_, start, _), (_, fadeIn) in zip(bounds, results):
+        length = fadeIn.shape[-1]
+        if length == 0:
+            continue
+        weight = (np.arange(1, length + 1) / (length + 1)).astype(output.dtype)
+        region = output[..., start - length:start]
+        output[..., start - length:start] = region * (1 - weight) + fadeIn * weight
+    return output
@@ -0,0 +1,343 @@
+"""
+Long-lived worker process that runs the user's DSP code.
+
+The worker is started once and keeps its interpreter (and numpy) warm
+between runs. The user script is only re-imported when its contents
+change. Since the code runs in a separate process, a crash in the user's
+code does not take the GUI down with it.
+
+When the worker is given an ArrayTransport the signal is shared through
+memory-mapped files instead of being pickled over the pipe. A userCode
+function that takes an outBuffer argument then gets the preallocated
+output array and can write its result straight into it.
+
+Stream jobs call the script's processBlock function instead, reading the
+input .wav file and writing the output .wav file one block at a time.
+
+Real-time jobs time the script block by block against the real-time
+budget, see realtimeCheck.
+
+Parameters are the list p1-p4, passed positionally, or a dict of the
+parameters the script declares (see parameterSchema), passed by name.
+Either way they go to the worker inside the job, automation envelopes
+as breakpoints that are only rendered in the worker.
+
+Every answer of the worker carries the stages it timed (see StageTimer),
+which run() and runStream() add to the caller's timer. Jobs can also ask
+for the user code to be profiled, the report is kept in lastProfile.
+
+A job can't be interrupted inside the user code, cancel() kills the
+worker instead and the next job starts a new one.
+"""
+import hashlib
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import sys
+import traceback
+
+import numpy as np
+
+from Source.arrayTransport import openArray
+from Source.blockRunner import runBlocks
+from Source.exceptions import ScriptReturnCodeException
+from Source.realtimeCheck import asBlockFunction, measureRealTime
+from Source.renderPipeline import checkOutput, userCodeArguments
+from Source.stageTimer import StageTimer
+from Source.userProfiler import profileCall
+from Source.wavReader import WavReader, WavWriter
+
+
+def loadUserFunction(path, cache, name='userCode'):
+    """Return the function called name of the script at path.
+    The script is re-imported only if its hash changed. It is hashed on
+    every call: two saves within the mtime resolution of the file system
+    (1 sec on some) would look the same by mtime"""
+    with open(path, 'rb') as userPy:
+        source = userPy.read()
+    digest = hashlib.sha1(source).hexdigest()
+    cached = cache.get(path)
+    if cached is not None and cached[0] == digest:
+        return getattr(cached[1], name)
+
+    # Let the user script import modules that live next to it
+    scriptDir = os.path.dirname(os.path.abspath(path))
+    if scriptDir not in sys.path:
+        sys.path.append(scriptDir)
+
+    spec = importlib.util.spec_from_file_location('userCode_' + digest, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    cache[path] = (digest, module)
+    return getattr(module, name)
+
+
+def callUserCode(userCode, args, kwargs, job):
+    """Call userCode, under the profiler if job asks for it.
+    Returns the output and the profile report (None if not profiled)"""
+    if job.get('profile'):
+        return profileCall(userCode, args, kwargs, job['scriptPath'])
+    return userCode(*args, **kwargs), None
+
+
+def runMappedJob(userCode, job, timer=None):
+    """Run userCode on the mapped input and leave its result in the mapped output.
+    Returns the profile report, if the job asked for one"""
+    if timer is None:
+        timer = StageTimer()
+    # Copy-on-write, so in-place edits of input never reach the parent
+    inS = openArray(job['inputDesc'], 'c')
+    outBuffer = openArray(job['outputDesc'], 'r+')
+    args, kwargs = userCodeArguments(inS, job['numChannels'], job['numSamples'],
+                                     job['sampleRate'], job['parameters'])
+    kwargs = dict(kwargs)
+    if 'outBuffer' in inspect.signature(userCode).parameters:
+        kwargs['outBuffer'] = outBuffer
+    with timer.stage('userCode'):
+        output, report = callUserCode(userCode, args, kwargs, job)
+
+    with timer.stage('writeOutput'):
+        if output is not None and output is not outBuffer:
+            outBuffer[...] = checkOutput(output, outBuffer.shape)
+        outBuffer.flush()
+    return report
+
+
+def runStreamJob(processBlock, job):
+    """Stream the input .wav file of job through processBlock into its output .wav file.
+    With an inputCopyPath, the blocks fed to processBlock are written there too"""
+    reader = WavReader(job['inputPath'])
+    mono = job['mono']
+    numChannels = 1 if mono else reader.numChannels
+    stop = reader.numFrames if job['stop'] is None else min(job['stop'], reader.numFrames)
+
+    inputCopy = None
+    if job.get('inputCopyPath') is not None:
+        inputCopy = WavWriter(job['inputCopyPath'], numChannels, reader.sampleRate)
+
+    def readBlock(blockStart, blockStop):
+        block = reader.read(blockStart, blockStop, mono)
+        if inputCopy is not None:
+            inputCopy.write(block)
+        return block
+
+    try:
+        with WavWriter(job['outputPath'], numChannels, reader.sampleRate) as writer:
+            runBlocks(processBlock, readBlock, writer.write, job['start'], stop,
+                      job['blockSize'], numChannels, reader.sampleRate, job['parameters'])
+    finally:
+        if inputCopy is not None:
+            inputCopy.close()
+
+
+def runRealTimeJob(job, cache):
+    """Time the script's processBlock (or userCode, called per block if it
+    has no processBlock) against the real-time budget of every block size"""
+    try:
+        processBlock = loadUserFunction(job['scriptPath'], cache, 'processBlock')
+    except AttributeError:
+        processBlock = asBlockFunction(loadUserFunction(job['scriptPath'], cache))
+    if 'inputDesc' in job:
+        inS = openArray(job['inputDesc'], 'r')
+    else:
+        inS = job['input']
+    return measureRealTime(processBlock, inS, job['sampleRate'],
+                           job['parameters'], job['blockSizes'])
+
+
+def workerLoop(conn):
+    """Entry point of the worker process. Waits for jobs on conn until
+    it receives None or the other end of the pipe is closed.
+    Answers with (status, payload, info), info holding the timed stages
+    and the profile report"""
+    cache = {}
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        timer = StageTimer('worker')
+        info = {'stages': timer.stages, 'profile': None}
+        try:
+            if job.get('mode') == 'stream':
+                with timer.stage('loadScript'):
+                    processBlock = loadUserFunction(job['scriptPath'], cache,
+                                                    'processBlock')
+                with timer.stage('stream'):
+                    _, info['profile'] = callUserCode(runStreamJob,
+                                                      (processBlock, job), {}, job)
+                conn.send(('ok', None, info))
+                continue
+            if job.get('mode') == 'realtime':
+                with timer.stage('realTimeCheck'):
+                    reports = runRealTimeJob(job, cache)
+                conn.send(('ok', reports, info))
+                continue
+
+            with timer.stage('loadScript'):
+                userCode = loadUserFunction(job['scriptPath'], cache)
+            if 'inputDesc' in job:
+                info['profile'] = runMappedJob(userCode, job, timer)
+                conn.send(('ok', None, info))
+            else:
+                with timer.stage('renderAutomation'):
+                    args, kwargs = userCodeArguments(job['input'], job['numChannels'],
+                                                     job['numSamples'], job['sampleRate'],
+                                                     job['parameters'])
+                with timer.stage('userCode'):
+                    output, info['profile'] = callUserCode(userCode, args, kwargs, job)
+                conn.send(('ok', output, info))
+        except Exception:
+            conn.send(('error', traceback.format_exc(), info))
+    conn.close()
+
+
+class DspWorker:
+    def __init__(self, transport=None):
+        self.process = None
+        self.conn = None
+        # ArrayTransport used for the signal. If None, arrays go through the pipe
+        self.transport = transport
+        # Profile report of the last job that asked for one
+        self.lastProfile = None
+
+    def isAlive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Start the worker process if it is not already running"""
+        if self.isAlive():
+            return
+        # Forking a process that has Tk running is not safe on every OS
+        context = multiprocessing.get_context('spawn')
+        parentConn, childConn = context.Pipe()
+        self.process = context.Process(target=workerLoop,
+                                       args=(childConn,),
+                                       daemon=True)
+        self.process.start()
+        childConn.close()
+        self.conn = parentConn
+
+    def stop(self):
+        """Ask the worker to exit and wait for it"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def cancel(self):
+        """Kill the worker in the middle of a job. Safe to call from another
+        thread: the waiting submit raises ScriptReturnCodeException and the
+        next run starts a fresh worker"""
+        process = self.process
+        if process is not None and process.is_alive():
+            process.terminate()
+
+    def run(self, scriptPath, inS, numChannels, numSamples, sampleRate,
+            parameters, timer=None, profile=False):
+        """Run the userCode function of scriptPath on inS and return its output.
+        The worker is (re)started if needed. The stages of the run, on both
+        sides of the pipe, are recorded in timer if given. If profile is True
+        the profile report of userCode is left in lastProfile"""
+        if timer is None:
+            timer = StageTimer()
+        with timer.stage('startWorker'):
+            self.start()
+        job = {'scriptPath': scriptPath,
+               'numChannels': numChannels,
+               'numSamples': numSamples,
+               'sampleRate': sampleRate,
+               'parameters': parameters,
+               'profile': profile}
+        if self.transport is not None:
+            with timer.stage('writeInput'):
+                inS = np.asarray(inS)
+                job['inputDesc'] = self.transport.writeInput(inS)
+                job['outputDesc'] = self.transport.allocateOutput(inS.shape,
+                                                                  inS.dtype)
+        else:
+            job['input'] = inS
+
+        with timer.stage('worker'):
+            payload = self.submit(job, timer)
+        if self.transport is not None:
+            with timer.stage('readOutput'):
+                return self.transport.readOutput(job['outputDesc'])
+        return payload
+
+    def runStream(self, scriptPath, inputPath, start, stop, mono, blockSize,
+                  outputPath, parameters, timer=None, profile=False, inputCopyPath=None):
+        """Run the processBlock function of scriptPath on frames start to stop
+        of the .wav file at inputPath and write the result to outputPath.
+        The (downmixed) input it was fed is written to inputCopyPath, if given"""
+        if timer is None:
+            timer = StageTimer()
+        with timer.stage('startWorker'):
+            self.start()
+        job = {'mode': 'stream',
+               'scriptPath': scriptPath,
+               'inputPath': inputPath,
+               'start': start,
+               'stop': stop,
+               'mono': mono,
+               'blockSize': blockSize,
+               'outputPath': outputPath,
+               'inputCopyPath': inputCopyPath,
+               'parameters': parameters,
+               'profile': profile}
+        with timer.stage('worker'):
+            self.submit(job, timer)
+
+    def runRealTime(self, scriptPath, inS, sampleRate, parameters, blockSizes):
+        """Measure how the script keeps up in real time with every one of
+        blockSizes. Returns a realTimeReport per block size"""
+        self.start()
+        job = {'mode': 'realtime',
+               'scriptPath': scriptPath,
+               'sampleRate': sampleRate,
+               'parameters': parameters,
+               'blockSizes': list(blockSizes)}
+        if self.transport is not None:
+            job['inputDesc'] = self.transport.writeInput(inS)
+        else:
+            job['input'] = inS
+        return self.submit(job)
+
+    def submit(self, job, timer=None):
+        """Send job to the worker and return the payload of its answer.
+        The stages timed by the worker are added to timer if given"""
+        self.lastProfile = None
+        try:
+            self.conn.send(job)
+            status, payload, info = self.conn.recv()
+        except (EOFError, OSError):
+            # The user code killed the worker. Clean up so that
+            # the next run starts a fresh one
+            self.process.join()
+            exitCode = self.process.exitcode
+            self.conn.close()
+            self.process = None
+            self.conn = None
+            raise ScriptReturnCodeException('The DSP worker exited while running the script',
+                                            f'Exit code: {exitCode}')
+
+        if timer is not None:
+            timer.addStages(info['stages'])
+        self.lastProfile = info['profile']
+        if status != 'ok':
+            raise ScriptReturnCodeException('Running the audio processing script failed',
+                                            payload)
+        return payload
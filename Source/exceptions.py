@@ -33,3 +33,29 @@ class ScriptReturnCodeException(Exception):
     def __str__(self):
         r = f'UserInputExeption: {self.message}\n  {self.error}\n'
         return r
+
+
+class UnsupportedWavException(Exception):
+    """Custom exception raised when a .wav file can not be
+    read natively and has to be decoded by librosa"""
+
+    def __init__(self, msg='Invalid input', error=""):
+        self.message = msg
+        self.error = error
+
+    def __str__(self):
+        r = f'UnsupportedWavException: {self.message}\n  {self.error}\n'
+        return r
+
+
+class RunCancelledException(Exception):
+    """Custom exception raised in a background run once it has been
+    cancelled or superseded by a newer run"""
+
+    def __init__(self, msg='Run cancelled', error=""):
+        self.message = msg
+        self.error = error
+
+    def __str__(self):
+        r = f'RunCancelledException: {self.message}\n  {self.error}\n'
+        return r
@@ -0,0 +1,100 @@
+"""
+Frequency response of the user's code, measured from its input and output.
+
+The signals are cut in overlapping, Hann windowed frames and the auto
+and cross spectra of all frames are averaged (Welch's method). The
+transfer function is the H1 estimate Sxy / Sxx, and the coherence
+|Sxy|^2 / (Sxx Syy) shows at which frequencies the output is really a
+linear function of the input (close to 1) and where it is not
+(nonlinearity, noise, time variance).
+
+Like gainAnalysis, everything works on mono (numSamples,) and
+multichannel (numChannels, numSamples) arrays. Frames are transformed in
+batches, so long renders don't need all their spectra in memory at once.
+Beyond maxFrames frames the average barely changes, so long renders only
+use maxFrames frames spread evenly over the whole signal.
+"""
+import numpy as np
+
+from Source.gainAnalysis import frameStarts
+
+DEFAULT_FFT_SIZE = 4096
+DEFAULT_MAX_FRAMES = 1024
+
+# Samples transformed per batch (frames x fftSize x channels)
+BATCH_SAMPLES = 1 << 22
+
+
+def framedView(signal, numFrames, windowSize, hopSize):
+    """Read-only view of signal shaped (..., numFrames, windowSize)"""
+    stride = signal.strides[-1]
+    return np.lib.stride_tricks.as_strided(
+        signal,
+        shape=signal.shape[:-1] + (numFrames, windowSize),
+        strides=signal.strides[:-1] + (hopSize * stride, stride),
+        writeable=False)
+
+
+def selectFrames(numFrames, maxFrames):
+    """Indices of at most maxFrames frames, spread evenly. None keeps them all"""
+    if maxFrames is None or numFrames <= maxFrames:
+        return np.arange(numFrames)
+    return np.linspace(0, numFrames - 1, maxFrames).round().astype(int)
+
+
+def averagedSpectra(inS, outS, fftSize=DEFAULT_FFT_SIZE, hopSize=None,
+                    maxFrames=DEFAULT_MAX_FRAMES):
+    """Welch averaged spectra of inS and outS.
+    Returns (Sxx, Syy, Sxy), each shaped (..., fftSize // 2 + 1)"""
+    inS = np.asarray(inS)
+    outS = np.asarray(outS)
+    if inS.shape != outS.shape:
+        raise ValueError(f'Input shape {inS.shape} does not match output shape {outS.shape}')
+    if hopSize is None:
+        hopSize = fftSize // 2
+
+    starts, windowSize = frameStarts(inS.shape[-1], fftSize, hopSize)
+    inFrames = framedView(inS, len(starts), windowSize, hopSize)
+    outFrames = framedView(outS, len(starts), windowSize, hopSize)
+    selected = selectFrames(len(starts), maxFrames)
+    window = np.hanning(windowSize + 1)[:-1].astype(np.result_type(inS, np.float32))
+    numChannels = 1 if inS.ndim == 1 else int(np.prod(inS.shape[:-1]))
+    batchSize = max(1, BATCH_SAMPLES // (fftSize * numChannels))
+
+    spectrumShape = inS.shape[:-1] + (fftSize // 2 + 1,)
+    sxx = np.zeros(spectrumShape)
+    syy = np.zeros(spectrumShape)
+    sxy = np.zeros(spectrumShape, dtype=np.complex128)
+    for first in range(0, len(selected), batchSize):
+        batch = selected[first:first + batchSize]
+        x = np.fft.rfft(inFrames[..., batch, :] * window, n=fftSize)
+        y = np.fft.rfft(outFrames[..., batch, :] * window, n=fftSize)
+        sxx += np.sum((np.conj(x) * x).real, axis=-2)
+        syy += np.sum((np.conj(y) * y).real, axis=-2)
+        sxy += np.sum(np.conj(x) * y, axis=-2)
+    return sxx / len(selected), syy / len(selected), sxy / len(selected)
+
+
+def transferFunction(inS, outS, sampleRate, fftSize=DEFAULT_FFT_SIZE, hopSize=None,
+                     maxFrames=DEFAULT_MAX_FRAMES):
+    """Frequency response of the system that turned inS into outS.
+    Returns a dict with the frequencies (Hz), the complex response, its
+    magnitude (dB), unwrapped phase (rad) and the coherence. Bins where
+    the input has no energy are NaN"""
+    sxx, syy, sxy = averagedSpectra(inS, outS, fftSize, hopSize, maxFrames)
+    valid = sxx > 0
+    response = np.full(sxy.shape, np.nan, dtype=np.complex128)
+    np.divide(sxy, sxx, out=response, where=valid)
+    coherence = np.full(sxx.shape, np.nan)
+    np.divide(np.abs(sxy) ** 2, sxx * syy, out=coherence, where=valid & (syy > 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitudeDb = 20 * np.log10(np.abs(response))
+    phase = np.angle(response)
+    # unwrap does not skip NaN, so unwrap the valid bins only
+    phase[valid] = np.unwrap(np.where(valid, phase, 0), axis=-1)[valid]
+    return {'frequencies': np.fft.rfftfreq(fftSize, 1 / sampleRate),
+            'response': response,
+            'magnitudeDb': magnitudeDb,
+            'phase': phase,
+            'coherence': coherence}
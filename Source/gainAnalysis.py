@@ -0,0 +1,90 @@
+"""
+Gain analysis between an input signal and its processed output.
+
+Every function works on mono arrays (numSamples,) as well as on
+multichannel arrays shaped (numChannels, numSamples), like the ones
+userCode receives.
+"""
+import numpy as np
+
+
+def computeGain(inS, outS):
+    """Return the per-sample gain outS / inS.
+    Samples where the input is 0 keep the gain of the previous sample,
+    and are 0 if there is no previous non zero input sample"""
+    inS = np.asarray(inS)
+    outS = np.asarray(outS)
+    if inS.shape != outS.shape:
+        raise ValueError(f'Input shape {inS.shape} does not match output shape {outS.shape}')
+
+    dtype = np.result_type(inS, outS, np.float32)
+    valid = inS != 0
+    ratio = np.zeros(inS.shape, dtype=dtype)
+    np.divide(outS, inS, out=ratio, where=valid)
+
+    # Index of the last valid sample up to each position (forward fill).
+    # Invalid positions point to 0, where ratio is 0 unless the first sample is valid
+    numSamples = inS.shape[-1]
+    lastValid = np.where(valid, np.arange(numSamples), 0)
+    np.maximum.accumulate(lastValid, axis=-1, out=lastValid)
+    return np.take_along_axis(ratio, lastValid, axis=-1)
+
+
+def frameStarts(numSamples, windowSize, hopSize):
+    """Return the start index of every full window of the signal.
+    Signals shorter than a window give a single (shorter) frame"""
+    if windowSize <= 0 or hopSize <= 0:
+        raise ValueError('Window and hop size must be positive')
+    windowSize = min(windowSize, numSamples)
+    numFrames = 1 + (numSamples - windowSize) // hopSize
+    return np.arange(numFrames) * hopSize, windowSize
+
+
+def computeEnvelope(signal, windowSize=1024, hopSize=512, mode='rms'):
+    """Return the RMS or peak envelope of signal, one value per window.
+    The result has shape (..., numFrames)"""
+    signal = np.asarray(signal)
+    starts, windowSize = frameStarts(signal.shape[-1], windowSize, hopSize)
+
+    if mode == 'rms':
+        # Windowed energy from a cumulative sum, so the cost does not grow with the window
+        squares = np.square(signal, dtype=np.float64)
+        cumEnergy = np.zeros(signal.shape[:-1] + (signal.shape[-1] + 1,))
+        np.cumsum(squares, axis=-1, out=cumEnergy[..., 1:])
+        energy = cumEnergy[..., starts + windowSize] - cumEnergy[..., starts]
+        # Cancellation in the cumulative sum can leave tiny negative values
+        return np.sqrt(np.maximum(energy, 0) / windowSize)
+
+    elif mode == 'peak':
+        magnitude = np.abs(signal)
+        stride = magnitude.strides[-1]
+        frames = np.lib.stride_tricks.as_strided(
+            magnitude,
+            shape=magnitude.shape[:-1] + (len(starts), windowSize),
+            strides=magnitude.strides[:-1] + (hopSize * stride, stride),
+            writeable=False)
+        return frames.max(axis=-1)
+
+    raise ValueError(f'Unknown envelope mode: {mode}')
+
+
+def computeGainReduction(inS, outS, windowSize=1024, hopSize=512,
+                         mode='rms', floorDb=-120):
+    """Return the frame centers (in samples) and the gain in dB between
+    the envelopes of outS and inS. Frames where the input envelope is
+    below floorDb are NaN, since their gain is meaningless"""
+    inS = np.asarray(inS)
+    outS = np.asarray(outS)
+    if inS.shape != outS.shape:
+        raise ValueError(f'Input shape {inS.shape} does not match output shape {outS.shape}')
+
+    inEnv = computeEnvelope(inS, windowSize, hopSize, mode)
+    outEnv = computeEnvelope(outS, windowSize, hopSize, mode)
+
+    floor = 10 ** (floorDb / 20)
+    gainDb = np.full(inEnv.shape, np.nan)
+    valid = inEnv > floor
+    gainDb[valid] = 20 * np.log10(np.maximum(outEnv[valid], floor) / inEnv[valid])
+
+    starts, windowSize = frameStarts(inS.shape[-1], windowSize, hopSize)
+    return starts + windowSize / 2, gainDb
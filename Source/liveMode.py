@@ -0,0 +1,112 @@
+"""
+Live mode: re-process whenever the code, the parameters, the range or
+the file change.
+
+Every change is described by a RenderKey (hash of the code and of the
+parameters, the range, the file and the render mode). The GUI polls its inputs and feeds the key to a
+Debouncer, which only hands it back once it has stopped changing for a
+moment and differs from the last key that was rendered, so typing does
+not start a render per key stroke.
+
+Finished renders are kept in a ResultCache under their key. Going back
+to a recent variant (undoing an edit, switching a parameter back) swaps
+in the cached input and output instead of running the code again.
+"""
+from collections import OrderedDict, namedtuple
+import hashlib
+import time
+
+import numpy as np
+
+from Source.parameterSchema import parameterDigest
+
+DEFAULT_DEBOUNCE_SECS = 0.5
+DEFAULT_RESULT_ENTRIES = 8
+DEFAULT_RESULT_BYTES = 1024 * 1024 * 1024
+
+# Everything that changes the output of a render. fileStamp is the mtime
+# of the file, so a re-exported file is not served from the cache. mode is
+# how the code is run (streamed, chunked or whole, profiled or not)
+RenderKey = namedtuple('RenderKey', 'codeHash parameters start end mono path fileStamp mode')
+
+
+def hashText(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def renderKey(code, parameters, start, end, mono, path, fileStamp, mode='whole'):
+    """RenderKey of a render of path from start to end (secs) with code
+    (the text of the user script) and parameters (p1-p4 or a dict of the
+    declared parameters), run in mode"""
+    return RenderKey(hashText(code), parameterDigest(parameters), start, end, bool(mono),
+                     path, fileStamp, mode)
+
+
+class Debouncer:
+    def __init__(self, delay=DEFAULT_DEBOUNCE_SECS, clock=time.monotonic):
+        """Hands keys back once they have been stable for delay secs"""
+        self.delay = delay
+        self.clock = clock
+        self.pending = None
+        self.changedAt = None
+        self.last = None
+
+    def update(self, key):
+        """Feed the current key. Returns it once it has not changed for delay
+        secs and differs from the last returned key, None otherwise"""
+        now = self.clock()
+        if key != self.pending:
+            self.pending = key
+            self.changedAt = now
+            return None
+        if key == self.last or now - self.changedAt < self.delay:
+            return None
+        self.last = key
+        return key
+
+    def reset(self):
+        """Forget the last returned key, so the current one is returned again"""
+        self.last = None
+
+
+class ResultCache:
+    def __init__(self, maxEntries=DEFAULT_RESULT_ENTRIES, maxBytes=DEFAULT_RESULT_BYTES):
+        """LRU cache of finished renders, at most maxEntries of them and
+        maxBytes of input and output together"""
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.totalBytes = 0
+
+    @staticmethod
+    def size(result):
+        return sum(np.asarray(v).nbytes for v in (result['inputS'], result['output']))
+
+    def put(self, key, result):
+        """Keep result (a dict with at least inputS and output) under key.
+        Outputs memory-mapped from a file (streaming mode) are not kept,
+        the next render overwrites the file"""
+        if isinstance(result['output'], np.memmap):
+            return False
+        size = self.size(result)
+        if size > self.maxBytes:
+            return False
+        if key in self.entries:
+            self.totalBytes -= self.size(self.entries.pop(key))
+        self.entries[key] = result
+        self.totalBytes += size
+        while len(self.entries) > self.maxEntries or self.totalBytes > self.maxBytes:
+            _, dropped = self.entries.popitem(last=False)
+            self.totalBytes -= self.size(dropped)
+        return True
+
+    def get(self, key):
+        """The result kept under key, or None"""
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.totalBytes = 0
@@ -10,28 +10,79 @@ Intended Usage (with implemented functionality):
     5. Click the Plot Gain button to show a plot of Gain over Time
         --> checking the checkbutton on the left also
             plots the original and processed signal
+    6. Type several values in the parameter boxes (0.5, 1, 2 or start:stop:count)
+        and click "Sweep parameters" to compare every combination
+    7. Check "Profile" before processing to print the hot spots and
+        per-line timings of your userCode
+    8. Click "Real-time check" to see if your code (processBlock if defined)
+        keeps up in real time with host block sizes of 64 to 2048 samples
+    9. Click "Frequency response" to plot magnitude, phase and coherence
+        of your code, measured from the processed part
+    10. Pick a generated signal in the "Test signal" menu instead of a file,
+        process it and click "Impulse response" to measure your code
+    11. Processing, gain plots, sweeps and real-time checks run in the
+        background. Clicking again replaces a run that is still going,
+        "Cancel" stops it
+    12. Check "Live" to process again whenever the code (in the box or in
+        the script file), the parameters or the range change. Recent
+        renders are kept, so going back to one of them is instant
+    13. Processed parts are saved in a render cache on disk, so processing
+        the same part with the same code and parameters again (even in a
+        later session) is instant. "Clear render cache" empties it
+    14. Declare a PARAMETERS list in your script to use any number of
+        typed parameters (ints, floats, bools or arrays) instead of P1-P4.
+        They get a textbox each under "Declared parameters" and are
+        passed to userCode by name
+    15. Give a float parameter an 'automation' of 'sample' or 'block' and
+        type breakpoints in its textbox (0:200 exp, 2:8000) to automate it.
+        userCode gets the rendered curve, "Plot automation" shows it next
+        to the output, to check how your code handles parameter changes
 
 ===============================================================================
 """
 import gc
+import json
 import os
 import subprocess
 import sys
 import pickle
-from tkinter import Tk
+import tempfile
+from tkinter import Menu, Menubutton, Tk
 from tkinter.filedialog import askdirectory, askopenfilename
 from tkinter.scrolledtext import ScrolledText
-from tkinter.ttk import Button, Checkbutton
+from tkinter.ttk import Button, Checkbutton, Label
 
 from bloscpack import pack_ndarray_to_file, unpack_ndarray_from_file
-from librosa.core import load
 import matplotlib.pyplot as plt
 import numpy as np
 
 sys.path.append('./')
-from Source.exceptions import FilePathException, ScriptReturnCodeException, UserInputExeption
+from Source.arrayTransport import ArrayTransport
+from Source.audioCache import DecodedAudioCache
+from Source.automation import Envelope
+from Source.backgroundRunner import BackgroundRunner, Run
+from Source.blockRunner import DEFAULT_BLOCK_SIZE
+from Source.chunkRender import renderChunked
+from Source.dspWorker import DspWorker
+from Source.exceptions import FilePathException, ScriptReturnCodeException, UnsupportedWavException, UserInputExeption
+from Source.frequencyResponse import DEFAULT_FFT_SIZE, transferFunction
+from Source.gainAnalysis import computeGain, computeGainReduction
+from Source.liveMode import Debouncer, ResultCache, renderKey
+from Source.overviewCache import OverviewCache, OverviewTrace
 from Source.parameterFrame import ParameterFrame
+from Source.parameterSchema import readSchema
+from Source.parameterSweep import formatSweepTable, runSweep
+from Source.parameterTableFrame import ParameterTableFrame
+from Source.realtimeCheck import HOST_BLOCK_SIZES, formatRealTimeTable
+from Source.renderCache import RenderCache
+from Source.renderPipeline import decodeSegment
 from Source.renderRangeFrame import RenderRangeFrame
+from Source.spectrogram import DEFAULT_FFT_SIZE as SPECTROGRAM_FFT_SIZE
+from Source.spectrogram import DEFAULT_HOP_SIZE, SpectrogramCache, SpectrogramImage, toDb
+from Source.stageTimer import StageTimer
+from Source.testSignals import TEST_SIGNALS, deconvolve, generateTestSignal, impulseResponseSpectrum
+from Source.wavReader import WavReader, WavWriter, secondsToFrames
+from Source.waveformDecimation import DecimatedTrace
 
 
 class DspVisualiser:
@@ -40,10 +91,29 @@ class DspVisualiser:
         self.srcTopLvlPath = os.getcwd() + '/Source'
         self.userCodePath = self.srcTopLvlPath + '/Assets/userCode.py'
         self.interpreterPath = sys.executable
+        # Long-lived process running userCode. Started in initiate,
+        # when None every run spawns applyUserCode.py instead
+        self.dspWorker = None
 
         # Audio file related
         self.fileImported = False
         self.importPath = "~/Desktop"
+        # Generated test signals are written to a file in Assets and
+        # imported like a chosen file
+        self.testSignalDuration = 5
+        self.testSignalSampleRate = 48000
+        self.impulseResponse = None
+        # Recently decoded ranges, so re-running the same range skips decoding
+        self.audioCache = DecodedAudioCache(self.decodeSegment)
+        # Outputs of earlier runs on disk, by hash of audio, range, code and
+        # parameters. Created on the first run, once srcTopLvlPath is final.
+        # Streamed and profiled runs always run the code
+        self.useRenderCache = True
+        self.renderCacheBytes = 2 * 1024 * 1024 * 1024
+        self.renderCache = None
+        # Peak pyramids of imported files. Created on the first
+        # plotOverview call, once srcTopLvlPath is final
+        self.overviewCache = None
 
         # File and Signal related
         self.sampleRate = 44100
@@ -54,8 +124,74 @@ class DspVisualiser:
         self.numSamples = self.sampleRate
         self.output = self.inputS.copy()
 
+        # Streaming options. When enabled, processBlock of the user script
+        # is fed streamBlockSize samples at a time, straight from the file
+        self.streamingMode = False
+        self.streamBlockSize = DEFAULT_BLOCK_SIZE
+        # Files in Assets mapped by the streamed inputS and output. Every
+        # stream writes new ones, so the plots never read a file being
+        # overwritten. The ones no longer shown are removed on the next stream
+        self.streamFiles = []
+
+        # Chunk-parallel rendering. Each chunk gets chunkOverlap samples of
+        # pre-roll, the last chunkCrossfade of them are blended at the seams
+        self.chunkedRender = False
+        self.chunkOverlap = 4096
+        self.chunkCrossfade = 1024
+
+        # Results of the last parameter sweep: one row of parameters and
+        # metrics per run, and the outputs shaped (numRuns,) + inputS.shape
+        self.sweepTable = None
+        self.sweepOutputs = None
+
         # Plotting options
         self.includeWavesInGainPlot = False
+        # 'sample' plots the gain of every sample, 'rms' or 'peak' the gain
+        # reduction in dB between the envelopes of input and output
+        self.gainMode = 'sample'
+        self.gainWindowSize = 1024
+        self.gainHopSize = 512
+        # FFT size of the frequency response analysis and its last result
+        self.responseFftSize = DEFAULT_FFT_SIZE
+        self.frequencyResponse = None
+        # Spectrogram options. STFTs are cached per array, so re-plotting
+        # with another spectrogramRangeDb or diffRangeDb is instant
+        self.spectrogramFftSize = SPECTROGRAM_FFT_SIZE
+        self.spectrogramHopSize = DEFAULT_HOP_SIZE
+        self.spectrogramWindow = 'hann'
+        self.spectrogramRangeDb = 90
+        self.diffRangeDb = 24
+        self.spectrogramCache = SpectrogramCache()
+
+        # Wall time, CPU time and peak memory of every stage of the last
+        # processAudio run. If stageLogPath is set each run is appended
+        # to it as a JSON line
+        self.stageTimer = StageTimer()
+        self.stageLogPath = None
+
+        # Profile userCode (or processBlock) in the DSP worker. The report
+        # of the last profiled run is printed and kept in profileReport
+        self.profileMode = False
+        self.profileReport = None
+
+        # Results of the last real-time check, one dict per host block size
+        self.realTimeBlockSizes = HOST_BLOCK_SIZES
+        self.realTimeReports = None
+
+        # Runs started from the GUI are done in the background, one at a
+        # time. Their progress is shown in statusLabel
+        self.runner = BackgroundRunner()
+        self.statusLabel = None
+
+        # Live mode. The code, parameters, range and file are polled every
+        # livePollMs and processed once they stop changing. Recent renders
+        # are kept in resultCache
+        self.liveMode = False
+        self.livePollMs = 100
+        self.liveAfterId = None
+        self.liveDebouncer = Debouncer()
+        self.liveScriptStamp = None
+        self.resultCache = ResultCache()
 
     # Interpreter and src path related
     # Use to ensure that you dont end up getting symlinks or wrong environments
@@ -134,8 +270,9 @@ class DspVisualiser:
                 self.codeBox.delete('1.0', 'end')
                 self.codeBox.insert('1.0', data)
                 userPy.close()
+            self.showDeclaredParameters(data)
             return True
-        except FilePathException as e:
+        except (FilePathException, UserInputExeption) as e:
             print(e)
             return False
 
@@ -145,6 +282,10 @@ class DspVisualiser:
         with open(path, 'w') as userPy:
             userPy.write(userIn)
             userPy.close()
+        try:
+            self.showDeclaredParameters(userIn)
+        except UserInputExeption as e:
+            print(e)
 
     # Create or overwrite asset scripts to avoid any errors
 
@@ -166,10 +307,21 @@ class DspVisualiser:
 
             userPy.write(
                 '    # output is the ndarray that contains your processed data. Must be same shape as input\n')
+            userPy.write(
+                '    # (add an outBuffer=None argument to write straight into the preallocated output)\n')
 
             userPy.write('    output = input.copy()\n\n')
             userPy.write('    # Your code goes here....\n\n\n\n\n\n')
-            userPy.write('    return output\n')
+            userPy.write('    return output\n\n\n')
+            userPy.write('# For streaming mode define processBlock instead. It gets one block at a time\n')
+            userPy.write('# and state is a dict kept between the blocks of a run\n')
+            userPy.write('# def processBlock(block, numChannels, numSamples, sampleRate, state, p1, p2, p3, p4):\n')
+            userPy.write('#     return block\n\n')
+            userPy.write('# Instead of p1-p4 you can declare any number of typed parameters,\n')
+            userPy.write('# they are passed by name (see Source/parameterSchema.py)\n')
+            userPy.write("# PARAMETERS = [{'name': 'gain', 'type': 'float', 'range': (0, 2), 'default': 1},\n")
+            userPy.write("#               {'name': 'taps', 'type': 'array', 'default': [0.5, 0.5]}]\n")
+            userPy.write('# def userCode(input, numChannels, numSamples, sampleRate, gain, taps):\n')
 
             userPy.close()
 
@@ -179,24 +331,35 @@ class DspVisualiser:
             applyUserPY.write('#!' + self.interpreterPath + '\n\n')
             applyUserPY.write(
                 'from bloscpack import unpack_ndarray_from_file, pack_ndarray_to_file\n')
-            applyUserPY.write('import pickle\n')   
+            applyUserPY.write('import json\n')
+            applyUserPY.write('import os\n')
+            applyUserPY.write('import pickle\n')
             applyUserPY.write('import sys\n')
+            applyUserPY.write(f'sys.path.append({os.path.dirname(self.srcTopLvlPath)!r})\n')
+            applyUserPY.write('from Source.stageTimer import StageTimer\n')
             applyUserPY.write('from userCode import userCode\n\n')
 
-            applyUserPY.write('inS = unpack_ndarray_from_file(sys.argv[1])\n')
+            applyUserPY.write('timer = StageTimer("child")\n')
+            applyUserPY.write('with timer.stage("unpackInput"):\n')
+            applyUserPY.write('    inS = unpack_ndarray_from_file(sys.argv[1])\n')
             applyUserPY.write('numC = int(sys.argv[2])\n')
             applyUserPY.write('numS = int(sys.argv[3])\n')
             applyUserPY.write('sRate = int(sys.argv[4])\n\n')
 
             applyUserPY.write('path = sys.argv[5]\n\n')
 
-            applyUserPY.write('with open(path, "rb") as p:\n')
-            applyUserPY.write('    pList = pickle.load(p)\n')
-            applyUserPY.write('    p.close()\n\n')
+            applyUserPY.write('with timer.stage("loadParameters"), open(path, "rb") as p:\n')
+            applyUserPY.write('    pList = pickle.load(p)\n\n')
 
+            applyUserPY.write('with timer.stage("userCode"):\n')
             applyUserPY.write(
-                'output = userCode(inS, numC, numS, sRate, pList[0], pList[1], pList[2], pList[3])\n\n')
-            applyUserPY.write('pack_ndarray_to_file(output, sys.argv[1])\n')
+                '    output = userCode(inS, numC, numS, sRate, pList[0], pList[1], pList[2], pList[3])\n\n')
+            applyUserPY.write('with timer.stage("packOutput"):\n')
+            applyUserPY.write('    pack_ndarray_to_file(output, sys.argv[1])\n\n')
+
+            applyUserPY.write('# Picked up by DspVisualiser.addChildStages\n')
+            applyUserPY.write('with open(os.path.join(os.path.dirname(path), "DSPVisStages.json"), "w") as s:\n')
+            applyUserPY.write('    json.dump(timer.stages, s)\n')
 
             applyUserPY.close()
 
@@ -223,16 +386,54 @@ class DspVisualiser:
             print(e)
             return False
 
+    # Generate a test signal and import it instead of a file
+
+    def useTestSignal(self, kind):
+        """Write a generated test signal (see testSignals) to Assets and
+        import it, so it can be processed like a chosen file"""
+        path = self.srcTopLvlPath + '/Assets/dspVisTestSignal.wav'
+        signal = generateTestSignal(kind, self.testSignalSampleRate,
+                                    self.testSignalDuration)
+        numChannels = 1 if signal.ndim == 1 else signal.shape[0]
+        # Replaced rather than overwritten, a streamed input may still map the old one
+        with WavWriter(path + '.tmp', numChannels, self.testSignalSampleRate) as writer:
+            writer.write(signal)
+        os.replace(path + '.tmp', path)
+        self.importPath = path
+        self.fileImported = True
+        print(f'Imported a {self.testSignalDuration} sec {kind} test signal. '
+              f'Process 0 to {self.testSignalDuration} secs, then plot its impulse response')
+        return True
+
     # === Processing function and it's helpers ===
 
     # Process the audio file
 
     def processAudio(self, path=None, resampleRate=None, rS=None,
-                     rE=None, mono=None):
+                     rE=None, mono=None, parList=None, run=None):
+        """Process the selected range with the given settings (see
+        renderPart) and make it the current input and output"""
+        result = self.renderPart(path, resampleRate, rS, rE, mono, parList, run)
+        if result is False:
+            return False
+        self.useResult(result)
+        # Get rid of any previously created/processed arrays
+        gc.collect()
+        return True
+
+    def renderPart(self, path=None, resampleRate=None, rS=None,
+                   rE=None, mono=None, parList=None, run=None):
         """Process the selected range with the given settings"""
         """Range = Start - End
         Resample = True or False (needs new sampleRate if True)
-        convertToMono = True or False"""
+        convertToMono = True or False
+        parList = p1-p4 or a dict of the declared parameters, read from
+        the parameter frames if None
+        run = Run to report progress on when processing in the background.
+        Returns the result, a dict of what useResult replaces, or False if
+        it failed. Nothing is replaced here, so it can run in the background"""
+        if run is None:
+            run = Run('processAudio')
         # Initialiase errorMsg
         errorMsg = ""
         # TODO: Add resampling options
@@ -245,7 +446,6 @@ class DspVisualiser:
         # FIXME: These values should be evaluated seperately
         if rS is None and rE is None and mono is None:
             rS, rE, mono = self.rangeFrame.getValues()
-            self.convertToMono = mono
 
         rangeIsCorrect = (rS >= 0) and (rE > rS)
         try:
@@ -265,86 +465,596 @@ class DspVisualiser:
                     f'Given path {path}')
 
             # ============ Calculating input and variables ==============
-            self.durationInSecs = rE - rS
-            self.inputS, self.sampleRate = load(self.importPath,
-                                                sr=None,
-                                                offset=rS,
-                                                mono=mono,
-                                                duration=self.durationInSecs)
-
-            if mono:
-                numChannels = 1
-                numSamples = len(self.inputS)
+            timer = self.stageTimer = StageTimer()
+            durationInSecs = rE - rS
+            streamFiles = []
+            if self.streamingMode:
+                # Never decoded in memory, the stream reads the file block by block
+                inS = sampleRate = None
             else:
-                numChannels = 2
-                numSamples = len(self.inputS[0])
+                run.checkpoint(0, 'Decoding')
+                with timer.stage('decode'):
+                    inS, sampleRate = self.audioCache.load(
+                        self.importPath, rS, durationInSecs, mono)
+
+                if mono:
+                    numChannels = 1
+                    numSamples = len(inS)
+                else:
+                    numChannels = 2
+                    numSamples = len(inS[0])
             # User parameters
-            par1 = par2 = par3 = par4 = 0
-            if self.p1Frame.choice != 0:
-                par1 = self.p1Frame.getValue()
-            if self.p2Frame.choice != 0:
-                par2 = self.p2Frame.getValue()
-            if self.p3Frame.choice != 0:
-                par3 = self.p3Frame.getValue()
-            if self.p4Frame.choice != 0:
-                par4 = self.p4Frame.getValue()
-
-            parList = [par1, par2, par3, par4]
-            paramListPath = self.srcTopLvlPath + '/Assets/DSPVisParList.dat'
+            if parList is None:
+                parList = self.getParameterList()
+
+            with timer.stage('syncScript'):
+                assetScriptPath = self.syncUserScript()
+
+            run.checkpoint(0.2, 'Running the user code')
+            profileReport = None
+            with timer.stage('readRenderCache'):
+                cacheKey = self.renderCacheKey(assetScriptPath, rS, rE, mono, parList)
+                output = None if cacheKey is None else self.renderCache.get(cacheKey)
+            cached = output is not None
+            if cached:
+                print('Output read from the render cache')
+            elif self.streamingMode:
+                with run.cancelWith(self.cancelWorker):
+                    inS, output, sampleRate, streamFiles = self.streamAudio(
+                        assetScriptPath, rS, durationInSecs, mono, parList)
+                profileReport = self.dspWorker.lastProfile
+            elif self.chunkedRender:
+                with timer.stage('chunkedRender'):
+                    output = renderChunked(assetScriptPath, inS,
+                                           sampleRate, parList,
+                                           self.srcTopLvlPath + '/Assets',
+                                           overlap=self.chunkOverlap,
+                                           crossfade=self.chunkCrossfade, run=run)
+            elif self.dspWorker is not None or self.profileMode or isinstance(parList, dict):
+                # Profiling and declared parameters are only done by the worker
+                if self.dspWorker is None:
+                    self.dspWorker = DspWorker()
+                with run.cancelWith(self.cancelWorker):
+                    output = self.dspWorker.run(assetScriptPath, inS,
+                                                numChannels, numSamples,
+                                                sampleRate, parList, timer,
+                                                self.profileMode)
+                profileReport = self.dspWorker.lastProfile
+            else:
+                output = self.runAssetScript(inS, numChannels, numSamples,
+                                             sampleRate, parList)
+            if cacheKey is not None and not cached:
+                run.checkpoint(0.8, 'Saving to the render cache')
+                with timer.stage('writeRenderCache'):
+                    self.renderCache.put(cacheKey, output)
+            run.checkpoint(0.9, 'Cleaning up')
+
+            self.logStages()
+            if profileReport is not None:
+                print(profileReport)
+            return {'inputS': inS,
+                    'output': output,
+                    'sampleRate': sampleRate,
+                    'durationInSecs': durationInSecs,
+                    'convertToMono': mono,
+                    'streamFiles': streamFiles,
+                    'profileReport': profileReport}
+        except UserInputExeption as e:
+            errorMsg = e.message
+            print(e)
+            return False
+        except ScriptReturnCodeException as e:
+            errorMsg = e.message
+            print(e)
+            return False
+        except FilePathException as e:
+            errorMsg = e.message
+            print(e)
+            return False
+
+    def getParameterList(self, source=None):
+        """Values of the parameters the script (or source) declares as a
+        dict, if it declares any. Otherwise p1-p4, 0 for the disabled ones"""
+        if self.showDeclaredParameters(source) is not None:
+            try:
+                return self.parameterTable.getValues()
+            except ValueError as e:
+                raise UserInputExeption('Invalid parameter value', str(e))
+
+        par1 = par2 = par3 = par4 = 0
+        if self.p1Frame.choice != 0:
+            par1 = self.p1Frame.getValue()
+        if self.p2Frame.choice != 0:
+            par2 = self.p2Frame.getValue()
+        if self.p3Frame.choice != 0:
+            par3 = self.p3Frame.getValue()
+        if self.p4Frame.choice != 0:
+            par4 = self.p4Frame.getValue()
+
+        return [par1, par2, par3, par4]
+
+    def showDeclaredParameters(self, source=None):
+        """Read the PARAMETERS of source (the user script if None) and give
+        each a row in parameterTable. Returns the schema, None if none"""
+        try:
+            if source is None:
+                with open(self.userCodePath, 'r') as userPy:
+                    source = userPy.read()
+            schema = readSchema(source)
+        except OSError:
+            schema = None
+        except ValueError as e:
+            raise UserInputExeption('Invalid PARAMETERS declaration', str(e))
+        self.parameterTable.setSchema(schema)
+        return schema
+
+    def renderCacheKey(self, scriptPath, rS, rE, mono, parList):
+        """Key of this run in renderCache, None if it should run the code anyway"""
+        if not self.useRenderCache or self.streamingMode or self.profileMode:
+            return None
+        try:
+            with open(scriptPath, 'r') as userPy:
+                code = userPy.read()
+            return self.getRenderCache().key(self.importPath, rS, rE, mono, code,
+                                             parList, self.renderMode())
+        except OSError:
+            return None
+
+    def renderMode(self):
+        """How processAudio runs the code: streamed (with its block size),
+        chunked (with its overlap and crossfade) or whole, and profiled or not"""
+        if self.streamingMode:
+            mode = f'stream:{self.streamBlockSize}'
+        elif self.chunkedRender:
+            # Chunked renders blend the chunks, they are not the same output
+            mode = f'chunked:{self.chunkOverlap}:{self.chunkCrossfade}'
+        else:
+            mode = 'whole'
+        return mode + ':profile' if self.profileMode else mode
+
+    def getRenderCache(self):
+        if self.renderCache is None:
+            self.renderCache = RenderCache(self.srcTopLvlPath + '/Assets/cache/renders',
+                                           self.renderCacheBytes)
+        return self.renderCache
+
+    # Function for clearCacheButton
+
+    def clearRenderCache(self):
+        self.getRenderCache().clear()
+
+    def syncUserScript(self):
+        """If user used a custom script make sure its context gets
+        copied in the assetscript. Returns the assetscript path"""
+        assetScriptPath = self.srcTopLvlPath + '/Assets/userCode.py'
+        if self.userCodePath != assetScriptPath:
+            if not os.path.isfile(self.userCodePath):
+                raise FilePathException('File path invalid or does not exist',
+                                        f'Chosen path: {self.userCodePath}')
+            with open(self.userCodePath, 'r') as i:
+                userText = i.read()
+
+            with open(assetScriptPath, 'w') as i:
+                i.write(userText)
+        return assetScriptPath
+
+    # Run every combination of the parameter values
+
+    def sweepParameters(self, parameterValues=None, run=None):
+        """Run userCode on the last processed range for every combination
+        of the values in the parameter textboxes (or of parameterValues,
+        one list per parameter), in parallel. run = Run that can cancel it"""
+        try:
+            if not self.fileImported:
+                raise UserInputExeption("No audio file selected",
+                    'Process a part of a file before sweeping its parameters')
+            if parameterValues is None:
+                parameterValues = self.getSweepValues()
+
+            scriptPath = self.syncUserScript()
+            numChannels = 1 if np.ndim(self.inputS) == 1 else len(self.inputS)
+            self.sweepTable, self.sweepOutputs = runSweep(
+                scriptPath, self.inputS, numChannels, np.shape(self.inputS)[-1],
+                self.sampleRate, parameterValues, self.srcTopLvlPath + '/Assets',
+                run=run)
+        except (UserInputExeption, ScriptReturnCodeException, FilePathException) as e:
+            print(e)
+            return False
+
+        print(formatSweepTable(self.sweepTable))
+        return True
+
+    def getSweepValues(self):
+        """Values to sweep of the declared parameters (see
+        ParameterTableFrame.getSweepValues) or of p1-p4 (see
+        ParameterFrame.getValues)"""
+        try:
+            if self.showDeclaredParameters() is not None:
+                return self.parameterTable.getSweepValues()
+            return [self.p1Frame.getValues(), self.p2Frame.getValues(),
+                    self.p3Frame.getValues(), self.p4Frame.getValues()]
+        except ValueError as e:
+            raise UserInputExeption('Invalid sweep values', str(e))
+
+    # Check if userCode would keep up in a plugin host
+
+    def checkRealTime(self, parList=None, run=None):
+        """Time the user script block by block on the last processed range,
+        for every host block size in realTimeBlockSizes"""
+        if run is None:
+            run = Run('checkRealTime')
+        try:
+            if not self.fileImported:
+                raise UserInputExeption("No audio file selected",
+                    'Process a part of a file before checking it in real time')
+            if parList is None:
+                parList = self.getParameterList()
+            scriptPath = self.syncUserScript()
+            if self.dspWorker is None:
+                self.dspWorker = DspWorker()
+            with run.cancelWith(self.cancelWorker):
+                self.realTimeReports = self.dspWorker.runRealTime(
+                    scriptPath, self.inputS, self.sampleRate, parList,
+                    self.realTimeBlockSizes)
+        except (UserInputExeption, ScriptReturnCodeException, FilePathException) as e:
+            print(e)
+            return False
+
+        print(formatRealTimeTable(self.realTimeReports))
+        return True
+
+    def streamAudio(self, scriptPath, rS, durationInSecs, mono, parList):
+        """Run processBlock over the selected range of the imported file block
+        by block. Returns memory-mapped views of the input and the output,
+        the sample rate and the files they map, so neither is held in memory"""
+        try:
+            reader = WavReader(self.importPath)
+        except (UnsupportedWavException, OSError) as e:
+            raise UserInputExeption('Streaming needs an uncompressed wav file', str(e))
+        start, stop = secondsToFrames(reader.sampleRate, rS, durationInSecs)
+        stop = min(stop, reader.numFrames)
+
+        # A float file is shown as it is, anything else (or a downmix) is
+        # shown from a float copy of the blocks the stream was fed
+        source = None
+        if not mono or reader.numChannels == 1:
+            try:
+                source = reader.view()
+            except UnsupportedWavException:
+                pass
+        self.removeStreamFiles(keep=self.streamFiles)
+        outputPath = self.newStreamFile('Output')
+        inputCopyPath = self.newStreamFile('Input') if source is None else None
+
+        if self.dspWorker is None:
+            self.dspWorker = DspWorker()
+        self.dspWorker.runStream(scriptPath, self.importPath, start, stop, mono,
+                                 self.streamBlockSize, outputPath, parList,
+                                 self.stageTimer, self.profileMode, inputCopyPath)
+        if source is None:
+            inS = WavReader(inputCopyPath).view()
+        else:
+            inS = source[..., start:stop]
+        streamFiles = [outputPath] + ([] if inputCopyPath is None else [inputCopyPath])
+        return inS, WavReader(outputPath).view(), reader.sampleRate, streamFiles
+
+    def newStreamFile(self, kind):
+        """Path of a new file in Assets for the streamed Input or Output"""
+        handle, path = tempfile.mkstemp(prefix=f'dspVisStream{kind}', suffix='.wav',
+                                        dir=self.srcTopLvlPath + '/Assets')
+        os.close(handle)
+        return path
+
+    def removeStreamFiles(self, keep=()):
+        """Remove the stream files in Assets that are not in keep"""
+        assetsPath = self.srcTopLvlPath + '/Assets'
+        for name in os.listdir(assetsPath):
+            path = os.path.join(assetsPath, name)
+            if name.startswith('dspVisStream') and name.endswith('.wav') and path not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Still mapped by a view, on Windows
+                    pass
+
+    def cancelWorker(self):
+        """Abort the job the DSP worker is running, see Run.cancelWith"""
+        if self.dspWorker is not None:
+            self.dspWorker.cancel()
+
+    def runAssetScript(self, inS, numChannels, numSamples, sampleRate, parList):
+        """Run applyUserCode.py in a fresh interpreter and return its output"""
+        timer = self.stageTimer
+        paramListPath = self.srcTopLvlPath + '/Assets/DSPVisParList.dat'
+        with timer.stage('pickleParameters'):
             datFile = open(paramListPath, 'wb')
             pickle.dump(parList, datFile)
             datFile.close()
 
-            # If user used a custom script make sure its context
-            # gets copied in the assetscript
-            assetScriptPath = self.srcTopLvlPath + '/Assets/userCode.py'
-            if self.userCodePath != assetScriptPath:
-                if not os.path.isfile(self.userCodePath):
-                    raise FilePathException('File path invalid or does not exist',
-                                            f'Chosen path: {self.userCodePath}')
-                with open(self.userCodePath, 'r') as i:
-                    userText = i.read()
-
-                with open(assetScriptPath, 'w') as i:
-                    i.write(userText)
-
-            # Save input ndarray as a binary
-            scriptPath = self.srcTopLvlPath + '/Assets/applyUserCode.py'
-
-            arrayFilePath = self.srcTopLvlPath + '/Assets/dspVisInputArray.txt'
-            pack_ndarray_to_file(self.inputS, arrayFilePath)
-            # Run asset scripts
-            args = [scriptPath, arrayFilePath, str(numChannels),
-                    str(numSamples), str(self.sampleRate),
-                    paramListPath]
-
+        # Save input ndarray as a binary
+        scriptPath = self.srcTopLvlPath + '/Assets/applyUserCode.py'
+
+        arrayFilePath = self.srcTopLvlPath + '/Assets/dspVisInputArray.txt'
+        with timer.stage('packInput'):
+            pack_ndarray_to_file(inS, arrayFilePath)
+        # The child writes the stages it timed here
+        stagesPath = self.srcTopLvlPath + '/Assets/DSPVisStages.json'
+        if os.path.isfile(stagesPath):
+            os.remove(stagesPath)
+        # Run asset scripts
+        args = [scriptPath, arrayFilePath, str(numChannels),
+                str(numSamples), str(sampleRate),
+                paramListPath]
+
+        with timer.stage('subprocess'):
             processCheck = subprocess.run(args, capture_output=True, text=True)
-            if processCheck.returncode != 0:
-                raise ScriptReturnCodeException(
-                                'Running the audio processing script failed',
-                                processCheck.stderr)
+        if processCheck.returncode != 0:
+            raise ScriptReturnCodeException(
+                            'Running the audio processing script failed',
+                            processCheck.stderr)
+        self.addChildStages(stagesPath)
+
+        with timer.stage('unpackOutput'):
+            return unpack_ndarray_from_file(arrayFilePath)
+
+    def addChildStages(self, stagesPath):
+        """Add the stages timed by applyUserCode.py to the run, plus the
+        part of the subprocess stage they don't cover (interpreter start
+        up and imports) as childStartup"""
+        if not os.path.isfile(stagesPath):
+            return
+        with open(stagesPath, 'r') as f:
+            childStages = json.load(f)
+        subprocessWall = self.stageTimer.stages[-1]['wallSeconds']
+        childWall = sum(s['wallSeconds'] for s in childStages)
+        self.stageTimer.addStages(childStages)
+        self.stageTimer.addStages([{'stage': 'childStartup',
+                                    'process': 'child',
+                                    'wallSeconds': max(subprocessWall - childWall, 0),
+                                    'cpuSeconds': None,
+                                    'peakRssBytes': None}])
+
+    def logStages(self):
+        """Append the stages of the last run to stageLogPath, if it is set"""
+        if self.stageLogPath is None:
+            return
+        self.stageTimer.writeJsonLine(self.stageLogPath,
+                                      file=self.importPath,
+                                      durationInSecs=self.durationInSecs,
+                                      sampleRate=self.sampleRate,
+                                      numChannels=1 if np.ndim(self.inputS) == 1 else len(self.inputS))
+
+    # === Background runs, so the window never freezes ===
+
+    def runInBackground(self, name, task, *args, onDone=None):
+        """Run task(run, *args) on the background runner, superseding the
+        previous run of name. onDone(result) is called on the Tk thread"""
+        self.showStatus(f'{name}: waiting')
+        return self.runner.submit(
+            name, task, *args,
+            onDone=lambda result: self.finishRun(name, result, onDone),
+            onError=lambda error, text: self.showStatus(f'{name}: failed', text),
+            onProgress=self.showProgress,
+            onCancelled=lambda run: self.showStatus(f'{name}: cancelled'))
+
+    def finishRun(self, name, result, onDone):
+        if result is False:
+            # The task printed why
+            self.showStatus(f'{name}: failed')
+            return
+        self.showStatus(f'{name}: done')
+        if onDone is not None:
+            onDone(result)
+
+    def showProgress(self, run, fraction, message):
+        text = run.name if message is None else f'{run.name}: {message}'
+        if fraction is not None:
+            text += f' ({100 * fraction:.0f}%)'
+        self.showStatus(text)
+
+    def showStatus(self, text, details=None):
+        """Show text in statusLabel, details only in the console"""
+        if details is not None:
+            print(f'{text}\n{details}')
+        if self.statusLabel is not None:
+            self.statusLabel.config(text=text)
+
+    # Function for cancelButton
+
+    def cancelRuns(self):
+        self.runner.cancel()
+
+    # Functions for processAudioButton, plotGainButton, sweepButton and realTimeButton.
+    # Tk widgets are only read here, on the Tk thread
+
+    def requestProcessing(self):
+        rS, rE, mono = self.rangeFrame.getValues()
+        try:
+            parList = self.getParameterList()
+        except UserInputExeption as e:
+            print(e)
+            return False
+        return self.runInBackground('Process Part', self.processInBackground,
+                                    rS, rE, mono, parList, onDone=self.useResult)
+
+    def processInBackground(self, run, rS, rE, mono, parList):
+        """renderPart for runInBackground. Returns the result, applied with
+        useResult on the Tk thread, or False if processing failed"""
+        return self.renderPart(None, None, rS, rE, mono, parList, run)
+
+    def useResult(self, result):
+        """Make a result of renderPart the current input and output.
+        Only called on the Tk thread, so the plots never see a new input
+        next to an old output"""
+        self.inputS = result['inputS']
+        self.output = result['output']
+        self.sampleRate = result['sampleRate']
+        self.durationInSecs = result['durationInSecs']
+        self.convertToMono = result['convertToMono']
+        self.streamFiles = result['streamFiles']
+        self.profileReport = result['profileReport']
+
+    def requestGainPlot(self):
+        if self.fileImported:
+            return self.runInBackground('Plot gain', self.gainInBackground,
+                                        onDone=lambda result: self.drawGain(*result))
 
-            # Delete the reference to the old ndarray
-            if self.output is not None:
-                del self.output
+    def gainInBackground(self, run):
+        """Gain curve of the current input and output, drawn by drawGain"""
+        run.checkpoint(0, 'Computing the gain')
+        inS, outS = self.inputS, self.output
+        return inS, outS, np.ndim(inS) == 1, self.gainCurve(inS, outS)
 
-            self.output = unpack_ndarray_from_file(arrayFilePath)
-            # Get rid of any previously created/processed arrays
-            gc.collect()
+    def requestSweep(self):
+        try:
+            parameterValues = self.getSweepValues()
         except UserInputExeption as e:
-            errorMsg = e.message
             print(e)
             return False
-        except ScriptReturnCodeException as e:
-            errorMsg = e.message
+        return self.runInBackground('Sweep parameters',
+                                    lambda run: self.sweepParameters(parameterValues, run))
+
+    def requestRealTimeCheck(self):
+        try:
+            parList = self.getParameterList()
+        except UserInputExeption as e:
             print(e)
             return False
-        except FilePathException as e:
-            errorMsg = e.message
+        return self.runInBackground('Real-time check',
+                                    lambda run: self.checkRealTime(parList, run))
+
+    # === Live mode ===
+
+    # Function for liveButton
+
+    def setLiveMode(self):
+        if self.liveAfterId is not None:
+            self.codeBox.after_cancel(self.liveAfterId)
+            self.liveAfterId = None
+        if self.liveMode:
+            self.liveMode = False
+        else:
+            self.liveMode = True
+            self.liveDebouncer.reset()
+            self.watchLiveInputs()
+
+    def watchLiveInputs(self):
+        """Poll the inputs of a render, and process them once they stop changing"""
+        self.liveAfterId = None
+        if not self.liveMode:
+            return
+        self.syncCodeBoxWithScript()
+        key = self.liveKey()
+        if key is not None:
+            key = self.liveDebouncer.update(key)
+        if key is not None:
+            self.renderLive(key)
+        self.liveAfterId = self.codeBox.after(self.livePollMs, self.watchLiveInputs)
+
+    def syncCodeBoxWithScript(self):
+        """Load the script into codeBox when it was changed outside the app"""
+        try:
+            stamp = os.stat(self.userCodePath).st_mtime_ns
+        except OSError:
+            return
+        if self.liveScriptStamp is not None and stamp != self.liveScriptStamp:
+            with open(self.userCodePath, 'r') as userPy:
+                if userPy.read() != self.codeBox.get('1.0', 'end-1c'):
+                    self.updateTextBox()
+        self.liveScriptStamp = stamp
+
+    def liveKey(self):
+        """RenderKey of the current inputs, None while they can't be processed"""
+        if not self.fileImported:
+            return None
+        try:
+            code = self.codeBox.get('1.0', 'end-1c')
+            rS, rE, mono = self.rangeFrame.getValues()
+            parList = self.getParameterList(code)
+            fileStamp = os.stat(self.importPath).st_mtime_ns
+        except (ValueError, OSError, UserInputExeption):
+            return None
+        if rS < 0 or rE <= rS:
+            return None
+        return renderKey(code, parList, rS, rE, mono, self.importPath, fileStamp,
+                         self.renderMode())
+
+    def renderLive(self, key):
+        """Show the render of key, from resultCache if it was done recently"""
+        cached = self.resultCache.get(key)
+        if cached is not None:
+            # A render still running would replace it when it is done
+            self.runner.cancel('Process Part')
+            self.useResult(cached)
+            self.showStatus('Live: recent render')
+            self.refreshOpenPlots()
+            return
+
+        try:
+            with open(self.userCodePath, 'r') as userPy:
+                scriptChanged = userPy.read() != self.codeBox.get('1.0', 'end-1c')
+        except OSError:
+            scriptChanged = True
+        if scriptChanged:
+            self.updateScriptFile()
+            self.liveScriptStamp = os.stat(self.userCodePath).st_mtime_ns
+        # key only holds a hash of the parameters. They are the ones of
+        # liveKey, the inputs have not changed since it was computed
+        self.runInBackground('Process Part', self.processInBackground,
+                             key.start, key.end, key.mono, self.getParameterList(),
+                             onDone=lambda result: self.keepLiveResult(key, result))
+
+    def keepLiveResult(self, key, result):
+        self.useResult(result)
+        self.resultCache.put(key, result)
+        self.refreshOpenPlots()
+
+    def refreshOpenPlots(self):
+        """Plot the gain again if its window is open"""
+        if plt.fignum_exists("Gain Over Time"):
+            self.requestGainPlot()
+
+    # ================= Plotting functions ======================
+
+    def plotTimeStep(self, numSamples):
+        """Time between two plotted samples, as in np.linspace(0, durationInSecs, numSamples)"""
+        return self.durationInSecs / max(numSamples - 1, 1)
+
+    def decodeSegment(self, path, offset, duration, mono, sampleRate):
+        """Decode duration secs of the audio file at path, starting at
+        offset, the same way batchCli does (see renderPipeline)"""
+        return decodeSegment(path, offset, duration, mono, sampleRate)
+
+    def loadWholeFile(self, path):
+        """Decode the whole audio file at path, keeping all its channels"""
+        return self.decodeSegment(path, 0, None, False, None)
+
+    # Plot the whole imported file
+
+    def plotOverview(self):
+        """Plot the whole imported file from its cached overview"""
+        try:
+            if not self.fileImported:
+                raise UserInputExeption("No audio file selected",
+                                        'Define path using the Choose File button')
+            if self.overviewCache is None:
+                self.overviewCache = OverviewCache(
+                    self.srcTopLvlPath + '/Assets/cache/overviews',
+                    self.loadWholeFile)
+            overview = self.overviewCache.get(self.importPath)
+        except UserInputExeption as e:
             print(e)
             return False
 
-    # ================= Plotting functions ======================
+        fig, ax = plt.subplots(1, 1, num="File Overview")
+        OverviewTrace(ax, overview, label="File")
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel("Sample value")
+        fig.show()
+
+        del fig, ax
+        gc.collect()
+        return True
 
     # Plot single waveform
 
@@ -355,14 +1065,14 @@ class DspVisualiser:
             inS = self.inputS
 
         if isMono:
-            x = np.linspace(0, self.durationInSecs, len(inS))
             fig, ax = plt.subplots(1, 1, num="Single Waveform")
-            ax.plot(x, inS, color='g', label="in")
+            DecimatedTrace(ax, inS, self.plotTimeStep(len(inS)),
+                           color='g', label="in")
             ax.set_xlabel("Time (s)")
             ax.set_ylabel("Sample value")
             fig.show()
 
-        del x, fig, ax
+            del fig, ax
         gc.collect()
 
     # Plot both inputS and output
@@ -381,16 +1091,40 @@ class DspVisualiser:
             isMono = self.convertToMono
 
         if isMono:
-            x = np.linspace(0, self.durationInSecs, len(self.inputS))
+            timeStep = self.plotTimeStep(len(self.inputS))
             fig, ax = plt.subplots(1, 1, num="Stacked Waveforms")
-            ax.plot(x, wave1, color='g', label=label1)
-            ax.plot(x, wave2, color='b', label=label2)
+            DecimatedTrace(ax, wave1, timeStep, color='g', label=label1)
+            DecimatedTrace(ax, wave2, timeStep, color='b', label=label2)
 
             fig.show()
 
-            del x, fig, ax
+            del fig, ax
             gc.collect()
 
+    # Function for streamingButton
+
+    def setStreamingMode(self):
+        if self.streamingMode:
+            self.streamingMode = False
+        else:
+            self.streamingMode = True
+
+    # Function for chunkedRenderButton
+
+    def setChunkedRender(self):
+        if self.chunkedRender:
+            self.chunkedRender = False
+        else:
+            self.chunkedRender = True
+
+    # Function for profileButton
+
+    def setProfileMode(self):
+        if self.profileMode:
+            self.profileMode = False
+        else:
+            self.profileMode = True
+
     # Function for includeWavesInGainPlotButton
 
     def setIncludeWavesInGain(self):
@@ -399,6 +1133,12 @@ class DspVisualiser:
         else:
             self.includeWavesInGainPlot = True
 
+    # Function for gainModeButton
+
+    def setGainMode(self, mode):
+        self.gainMode = mode
+        self.gainModeButton.config(text=f'Gain: {mode}')
+
     # Function that calculates gain reduction applied to the signal
 
     def plotGain(self, inS=None, outS=None, isMono=None):
@@ -415,41 +1155,201 @@ class DspVisualiser:
             isMono = self.convertToMono
 
         if self.fileImported:
-            if isMono:
-                g = np.zeros(len(inS))
-
-                # FIXME: Fix true_division issue
-                for sample in range(len(inS)):
-                    if inS[sample] != 0:
-                        g[sample] = outS[sample] / inS[sample]
-                    else:
-                        g[sample] = g[sample - 1]
-
-                x = np.linspace(0, self.durationInSecs, len(inS))
-
-                if self.includeWavesInGainPlot:
-                    fig, ax = plt.subplots(
-                        2, 1, sharex=True, num="Gain Over Time")
-                    ax[0].plot(x, g, color='r', label='Gain Reduction')
-                    ax[0].set_ylabel("Gain value")
-                    ax[1].plot(x, inS, color='g', label='y1')
-                    ax[1].plot(x, outS, color='b', label='y2')
-                    ax[1].set_ylabel("Sample value")
-                    plt.xlabel("Time (s)")
-                    plt.legend()
-                    plt.show()
-                    del fig, ax, x, g
-                    gc.collect()
+            self.drawGain(inS, outS, isMono, self.gainCurve(inS, outS))
+
+    def gainCurve(self, inS, outS):
+        """Gain of outS over inS for the current gainMode.
+        Returns the gain, its time step and offset (secs) and its label"""
+        if self.gainMode == 'sample':
+            return (computeGain(inS, outS), self.plotTimeStep(np.shape(inS)[-1]),
+                    0, "Gain value")
+        centers, g = computeGainReduction(inS, outS,
+                                          self.gainWindowSize,
+                                          self.gainHopSize,
+                                          self.gainMode)
+        return (g, self.gainHopSize / self.sampleRate,
+                centers[0] / self.sampleRate, "Gain reduction (dB)")
+
+    def drawGain(self, inS, outS, isMono, curve):
+        """Plot a gainCurve, with the waveforms if includeWavesInGainPlot"""
+        g, gStep, gOffset, gainLabel = curve
+        timeStep = self.plotTimeStep(np.shape(inS)[-1])
+        gainColor = 'r' if isMono else None
 
-                else:
-                    fig, ax = plt.subplots(1, 1, num="Gain Over Time")
-                    ax.plot(x, g, color='r', label='Gain')
-                    plt.xlabel("Time (s)")
-                    plt.ylabel("Gain Value")
-                    plt.legend()
-                    plt.show()
-                    del fig, ax, x, g
-                    gc.collect()
+        if self.includeWavesInGainPlot:
+            fig, ax = plt.subplots(
+                2, 1, sharex=True, num="Gain Over Time", clear=True)
+            DecimatedTrace(ax[0], g, gStep, gOffset,
+                           color=gainColor, label='Gain Reduction')
+            ax[0].set_ylabel(gainLabel)
+            DecimatedTrace(ax[1], inS, timeStep, color='g', label='y1')
+            DecimatedTrace(ax[1], outS, timeStep, color='b', label='y2')
+            ax[1].set_ylabel("Sample value")
+            plt.xlabel("Time (s)")
+            plt.legend()
+            plt.show()
+            del fig, ax, g
+            gc.collect()
+
+        else:
+            fig, ax = plt.subplots(1, 1, num="Gain Over Time", clear=True)
+            DecimatedTrace(ax, g, gStep, gOffset,
+                           color=gainColor, label='Gain')
+            plt.xlabel("Time (s)")
+            plt.ylabel(gainLabel)
+            plt.legend()
+            plt.show()
+            del fig, ax, g
+            gc.collect()
+
+    def plotAutomation(self, parList=None, outS=None):
+        """Plot the automated parameters over the processed part, as the
+        user code gets them, above the output"""
+        if outS is None:
+            outS = self.output
+
+        if self.fileImported:
+            try:
+                if parList is None:
+                    parList = self.getParameterList()
+                envelopes = {} if not isinstance(parList, dict) else {
+                    name: value for name, value in parList.items() if isinstance(value, Envelope)}
+                if not envelopes:
+                    raise UserInputExeption('No automated parameters',
+                                            "Declare a float parameter with 'automation': 'sample' or 'block'")
+            except UserInputExeption as e:
+                print(e)
+                return False
+            numSamples = np.shape(outS)[-1]
+            timeStep = self.plotTimeStep(numSamples)
+
+            fig, ax = plt.subplots(len(envelopes) + 1, 1, sharex=True, num="Automation", clear=True)
+            for axis, (name, envelope) in zip(ax, envelopes.items()):
+                DecimatedTrace(axis, envelope.perSample(numSamples, self.sampleRate),
+                               timeStep, label=f'{name} ({envelope.mode})')
+                axis.set_ylabel(name)
+                axis.legend()
+            DecimatedTrace(ax[-1], outS, timeStep, color='b', label='y2')
+            ax[-1].set_ylabel("Sample value")
+            plt.xlabel("Time (s)")
+            plt.show()
+            del fig, ax
+            gc.collect()
+
+    def plotFrequencyResponse(self, inS=None, outS=None):
+        """Plot magnitude, phase and coherence of the transfer function
+        between the input and the processed output"""
+        if inS is None:
+            inS = self.inputS
+        if outS is None:
+            outS = self.output
+
+        if self.fileImported:
+            try:
+                self.frequencyResponse = transferFunction(inS, outS, self.sampleRate,
+                                                          self.responseFftSize)
+            except ValueError as e:
+                print(UserInputExeption('Process the selected part before plotting its response',
+                                        str(e)))
+                return False
+            response = self.frequencyResponse
+            # No DC on a log axis
+            freqs = response['frequencies'][1:]
+            labels = ['Mono'] if np.ndim(inS) == 1 else [f'Channel {c + 1}' for c in range(len(inS))]
+
+            fig, ax = plt.subplots(3, 1, sharex=True, num="Frequency Response")
+            for i, label in enumerate(labels):
+                channel = i if np.ndim(inS) > 1 else Ellipsis
+                ax[0].semilogx(freqs, response['magnitudeDb'][channel][1:], label=label)
+                ax[1].semilogx(freqs, np.degrees(response['phase'][channel][1:]), label=label)
+                ax[2].semilogx(freqs, response['coherence'][channel][1:], label=label)
+            ax[0].set_ylabel("Magnitude (dB)")
+            ax[1].set_ylabel("Phase (deg)")
+            ax[2].set_ylabel("Coherence")
+            ax[2].set_ylim(0, 1.05)
+            plt.xlabel("Frequency (Hz)")
+            ax[0].legend()
+            plt.show()
+            del fig, ax
+            gc.collect()
+
+    def plotImpulseResponse(self, inS=None, outS=None):
+        """Deconvolve the processed test signal and plot the impulse
+        response and frequency response of the user code"""
+        if inS is None:
+            inS = self.inputS
+        if outS is None:
+            outS = self.output
+
+        if self.fileImported:
+            try:
+                irLength = min(np.shape(inS)[-1], self.sampleRate)
+                self.impulseResponse = deconvolve(inS, outS, irLength)
+            except ValueError as e:
+                print(UserInputExeption('Process the selected part before plotting its response',
+                                        str(e)))
+                return False
+            freqs, magnitudeDb, _ = impulseResponseSpectrum(self.impulseResponse,
+                                                            self.sampleRate)
+            time = np.arange(irLength) / self.sampleRate
+            labels = ['Mono'] if np.ndim(inS) == 1 else [f'Channel {c + 1}' for c in range(len(inS))]
+
+            fig, ax = plt.subplots(2, 1, num="Impulse Response")
+            for i, label in enumerate(labels):
+                channel = i if np.ndim(inS) > 1 else Ellipsis
+                ax[0].plot(time, self.impulseResponse[channel], label=label)
+                ax[1].semilogx(freqs[1:], magnitudeDb[channel][1:], label=label)
+            ax[0].set_xlabel("Time (s)")
+            ax[0].set_ylabel("Sample value")
+            ax[1].set_xlabel("Frequency (Hz)")
+            ax[1].set_ylabel("Magnitude (dB)")
+            ax[0].legend()
+            plt.show()
+            del fig, ax
+            gc.collect()
+
+    def plotSpectrograms(self, inS=None, outS=None):
+        """Plot the spectrograms of input and output, and their
+        difference in dB (output - input)"""
+        if inS is None:
+            inS = self.inputS
+        if outS is None:
+            outS = self.output
+
+        if self.fileImported:
+            if np.shape(inS) != np.shape(outS):
+                print(UserInputExeption('Process the selected part before plotting its spectrogram',
+                                        f'Input shape {np.shape(inS)}, output shape {np.shape(outS)}'))
+                return False
+            settings = (self.spectrogramFftSize, self.spectrogramHopSize, self.spectrogramWindow)
+            inPower, framesPerColumn = self.spectrogramCache.get(inS, *settings)
+            outPower, _ = self.spectrogramCache.get(outS, *settings)
+            # Channels are shown together, as the mean of their power
+            if inPower.ndim == 3:
+                inPower = inPower.mean(axis=0)
+                outPower = outPower.mean(axis=0)
+            inDb = toDb(inPower)
+            outDb = toDb(outPower)
+            top = max(inDb.max(), outDb.max())
+            columnTime = framesPerColumn * self.spectrogramHopSize / self.sampleRate
+            nyquist = self.sampleRate / 2
+
+            fig, ax = plt.subplots(3, 1, sharex=True, sharey=True, num="Spectrogram")
+            for axis, image, title in [(ax[0], inDb, 'Input'), (ax[1], outDb, 'Output')]:
+                trace = SpectrogramImage(axis, image, columnTime, nyquist, cmap='magma',
+                                         vmin=top - self.spectrogramRangeDb, vmax=top)
+                fig.colorbar(trace.artist, ax=axis, label='dB')
+                axis.set_title(title)
+                axis.set_ylabel("Frequency (Hz)")
+            trace = SpectrogramImage(ax[2], outDb - inDb, columnTime, nyquist, cmap='coolwarm',
+                                     vmin=-self.diffRangeDb, vmax=self.diffRangeDb)
+            fig.colorbar(trace.artist, ax=ax[2], label='dB')
+            ax[2].set_title('Output - Input')
+            ax[2].set_ylabel("Frequency (Hz)")
+            plt.xlabel("Time (s)")
+            plt.show()
+            del fig, ax
+            gc.collect()
 
     def initGUI(self, window=None):
         if window is None:
@@ -464,6 +1364,16 @@ class DspVisualiser:
         self.chooseFileButton = Button(
             window, text='Choose File', command=self.chooseFile)
         self.chooseFileButton.place(x=20, y=10, width=135, height=30)
+        self.plotOverviewButton = Button(
+            window, text='Plot overview', command=self.plotOverview)
+        self.plotOverviewButton.place(x=170, y=10, width=135, height=30)
+        self.testSignalButton = Menubutton(window, text='Test signal')
+        self.testSignalMenu = Menu(self.testSignalButton, tearoff=0)
+        for kind in TEST_SIGNALS:
+            self.testSignalMenu.add_command(
+                label=kind, command=lambda k=kind: self.useTestSignal(k))
+        self.testSignalButton.config(menu=self.testSignalMenu)
+        self.testSignalButton.place(x=320, y=10, width=135, height=30)
         # Render Range
         self.rangeFrame = RenderRangeFrame(window)
         self.rangeFrame.draw(20, 50, 150, 50)
@@ -476,12 +1386,66 @@ class DspVisualiser:
         self.p3Frame.draw(360, 48, 40, 75)
         self.p4Frame = ParameterFrame(window, 4)
         self.p4Frame.draw(420, 48, 40, 75)
+        # Parameters declared by the user script, replace P1-P4
+        self.parameterTable = ParameterTableFrame(window)
+        self.parameterTable.draw(20, 340, 460, 540)
 
         # ================= File processing options ===============
         self.processAudioButton = Button(
-            window, text='Process Part', command=self.processAudio)
+            window, text='Process Part', command=self.requestProcessing)
         self.processAudioButton.place(x=20, y=110, width=150, height=25)
 
+        self.sweepButton = Button(
+            window, text='Sweep parameters', command=self.requestSweep)
+        self.sweepButton.place(x=20, y=195, width=150, height=25)
+
+        self.chunkedRenderButton = Checkbutton(
+            window, text='Parallel', command=self.setChunkedRender)
+        self.chunkedRenderButton.place(x=180, y=195, width=80, height=25)
+
+        self.profileButton = Checkbutton(
+            window, text='Profile', command=self.setProfileMode)
+        self.profileButton.place(x=270, y=195, width=70, height=25)
+
+        self.liveButton = Checkbutton(
+            window, text='Live', command=self.setLiveMode)
+        self.liveButton.place(x=350, y=195, width=60, height=25)
+
+        self.realTimeButton = Button(
+            window, text='Real-time check', command=self.requestRealTimeCheck)
+        self.realTimeButton.place(x=20, y=230, width=150, height=25)
+
+        self.plotResponseButton = Button(
+            window, text='Frequency response', command=self.plotFrequencyResponse)
+        self.plotResponseButton.place(x=180, y=230, width=150, height=25)
+
+        self.plotImpulseButton = Button(
+            window, text='Impulse response', command=self.plotImpulseResponse)
+        self.plotImpulseButton.place(x=340, y=230, width=140, height=25)
+
+        self.plotSpectrogramButton = Button(
+            window, text='Spectrogram', command=self.plotSpectrograms)
+        self.plotSpectrogramButton.place(x=20, y=265, width=150, height=25)
+
+        self.clearCacheButton = Button(
+            window, text='Clear render cache', command=self.clearRenderCache)
+        self.clearCacheButton.place(x=180, y=265, width=150, height=25)
+
+        self.plotAutomationButton = Button(
+            window, text='Plot automation', command=self.plotAutomation)
+        self.plotAutomationButton.place(x=340, y=265, width=140, height=25)
+
+        self.cancelButton = Button(
+            window, text='Cancel', command=self.cancelRuns)
+        self.cancelButton.place(x=20, y=300, width=150, height=25)
+
+        self.statusLabel = Label(window, text='Ready')
+        self.statusLabel.place(x=180, y=300, width=300, height=25)
+
+        self.streamingButton = Checkbutton(
+            window, text='Stream', command=self.setStreamingMode)
+        self.streamingButton.place(x=180, y=110, width=55, height=25)
+
         # ===================== Code Entry ====================
         self.codeBox = ScrolledText()
         self.codeBox.place(x=500, y=100, width=670, height=400)
@@ -508,16 +1472,33 @@ class DspVisualiser:
         self.wavesInGainButton.place(x=50, y=150, width=20, height=20)
 
         self.plotGainButton = Button(
-            window, text='Plot gain over time', command=self.plotGain)
+            window, text='Plot gain over time', command=self.requestGainPlot)
         self.plotGainButton.place(x=120, y=150, width=200, height=35)
 
+        self.gainModeButton = Menubutton(
+            window, text='Gain: sample', activebackground='blue')
+        self.gainModeMenu = Menu(self.gainModeButton, tearoff=0)
+        for mode in ('sample', 'rms', 'peak'):
+            self.gainModeMenu.add_command(
+                label=mode, command=lambda m=mode: self.setGainMode(m))
+        self.gainModeButton.config(menu=self.gainModeMenu)
+        self.gainModeButton.place(x=330, y=150, width=130, height=35)
+
     def initiate(self):
         self.initPaths()
         self.mainWindow = Tk()
         self.initGUI()
         self.initAssetScripts()
+        transport = ArrayTransport(self.srcTopLvlPath + '/Assets')
+        self.dspWorker = DspWorker(transport)
+        self.dspWorker.start()
         self.updateTextBox()
+        self.runner.start(self.mainWindow)
         self.mainWindow.mainloop()
+        self.runner.shutdown()
+        self.dspWorker.stop()
+        transport.cleanUp()
+        self.removeStreamFiles()
         self.initAssetScripts()
 
 
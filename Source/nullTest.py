@@ -0,0 +1,213 @@
+"""
+================================== USAGE ===============================
+
+Null test of a render against a reference render of the same input:
+
+    python Source/nullTest.py REFERENCE.wav TEST.wav [--threshold DB]
+        [--difference DIFF.wav]
+
+Prints the difference metrics and exits with 1 when the peak error is
+above the threshold (dBFS), so a refactoring of the user's code can be
+checked in CI. batchCli does the same for a whole batch with --reference.
+
+===============================================================================
+
+NullTest accumulates the metrics block by block: every block is
+subtracted once (in float64, so the difference itself is exact) and the
+error energy, reference energy and peak error are updated from that one
+difference. compareSignals runs it over arrays, compareFiles over two
+memory-mapped .wav files, so renders that don't fit in memory can be
+compared too.
+
+The latency is the lag of the peak of the cross-correlation of the first
+latencyWindow samples (mono), positive when the test render is late.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+sys.path.append('./')
+from Source.wavReader import WavReader, WavWriter
+
+DEFAULT_THRESHOLD_DB = -96
+DEFAULT_MAX_LAG = 4800
+LATENCY_WINDOW = 1 << 16
+BLOCK_SIZE = 1 << 18
+
+
+def powerToDb(power):
+    """10 log10(power), -inf for silence"""
+    with np.errstate(divide='ignore'):
+        return float(10 * np.log10(power))
+
+
+def correlationLatency(reference, test, maxLag=DEFAULT_MAX_LAG):
+    """Lag (samples, at most maxLag either way) that best aligns test with
+    reference, and the normalized correlation at that lag (negative when
+    the polarity is inverted). (None, nan) when either one is silent"""
+    reference = np.asarray(reference, dtype=np.float64)
+    test = np.asarray(test, dtype=np.float64)
+    energy = np.sqrt(np.dot(reference, reference) * np.dot(test, test))
+    if energy == 0:
+        return None, np.nan
+    maxLag = min(maxLag, len(reference) - 1)
+    # Long enough for a linear (not circular) correlation
+    fftSize = 1 << int(np.ceil(np.log2(len(reference) + maxLag)))
+    correlation = np.fft.irfft(np.conj(np.fft.rfft(reference, fftSize))
+                               * np.fft.rfft(test, fftSize), fftSize)
+    lags = np.arange(-maxLag, maxLag + 1)
+    candidates = correlation[lags]
+    best = np.argmax(np.abs(candidates))
+    return int(lags[best]), float(candidates[best] / energy)
+
+
+class NullTest:
+    def __init__(self, maxLag=DEFAULT_MAX_LAG, latencyWindow=LATENCY_WINDOW):
+        self.maxLag = maxLag
+        self.latencyWindow = latencyWindow
+        self.numFrames = 0
+        self.numSamples = 0
+        self.referenceEnergy = 0.0
+        self.errorEnergy = 0.0
+        self.peakError = 0.0
+        self.peakErrorFrame = 0
+        self.latencyReference = []
+        self.latencyTest = []
+        self.latencyFrames = 0
+
+    def update(self, reference, test):
+        """Add the next block of both renders, shaped (numSamples,) or
+        (numChannels, numSamples). Returns the difference test - reference"""
+        reference = np.asarray(reference, dtype=np.float64)
+        test = np.asarray(test, dtype=np.float64)
+        if reference.shape != test.shape:
+            raise ValueError(f'Reference shape {reference.shape} does not match '
+                             f'test shape {test.shape}')
+        difference = test - reference
+        magnitude = np.abs(difference)
+
+        self.referenceEnergy += float(np.vdot(reference, reference))
+        self.errorEnergy += float(np.vdot(difference, difference))
+        if magnitude.size:
+            peak = np.unravel_index(np.argmax(magnitude), magnitude.shape)
+            if magnitude[peak] > self.peakError:
+                self.peakError = float(magnitude[peak])
+                self.peakErrorFrame = self.numFrames + int(peak[-1])
+
+        if self.latencyFrames < self.latencyWindow:
+            needed = self.latencyWindow - self.latencyFrames
+            self.latencyReference.append(np.atleast_2d(reference)[:, :needed].mean(axis=0))
+            self.latencyTest.append(np.atleast_2d(test)[:, :needed].mean(axis=0))
+            self.latencyFrames += len(self.latencyReference[-1])
+
+        self.numFrames += difference.shape[-1]
+        self.numSamples += difference.size
+        return difference
+
+    def result(self):
+        """Metrics of everything added so far. Errors are in dBFS"""
+        latency, correlation = None, np.nan
+        if self.latencyFrames:
+            latency, correlation = correlationLatency(np.concatenate(self.latencyReference),
+                                                      np.concatenate(self.latencyTest),
+                                                      self.maxLag)
+        numSamples = max(self.numSamples, 1)
+        if self.errorEnergy == 0:
+            snrDb = np.inf
+        else:
+            snrDb = powerToDb(self.referenceEnergy / self.errorEnergy)
+        return {'numFrames': self.numFrames,
+                'peakErrorDb': powerToDb(self.peakError ** 2),
+                'rmsErrorDb': powerToDb(self.errorEnergy / numSamples),
+                'snrDb': snrDb,
+                'maxSampleOffset': self.peakError,
+                'maxOffsetFrame': self.peakErrorFrame,
+                'latencySamples': latency,
+                'correlation': correlation}
+
+
+def compareSignals(reference, test, maxLag=DEFAULT_MAX_LAG, blockSize=BLOCK_SIZE):
+    """Null test of two arrays shaped like the output of userCode.
+    Returns the metrics of NullTest.result and the difference signal"""
+    reference = np.asarray(reference)
+    test = np.asarray(test)
+    if reference.shape != test.shape:
+        raise ValueError(f'Reference shape {reference.shape} does not match '
+                         f'test shape {test.shape}')
+    nullTest = NullTest(maxLag)
+    difference = np.empty(test.shape, dtype=np.result_type(reference, test, np.float32))
+    for start in range(0, test.shape[-1], blockSize):
+        stop = start + blockSize
+        difference[..., start:stop] = nullTest.update(reference[..., start:stop],
+                                                      test[..., start:stop])
+    return nullTest.result(), difference
+
+
+def compareFiles(referencePath, testPath, differencePath=None,
+                 maxLag=DEFAULT_MAX_LAG, blockSize=BLOCK_SIZE):
+    """Null test of two .wav files, read block by block. The difference
+    signal is written to differencePath if one is given"""
+    reference = WavReader(referencePath)
+    test = WavReader(testPath)
+    if (reference.numChannels, reference.numFrames) != (test.numChannels, test.numFrames):
+        raise ValueError(f'{referencePath} has {reference.numChannels} channels and '
+                         f'{reference.numFrames} frames, {testPath} has '
+                         f'{test.numChannels} channels and {test.numFrames} frames')
+    nullTest = NullTest(maxLag)
+    writer = None
+    if differencePath is not None:
+        writer = WavWriter(differencePath, test.numChannels, test.sampleRate)
+    try:
+        for start in range(0, test.numFrames, blockSize):
+            difference = nullTest.update(reference.read(start, start + blockSize),
+                                         test.read(start, start + blockSize))
+            if writer is not None:
+                writer.write(difference)
+    finally:
+        if writer is not None:
+            writer.close()
+    return nullTest.result()
+
+
+def passesNullTest(result, thresholdDb=DEFAULT_THRESHOLD_DB):
+    """True if the peak error of result is at most thresholdDb (dBFS)"""
+    return result['peakErrorDb'] <= thresholdDb
+
+
+def formatResult(result):
+    lines = []
+    for key, value in result.items():
+        if isinstance(value, float):
+            value = f'{value:.3f}' if abs(value) >= 1e-3 or value == 0 else f'{value:.3e}'
+        lines.append(f'{key:>16}: {value}')
+    return '\n'.join(lines)
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(
+        description='Compare a render of the user code against a reference render')
+    parser.add_argument('reference', help='Reference .wav file')
+    parser.add_argument('test', help='.wav file to check')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD_DB,
+                        help='Highest peak error (dBFS) that still passes')
+    parser.add_argument('--difference', default=None,
+                        help='Write the difference signal to this .wav file')
+    parser.add_argument('--max-lag', type=int, default=DEFAULT_MAX_LAG,
+                        help='Longest latency looked for (samples)')
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    result = compareFiles(args.reference, args.test, args.difference, args.max_lag)
+    print(formatResult(result))
+    if passesNullTest(result, args.threshold):
+        print(f'Passed, peak error below {args.threshold} dBFS')
+        return 0
+    print(f'Failed, peak error above {args.threshold} dBFS')
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Cached multi-resolution overviews (peak pyramids) of audio files.
+
+For every block size an overview keeps the min, max and RMS of each block
+of the file. Overviews are saved in a cache directory, one file per audio
+path, and rebuilt only when the audio file's mtime or size change, so
+plotting and zooming around a file does not need to decode it again.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from Source.waveformDecimation import DecimatedTrace, reduceMinMax
+
+OVERVIEW_BLOCK_SIZES = (256, 4096, 65536)
+
+
+def computeBlockStats(signal, blockSize):
+    """Return min, max, sum of squares and sample count of every
+    blockSize samples of signal (numChannels, numSamples)"""
+    numSamples = signal.shape[-1]
+    starts = np.arange(0, numSamples, blockSize)
+    lows = np.minimum.reduceat(signal, starts, axis=-1)
+    highs = np.maximum.reduceat(signal, starts, axis=-1)
+    energy = np.add.reduceat(np.square(signal, dtype=np.float64), starts, axis=-1)
+    counts = np.diff(np.append(starts, numSamples))
+    return lows, highs, energy, counts
+
+
+def mergeBlockStats(stats, factor):
+    """Combine every factor blocks of stats into one bigger block"""
+    lows, highs, energy, counts = stats
+    starts = np.arange(0, lows.shape[-1], factor)
+    return (np.minimum.reduceat(lows, starts, axis=-1),
+            np.maximum.reduceat(highs, starts, axis=-1),
+            np.add.reduceat(energy, starts, axis=-1),
+            np.add.reduceat(counts, starts))
+
+
+class WaveformOverview:
+    def __init__(self, sampleRate, numSamples, levels):
+        """levels maps each block size to a dict with 'min', 'max'
+        and 'rms' arrays shaped (numChannels, numBlocks)"""
+        self.sampleRate = sampleRate
+        self.numSamples = numSamples
+        self.levels = levels
+
+    @classmethod
+    def fromSignal(cls, signal, sampleRate, blockSizes=OVERVIEW_BLOCK_SIZES):
+        signal = np.atleast_2d(signal)
+        blockSizes = sorted(blockSizes)
+        baseSize = blockSizes[0]
+        for blockSize in blockSizes:
+            if blockSize % baseSize != 0:
+                raise ValueError(f'Block size {blockSize} is not a multiple of {baseSize}')
+
+        # Scan the signal in chunks to avoid squaring all of it at once
+        chunkSize = baseSize * 4096
+        chunks = [computeBlockStats(signal[..., i:i + chunkSize], baseSize)
+                  for i in range(0, signal.shape[-1], chunkSize)]
+        stats = tuple(np.concatenate(part, axis=-1) for part in zip(*chunks))
+
+        # Every bigger level is built from the previous one
+        levels = {}
+        previousSize = baseSize
+        for blockSize in blockSizes:
+            stats = mergeBlockStats(stats, blockSize // previousSize)
+            previousSize = blockSize
+            lows, highs, energy, counts = stats
+            levels[blockSize] = {'min': lows,
+                                 'max': highs,
+                                 'rms': np.sqrt(energy / counts).astype(np.float32)}
+        return cls(sampleRate, signal.shape[-1], levels)
+
+    def chooseBlockSize(self, start, stop, numBuckets):
+        """Coarsest level that still has numBuckets blocks in the range"""
+        blockSizes = sorted(self.levels)
+        for blockSize in reversed(blockSizes):
+            if (stop - start) / blockSize >= numBuckets:
+                return blockSize
+        return blockSizes[0]
+
+    def getRange(self, start, stop, numBuckets):
+        """Min/max points of samples start to stop, like minMaxDecimate"""
+        stop = min(stop, self.numSamples)
+        start = max(0, min(start, stop))
+        blockSize = self.chooseBlockSize(start, stop, numBuckets)
+        level = self.levels[blockSize]
+        first = start // blockSize
+        last = max(-(-stop // blockSize), first + 1)
+        last = min(last, level['min'].shape[-1])
+
+        if last - first <= numBuckets:
+            lows = level['min'][..., first:last]
+            highs = level['max'][..., first:last]
+            indices = np.repeat(np.arange(first, last) + 0.5, 2)
+            values = np.stack([lows, highs], axis=-1).reshape(lows.shape[:-1] + (-1,))
+        else:
+            indices, values = reduceMinMax(level['min'], level['max'],
+                                           first, last, numBuckets)
+            indices = indices + 0.5
+        return indices * blockSize, values
+
+
+class OverviewTrace(DecimatedTrace):
+    def __init__(self, ax, overview, numBuckets=None, **plotKwargs):
+        """Plot a WaveformOverview on ax, refining it from its levels on zoom"""
+        self.overview = overview
+        super().__init__(ax, None, 1 / overview.sampleRate,
+                         numBuckets=numBuckets, **plotKwargs)
+
+    def totalSamples(self):
+        return self.overview.numSamples
+
+    def decimate(self, start, stop):
+        indices, values = self.overview.getRange(start, stop, self.bucketCount())
+        return indices * self.timeStep, values
+
+
+class OverviewCache:
+    def __init__(self, cacheDir, loadAudio, blockSizes=OVERVIEW_BLOCK_SIZES):
+        """loadAudio(path) must return (signal, sampleRate) of the whole file"""
+        self.cacheDir = cacheDir
+        self.loadAudio = loadAudio
+        self.blockSizes = tuple(sorted(blockSizes))
+        # Overviews already used in this session, by path
+        self.overviews = {}
+
+    def cacheFilePath(self, path):
+        name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(self.cacheDir, name + '.npz')
+
+    def get(self, path):
+        """Return the WaveformOverview of path, building it only if needed"""
+        stat = os.stat(path)
+        fileKey = (stat.st_mtime_ns, stat.st_size)
+
+        if path in self.overviews and self.overviews[path][0] == fileKey:
+            return self.overviews[path][1]
+
+        overview = self.read(path, fileKey)
+        if overview is None:
+            signal, sampleRate = self.loadAudio(path)
+            overview = WaveformOverview.fromSignal(signal, sampleRate,
+                                                   self.blockSizes)
+            self.write(path, fileKey, overview)
+
+        self.overviews[path] = (fileKey, overview)
+        return overview
+
+    def read(self, path, fileKey):
+        cacheFile = self.cacheFilePath(path)
+        if not os.path.isfile(cacheFile):
+            return None
+        with np.load(cacheFile) as data:
+            if (tuple(data['fileKey']) != fileKey
+                    or tuple(data['blockSizes']) != self.blockSizes):
+                return None
+            levels = {}
+            for blockSize in self.blockSizes:
+                levels[blockSize] = {stat: data[f'{stat}{blockSize}']
+                                     for stat in ('min', 'max', 'rms')}
+            return WaveformOverview(int(data['sampleRate']),
+                                    int(data['numSamples']), levels)
+
+    def write(self, path, fileKey, overview):
+        os.makedirs(self.cacheDir, exist_ok=True)
+        arrays = {'fileKey': np.array(fileKey),
+                  'blockSizes': np.array(self.blockSizes),
+                  'sampleRate': overview.sampleRate,
+                  'numSamples': overview.numSamples}
+        for blockSize, level in overview.levels.items():
+            for stat, values in level.items():
+                arrays[f'{stat}{blockSize}'] = values
+
+        # Write next to the final file and swap, so a crash never leaves half a cache file
+        cacheFile = self.cacheFilePath(path)
+        tempFile = cacheFile + '.tmp'
+        with open(tempFile, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tempFile, cacheFile)
@@ -1,6 +1,8 @@
 from tkinter import Tk, Menubutton, Menu, Frame, StringVar
 from tkinter.ttk import Entry, Label
 
+from Source.parameterSchema import parseSchema, parseSweepText
+
 class ParameterFrame:
     parent = Tk
     paramNumber = 1
@@ -49,6 +51,19 @@ class ParameterFrame:
             p = self.param.get()
             return float(p.strip())
 
+    def getValues(self):
+        """Values to sweep, parsed like those of a declared parameter (see
+        parseSweepText): a single value, a comma separated list (0.5, 1, 2)
+        or start:stop:count for evenly spaced values"""
+        if self.choice == 0:
+            return [0]
+        return parseSweepText(self.getSpec(), self.param.get())
+
+    def getSpec(self):
+        """This parameter as an int or float parameter of parameterSchema"""
+        return parseSchema([{'name': f'p{self.paramNumber}',
+                             'type': 'int' if self.choice == 1 else 'float'}])[0]
+
     def setChoice0(self):
         self.choice = 0
         self.label.config(text='Off')
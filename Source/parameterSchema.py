@@ -0,0 +1,265 @@
+"""
+Declared parameters of the user script.
+
+Instead of the four scalars p1-p4, a script can declare any number of
+typed parameters in a PARAMETERS list at the top level of the script:
+
+    PARAMETERS = [
+        {'name': 'gain', 'type': 'float', 'range': (0, 2), 'default': 1},
+        {'name': 'order', 'type': 'int', 'range': (1, 8), 'default': 2},
+        {'name': 'bypass', 'type': 'bool'},
+        {'name': 'taps', 'type': 'array', 'default': [0.5, 0.5]},
+        {'name': 'bands', 'type': 'array', 'shape': (None, 3)},
+        {'name': 'cutoff', 'type': 'float', 'default': 1000, 'automation': 'sample'},
+    ]
+
+Its userCode (and processBlock) then gets them as keyword arguments:
+
+    def userCode(input, numChannels, numSamples, sampleRate, gain, order, bypass, taps, bands)
+
+Arrays are numpy arrays (float64 unless the parameter has a dtype), and
+shape may use None for a free dimension. range bounds scalars and every
+element of an array. Float parameters with an automation mode (and
+optionally a blockSize) take an Envelope of breakpoints and reach the
+user code as the rendered curve, see automation.
+
+The declaration is read from the source with ast.literal_eval, so the
+GUI never imports the user's code. Values travel as a dict of name ->
+value inside the jobs of the DSP worker and the pools, so nothing goes
+through a parameter file. A plain list is still taken as p1-p4 and
+passed positionally.
+"""
+import ast
+import hashlib
+
+import numpy as np
+
+from Source.automation import (AUTOMATION_MODES, DEFAULT_AUTOMATION_BLOCK_SIZE, Envelope,
+                               parseEnvelopeText)
+
+PARAMETER_TYPES = ('int', 'float', 'bool', 'array')
+TRUE_TEXTS = ('1', 'true', 'yes', 'on')
+FALSE_TEXTS = ('0', 'false', 'no', 'off')
+
+
+def readSchema(source):
+    """Parsed PARAMETERS of the script source, None if it declares none.
+    Raises ValueError if the declaration is not valid"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        raise ValueError(f'Script does not compile: {e}')
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id == 'PARAMETERS'):
+            try:
+                declared = ast.literal_eval(node.value)
+            except ValueError:
+                raise ValueError('PARAMETERS must only hold literals')
+            return parseSchema(declared)
+    return None
+
+
+def readSchemaFile(path):
+    with open(path, 'r') as userPy:
+        return readSchema(userPy.read())
+
+
+def parseSchema(declared):
+    """Check the declared parameters and fill in what they leave out.
+    Returns one dict per parameter with name, type, range, shape, dtype,
+    automation, blockSize and default"""
+    schema = []
+    names = set()
+    for entry in declared:
+        if not isinstance(entry, dict):
+            raise ValueError(f'A parameter must be a dict, got {entry!r}')
+        name = entry.get('name')
+        if not isinstance(name, str) or not name.isidentifier():
+            raise ValueError(f'Invalid parameter name {name!r}')
+        if name in names:
+            raise ValueError(f'Parameter {name} is declared twice')
+        names.add(name)
+        kind = entry.get('type', 'float')
+        if kind not in PARAMETER_TYPES:
+            raise ValueError(f'Parameter {name} has unknown type {kind!r}, '
+                             f'expected one of {", ".join(PARAMETER_TYPES)}')
+
+        spec = {'name': name, 'type': kind, 'range': None, 'shape': None, 'dtype': None,
+                'automation': None, 'blockSize': None}
+        if entry.get('range') is not None:
+            low, high = entry['range']
+            if low > high:
+                raise ValueError(f'Parameter {name} has an empty range {entry["range"]}')
+            spec['range'] = (low, high)
+        if kind == 'array':
+            spec['dtype'] = np.dtype(entry.get('dtype', 'float64')).name
+            if entry.get('shape') is not None:
+                spec['shape'] = tuple(entry['shape'])
+        if entry.get('automation') is not None:
+            if kind != 'float':
+                raise ValueError(f'Parameter {name} can not be automated, only floats can')
+            if entry['automation'] not in AUTOMATION_MODES:
+                raise ValueError(f'Parameter {name} has unknown automation {entry["automation"]!r}, '
+                                 f'expected one of {", ".join(AUTOMATION_MODES)}')
+            spec['automation'] = entry['automation']
+            spec['blockSize'] = int(entry.get('blockSize', DEFAULT_AUTOMATION_BLOCK_SIZE))
+
+        if entry.get('default') is not None:
+            spec['default'] = coerceValue(spec, entry['default'])
+        elif kind == 'array':
+            shape = (0,) if spec['shape'] is None else tuple(d or 0 for d in spec['shape'])
+            spec['default'] = np.zeros(shape, dtype=spec['dtype'])
+        elif kind == 'bool':
+            spec['default'] = False
+        else:
+            low = 0 if spec['range'] is None else min(max(0, spec['range'][0]), spec['range'][1])
+            spec['default'] = coerceValue(spec, low)
+        schema.append(spec)
+    return schema
+
+
+def coerceValue(spec, value):
+    """value as the type of spec. Raises ValueError if it does not fit"""
+    name = spec['name']
+    kind = spec['type']
+    if spec.get('automation') is not None:
+        return coerceEnvelope(spec, value)
+    if kind == 'bool':
+        return bool(value)
+    if kind == 'int':
+        if float(value) != int(value):
+            raise ValueError(f'Parameter {name} must be an int, got {value!r}')
+        value = int(value)
+    elif kind == 'float':
+        value = float(value)
+    else:
+        value = np.array(value, dtype=spec['dtype'])
+        shape = spec['shape']
+        if shape is not None and (value.ndim != len(shape) or any(
+                d is not None and d != n for d, n in zip(shape, value.shape))):
+            raise ValueError(f'Parameter {name} must have shape {shape}, got {value.shape}')
+
+    if spec['range'] is not None and np.size(value):
+        low, high = spec['range']
+        if np.min(value) < low or np.max(value) > high:
+            raise ValueError(f'Parameter {name} must be in {low} to {high}')
+    return value
+
+
+def coerceEnvelope(spec, value):
+    """value (an Envelope, breakpoints or a constant) as an Envelope
+    with the automation mode of spec"""
+    if isinstance(value, Envelope):
+        points = value.points
+    elif np.ndim(value) == 0:
+        points = [(0, float(value))]
+    else:
+        points = value
+    envelope = Envelope(points, spec['automation'], spec['blockSize'])
+    if spec['range'] is not None:
+        low, high = spec['range']
+        if np.min(envelope.values) < low or np.max(envelope.values) > high:
+            raise ValueError(f'Parameter {spec["name"]} must be in {low} to {high}')
+    return envelope
+
+
+def parseText(spec, text):
+    """Value of spec typed in a textbox. Empty text is the default.
+    Arrays are comma (or space) separated, with rows separated by ;
+    Automated parameters take breakpoints, see parseEnvelopeText"""
+    text = text.strip()
+    if text == "":
+        return spec['default']
+    kind = spec['type']
+    if spec.get('automation') is not None:
+        return coerceEnvelope(spec, parseEnvelopeText(text, spec['automation'],
+                                                      spec['blockSize']))
+    if kind == 'bool':
+        if text.lower() in TRUE_TEXTS:
+            return True
+        if text.lower() in FALSE_TEXTS:
+            return False
+        raise ValueError(f'Parameter {spec["name"]} must be true or false, got {text!r}')
+    if kind == 'array':
+        rows = [[float(v) for v in row.replace(',', ' ').split()]
+                for row in text.strip('[]').split(';') if row.strip() != ""]
+        return coerceValue(spec, rows[0] if len(rows) == 1 and
+                           (spec['shape'] is None or len(spec['shape']) == 1) else rows)
+    return coerceValue(spec, float(text) if kind == 'float' else int(text))
+
+
+def parseSweepText(spec, text):
+    """Values of spec to sweep. Scalars take a comma separated list
+    (0.5, 1, 2) or start:stop:count. The p1-p4 textboxes are parsed by it too.
+    Arrays and automated parameters are not swept, their text is a single value"""
+    text = text.strip()
+    if spec['type'] == 'array' or spec.get('automation') is not None or text == "":
+        return [parseText(spec, text)]
+    if ':' in text and spec['type'] != 'bool':
+        start, stop, count = text.split(':')
+        values = np.linspace(float(start), float(stop), int(count))
+        if spec['type'] == 'int':
+            # Rounding can give the same int twice, keep each value once
+            values = list(dict.fromkeys(int(round(v)) for v in values))
+        return [coerceValue(spec, v) for v in values]
+    return [parseText(spec, v) for v in text.split(',') if v.strip() != ""]
+
+
+def resolveValues(schema, values=None):
+    """Dict of every parameter of schema, the ones missing from values
+    (a dict of name -> value) at their default"""
+    values = {} if values is None else dict(values)
+    unknown = set(values) - {spec['name'] for spec in schema}
+    if unknown:
+        raise ValueError(f'Unknown parameters: {", ".join(sorted(unknown))}')
+    return {spec['name']: coerceValue(spec, values[spec['name']])
+            if spec['name'] in values else spec['default'] for spec in schema}
+
+
+def splitParameters(parameters):
+    """Positional and keyword arguments of the user code for parameters,
+    a dict of declared parameters or the list p1-p4"""
+    if isinstance(parameters, dict):
+        return (), parameters
+    return tuple(parameters), {}
+
+
+def plainParameters(parameters):
+    """parameters with arrays as (nested) lists, for JSON and tables"""
+    def plain(value):
+        if isinstance(value, Envelope):
+            return {'points': [list(p) for p in value.points], 'automation': value.mode,
+                    'blockSize': value.blockSize}
+        return value.tolist() if isinstance(value, np.ndarray) else value
+    if isinstance(parameters, dict):
+        return {name: plain(value) for name, value in parameters.items()}
+    return [plain(value) for value in parameters]
+
+
+def parameterDigest(parameters):
+    """Hash of the values of parameters, arrays included"""
+    sha = hashlib.sha1()
+    items = parameters.items() if isinstance(parameters, dict) else enumerate(parameters)
+    for name, value in items:
+        sha.update(repr(name).encode())
+        if isinstance(value, np.ndarray):
+            sha.update(f'{value.dtype.str}{value.shape}'.encode())
+            sha.update(np.ascontiguousarray(value).tobytes())
+        else:
+            sha.update(repr((type(value).__name__, value)).encode())
+    return sha.hexdigest()
+
+
+def describeParameter(spec):
+    """Short text of spec for the GUI, e.g. gain (float, 0 to 2)"""
+    details = [spec['type'] if spec['shape'] is None else
+               f'array {"x".join("n" if d is None else str(d) for d in spec["shape"])}']
+    if spec['range'] is not None:
+        details.append(f'{spec["range"][0]} to {spec["range"][1]}')
+    if spec.get('automation') == 'sample':
+        details.append('per sample')
+    elif spec.get('automation') == 'block':
+        details.append(f'per {spec["blockSize"]} samples')
+    return f'{spec["name"]} ({", ".join(details)})'
@@ -0,0 +1,110 @@
+"""
+Parallel parameter sweeps of the user's DSP code.
+
+Every combination of the given p1-p4 values, or of the values of the
+parameters the script declares, is run on a process pool (see
+processPool). Each run writes its output into its own row of the
+shared output array.
+"""
+import itertools
+import traceback
+
+import numpy as np
+
+from Source.arrayTransport import openArray
+from Source.dspWorker import loadUserFunction
+from Source.exceptions import ScriptReturnCodeException
+from Source.gainAnalysis import computeGainReduction
+from Source.parameterSchema import plainParameters
+from Source.processPool import runOnPool
+from Source.renderPipeline import checkOutput, userCodeArguments
+
+# Per process state of the pool, set by initSweepWorker
+sweepState = {}
+
+
+def toDb(value):
+    with np.errstate(divide='ignore'):
+        return float(20 * np.log10(value))
+
+
+def sweepMetrics(inS, outS):
+    """Summary of one sweep run, used to compare the runs with each other"""
+    outS = np.asarray(outS, dtype=np.float64)
+    _, gainDb = computeGainReduction(inS, outS)
+    hasGain = np.any(~np.isnan(gainDb))
+    return {'peakDb': toDb(np.max(np.abs(outS))),
+            'rmsDb': toDb(np.sqrt(np.mean(np.square(outS)))),
+            'meanGainDb': float(np.nanmean(gainDb)) if hasGain else np.nan,
+            'maxReductionDb': float(np.nanmin(gainDb)) if hasGain else np.nan}
+
+
+def initSweepWorker(inputDesc, outputDesc, scriptPath, signalInfo):
+    sweepState['userCode'] = loadUserFunction(scriptPath, {})
+    # Copy-on-write, so a userCode that edits its input does not affect other runs
+    sweepState['input'] = openArray(inputDesc, 'c')
+    sweepState['outputs'] = openArray(outputDesc, 'r+')
+    sweepState['signalInfo'] = signalInfo
+
+
+def runSweepTask(index, parameters):
+    """Run one combination and store its output in row index of the outputs"""
+    try:
+        inS = sweepState['input']
+        args, kwargs = userCodeArguments(inS, *sweepState['signalInfo'], parameters)
+        output = checkOutput(sweepState['userCode'](*args, **kwargs), inS.shape)
+        sweepState['outputs'][index] = output
+        sweepState['outputs'].flush()
+        return 'ok', sweepMetrics(inS, output)
+    except Exception:
+        return 'error', traceback.format_exc()
+
+
+def parameterGrid(parameterValues):
+    """Every combination of the values of each parameter, p1 varying slowest.
+    If parameterValues is a dict of name -> values the combinations are
+    dicts too, the first parameter varying slowest"""
+    if isinstance(parameterValues, dict):
+        names = list(parameterValues)
+        return [dict(zip(names, combination))
+                for combination in itertools.product(*parameterValues.values())]
+    return [list(combination) for combination in itertools.product(*parameterValues)]
+
+
+def runSweep(scriptPath, inS, numChannels, numSamples, sampleRate,
+             parameterValues, directory, maxWorkers=None, run=None):
+    """Run userCode of scriptPath for every combination of parameterValues
+    (one list of values per parameter, or a dict of name -> values) in parallel.
+    Returns a table with one dict of parameters and metrics per run, and the
+    outputs as an array shaped (numRuns,) + inS.shape.
+    run = Run reporting the progress, that can cancel it (see runOnPool)"""
+    inS = np.asarray(inS)
+    combinations = parameterGrid(parameterValues)
+    signalInfo = (numChannels, numSamples, sampleRate)
+    results, outputs = runOnPool(inS, (len(combinations),) + inS.shape, directory,
+                                 'dspVisSweep', initSweepWorker, (scriptPath, signalInfo),
+                                 runSweepTask, list(enumerate(combinations)),
+                                 'Sweep run', maxWorkers, run)
+    table = []
+    for parameters, (status, payload) in zip(combinations, results):
+        if status != 'ok':
+            raise ScriptReturnCodeException(
+                f'Sweep run with parameters {parameters} failed', payload)
+        table.append(dict(parameters=parameters, **payload))
+    return table, outputs
+
+
+def formatSweepTable(table):
+    """Text table of the results of runSweep"""
+    columns = ['peakDb', 'rmsDb', 'meanGainDb', 'maxReductionDb']
+    header = 'p1, p2, p3, p4'
+    if table and isinstance(table[0]['parameters'], dict):
+        header = ', '.join(table[0]['parameters'])
+    lines = ['{:<32}'.format(header) + ''.join(f'{c:>16}' for c in columns)]
+    for row in table:
+        parameters = plainParameters(row['parameters'])
+        if isinstance(parameters, dict):
+            parameters = parameters.values()
+        parameters = ', '.join(str(p) for p in parameters)
+        lines.append(f'{parameters:<32}' + ''.join(f'{row[c]:>16.2f}' for c in columns))
+    return '\n'.join(lines)
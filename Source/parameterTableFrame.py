@@ -0,0 +1,66 @@
+from tkinter import Frame, StringVar
+from tkinter.ttk import Entry, Label
+
+from Source.parameterSchema import describeParameter, parseSweepText, parseText
+
+ROW_HEIGHT = 25
+
+
+class ParameterTableFrame:
+    """One textbox per parameter the user script declares, see parameterSchema.
+    Empty textboxes take the default of their parameter"""
+    def __init__(self, parent):
+        self.prnt = parent
+        self.mFrame = Frame(self.prnt)
+        self.width = 0
+
+        self.schema = []
+        # name -> (label, textbox, text)
+        self.rows = {}
+        self.titleLabel = Label(self.mFrame, text='No declared parameters (using P1-P4)')
+
+    def draw(self, x, y, w, h):
+        self.mFrame.place(x=x, y=y, width=w, height=h)
+        self.width = w
+        self.placeRows()
+
+    def placeRows(self):
+        w = self.width
+        self.titleLabel.place(x=0, y=0, width=w, height=ROW_HEIGHT)
+        for i, spec in enumerate(self.schema):
+            label, textBox, _ = self.rows[spec['name']]
+            label.place(x=0, y=(i + 1) * ROW_HEIGHT, width=.5*w, height=ROW_HEIGHT)
+            textBox.place(x=.5*w, y=(i + 1) * ROW_HEIGHT, width=.5*w, height=ROW_HEIGHT)
+
+    def setSchema(self, schema):
+        """Show a row per parameter of schema (None for none). Rows of
+        parameters that are still declared keep their text"""
+        schema = [] if schema is None else schema
+        descriptions = [describeParameter(spec) for spec in schema]
+        if descriptions == [describeParameter(spec) for spec in self.schema]:
+            self.schema = schema
+            return
+
+        texts = {name: row[2].get() for name, row in self.rows.items()}
+        for label, textBox, _ in self.rows.values():
+            label.destroy()
+            textBox.destroy()
+        self.rows = {}
+        self.schema = schema
+        for spec, description in zip(schema, descriptions):
+            text = StringVar(self.mFrame, value=texts.get(spec['name'], ''))
+            self.rows[spec['name']] = (Label(self.mFrame, text=description),
+                                       Entry(self.mFrame, textvariable=text), text)
+        self.titleLabel.config(text='Declared parameters' if schema
+                               else 'No declared parameters (using P1-P4)')
+        self.placeRows()
+
+    def getValues(self):
+        """Dict of name -> value. Raises ValueError on an invalid value"""
+        return {spec['name']: parseText(spec, self.rows[spec['name']][2].get())
+                for spec in self.schema}
+
+    def getSweepValues(self):
+        """Dict of name -> values to sweep, see parameterSchema.parseSweepText"""
+        return {spec['name']: parseSweepText(spec, self.rows[spec['name']][2].get())
+                for spec in self.schema}
@@ -0,0 +1,71 @@
+"""
+Process pools that run the user's code over memory-mapped arrays, for
+parameter sweeps and chunk-parallel renders.
+
+The input signal is written once to a mapped file that every pool
+process maps, and the tasks write their results into a shared mapped
+output array (see ArrayTransport), so nothing big goes through pipes.
+Both files are removed once the output is copied out, whether the tasks
+succeed, fail or are cancelled.
+
+Given a Run (see backgroundRunner) the pool reports its progress and can
+be cancelled; the pool processes are killed rather than waited for.
+"""
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+import multiprocessing
+
+from Source.arrayTransport import ArrayTransport
+from Source.exceptions import ScriptReturnCodeException
+
+
+def terminatePool(pool, futures):
+    """Stop a process pool in the middle of its tasks, e.g. from
+    Run.cancelWith: drop the futures that have not started and kill the
+    processes running the user code. Waiting on the rest then raises"""
+    for future in futures:
+        future.cancel()
+    # The pool only knows its processes until it is shut down
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False)
+    for process in processes:
+        process.terminate()
+
+
+def cancelWith(run, abort):
+    """run.cancelWith(abort), or nothing if there is no run"""
+    return nullcontext() if run is None else run.cancelWith(abort)
+
+
+def runOnPool(inS, outputShape, directory, name, initializer, initargs, task, taskArgs,
+              label, maxWorkers=None, run=None):
+    """Run task(*args) for every args of taskArgs on a pool whose processes
+    are set up by initializer(inputDesc, outputDesc, *initargs).
+    The mapped files are named after name. Progress is reported as
+    '<label> i of n'. Returns the results of the tasks, in order, and
+    the output array shaped outputShape.
+    If run is cancelled the pool is killed and RunCancelledException raised"""
+    transport = ArrayTransport(directory, name)
+    futures = []
+    results = []
+    try:
+        inputDesc = transport.writeInput(inS)
+        outputDesc = transport.allocateOutput(outputShape, inS.dtype)
+        try:
+            with ProcessPoolExecutor(max_workers=maxWorkers,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=initializer,
+                                     initargs=(inputDesc, outputDesc, *initargs)) as pool, \
+                    cancelWith(run, lambda: terminatePool(pool, futures)):
+                futures.extend(pool.submit(task, *args) for args in taskArgs)
+                for i, future in enumerate(futures):
+                    if run is not None:
+                        run.checkpoint(i / len(futures), f'{label} {i + 1} of {len(futures)}')
+                    results.append(future.result())
+        except (BrokenProcessPool, CancelledError) as e:
+            raise ScriptReturnCodeException('A pool process exited while running the script',
+                                            str(e))
+        return results, transport.readOutput(outputDesc)
+    finally:
+        transport.cleanUp()
@@ -0,0 +1,91 @@
+"""
+Real-time check of the user's DSP code.
+
+The signal is fed to processBlock in blocks of the sizes a plugin host
+uses, and every call is timed against the real-time budget of its block
+(numSamples / sampleRate). A real-time factor below 1 means the code
+kept up on average; overruns are the blocks that took longer than their
+budget and would have dropped out in a host.
+"""
+import time
+
+import numpy as np
+
+from Source.automation import renderAutomation
+from Source.blockRunner import runBlocks
+from Source.parameterSchema import splitParameters
+
+HOST_BLOCK_SIZES = (64, 128, 256, 512, 1024, 2048)
+
+
+def asBlockFunction(userCode):
+    """Wrap a whole-signal userCode so it can be called like processBlock"""
+    def processBlock(block, numChannels, numSamples, sampleRate, state, *parameters, **kwargs):
+        return userCode(block, numChannels, numSamples, sampleRate, *parameters, **kwargs)
+    return processBlock
+
+
+def timeBlocks(processBlock, inS, blockSize, sampleRate, parameters):
+    """Run inS through processBlock in blocks of blockSize.
+    Returns the time taken by every call and the size of every block"""
+    inS = np.asarray(inS)
+    numChannels = 1 if inS.ndim == 1 else inS.shape[0]
+    numSamples = inS.shape[-1]
+    times = []
+    sizes = []
+
+    def timedBlock(block, *args, **kwargs):
+        started = time.perf_counter()
+        output = processBlock(block, *args, **kwargs)
+        times.append(time.perf_counter() - started)
+        sizes.append(block.shape[-1])
+        return output
+
+    # An untimed call on a throw-away state, so imports and first-call
+    # set-up don't count as an overrun
+    firstBlock = min(blockSize, numSamples)
+    args, kwargs = splitParameters(renderAutomation(parameters, firstBlock, sampleRate,
+                                                    perBlock=True))
+    processBlock(np.array(inS[..., :blockSize]), numChannels,
+                 firstBlock, sampleRate, {}, *args, **kwargs)
+    # Copies, so the user code never edits the signal in place
+    runBlocks(timedBlock, lambda start, stop: np.array(inS[..., start:stop]),
+              lambda output: None, 0, numSamples, blockSize, numChannels,
+              sampleRate, parameters)
+    return np.array(times), np.array(sizes)
+
+
+def realTimeReport(times, sizes, blockSize, sampleRate):
+    """Summary of the block times of one timeBlocks run"""
+    budgets = sizes / sampleRate
+    overruns = times > budgets
+    return {'blockSize': blockSize,
+            'numBlocks': len(times),
+            'budgetMs': 1000 * blockSize / sampleRate,
+            'realTimeFactor': float(times.sum() / budgets.sum()),
+            'p50Ms': 1000 * float(np.percentile(times, 50)),
+            'p99Ms': 1000 * float(np.percentile(times, 99)),
+            'maxMs': 1000 * float(times.max()),
+            'overruns': int(overruns.sum()),
+            'overrunRatio': float(overruns.mean())}
+
+
+def measureRealTime(processBlock, inS, sampleRate, parameters,
+                    blockSizes=HOST_BLOCK_SIZES):
+    """realTimeReport of processBlock for every host block size"""
+    reports = []
+    for blockSize in blockSizes:
+        times, sizes = timeBlocks(processBlock, inS, blockSize, sampleRate, parameters)
+        reports.append(realTimeReport(times, sizes, blockSize, sampleRate))
+    return reports
+
+
+def formatRealTimeTable(reports):
+    """Text table of the results of measureRealTime"""
+    columns = ['budgetMs', 'realTimeFactor', 'p50Ms', 'p99Ms', 'maxMs']
+    lines = ['{:>10}'.format('blockSize') + ''.join(f'{c:>16}' for c in columns)
+             + '{:>16}'.format('overruns')]
+    for row in reports:
+        lines.append(f'{row["blockSize"]:>10}' + ''.join(f'{row[c]:>16.3f}' for c in columns)
+                     + f'{row["overruns"]:>9}/{row["numBlocks"]:<6}')
+    return '\n'.join(lines)
@@ -0,0 +1,156 @@
+"""
+Disk cache of rendered outputs, shared between sessions.
+
+A render is stored under the hash of everything its output depends on:
+the content of the audio file, the range, the mono flag, the source of
+the user script, its parameters and the render mode. Processing the same part
+again, in this session or a later one, reads the output back instead of
+running the user code.
+
+The audio is identified by the SHA-1 of its content, so a copied or
+renamed file still hits. Hashing is done once per file version (path,
+size and mtime) and the result kept in fingerprints.json.
+
+Outputs are saved in chunks of chunkFrames frames, each compressed with
+blosc (it comes with bloscpack) and byte shuffled, in one .npz file per
+render. When the cache grows over maxBytes the least recently used
+renders are deleted; reading a render touches its mtime.
+"""
+import hashlib
+import json
+import os
+import zipfile
+
+import blosc
+import numpy as np
+
+from Source.parameterSchema import parameterDigest
+
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+CHUNK_FRAMES = 1 << 18
+# Bytes of the audio file read at a time while hashing it
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def fileContentHash(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, cacheDir, maxBytes=DEFAULT_CACHE_BYTES, chunkFrames=CHUNK_FRAMES):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.chunkFrames = chunkFrames
+        self.fingerprintPath = os.path.join(cacheDir, 'fingerprints.json')
+        self.fingerprints = None
+
+    def audioFingerprint(self, path):
+        """Content hash of the audio file at path, computed once per version of the file"""
+        if self.fingerprints is None:
+            try:
+                with open(self.fingerprintPath, 'r') as f:
+                    self.fingerprints = json.load(f)
+            except (OSError, ValueError):
+                self.fingerprints = {}
+        stat = os.stat(path)
+        version = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+        if version not in self.fingerprints:
+            self.fingerprints[version] = fileContentHash(path)
+            os.makedirs(self.cacheDir, exist_ok=True)
+            with open(self.fingerprintPath, 'w') as f:
+                json.dump(self.fingerprints, f)
+        return self.fingerprints[version]
+
+    def key(self, audioPath, start, end, mono, code, parameters, mode='whole'):
+        """Hash of a render of audioPath from start to end (secs) by code
+        (the source of the user script) with parameters (p1-p4 or a dict
+        of the declared parameters)"""
+        description = {'audio': self.audioFingerprint(audioPath),
+                       'start': start,
+                       'end': end,
+                       'mono': bool(mono),
+                       'code': hashlib.sha1(code.encode()).hexdigest(),
+                       'parameters': parameterDigest(parameters),
+                       'mode': mode}
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def entryPath(self, key):
+        return os.path.join(self.cacheDir, key + '.npz')
+
+    def get(self, key):
+        """The output stored under key, or None"""
+        path = self.entryPath(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path) as data:
+                dtype = np.dtype(str(data['dtype']))
+                shape = tuple(data['shape'])
+                output = np.empty(shape, dtype=dtype)
+                for i, first in enumerate(range(0, shape[-1], self.chunkFrames)):
+                    chunk = blosc.decompress(data[f'chunk{i}'].tobytes())
+                    output[..., first:first + self.chunkFrames] = np.frombuffer(
+                        chunk, dtype=dtype).reshape(shape[:-1] + (-1,))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile, blosc.blosc_extension.error):
+            # Half written or from another version, render it again
+            os.remove(path)
+            return None
+        # mtime is the LRU clock
+        os.utime(path)
+        return output
+
+    def put(self, key, output):
+        """Store output under key and evict the oldest renders if the cache
+        is too big. Returns False if output can't be stored"""
+        output = np.asarray(output)
+        if output.dtype.kind not in 'fiu' or output.ndim == 0:
+            return False
+        arrays = {'dtype': np.array(output.dtype.str), 'shape': np.array(output.shape)}
+        for i, first in enumerate(range(0, output.shape[-1], self.chunkFrames)):
+            chunk = np.ascontiguousarray(output[..., first:first + self.chunkFrames])
+            compressed = blosc.compress(chunk.tobytes(), typesize=output.dtype.itemsize,
+                                        clevel=5, shuffle=blosc.SHUFFLE, cname='lz4')
+            arrays[f'chunk{i}'] = np.frombuffer(compressed, dtype=np.uint8)
+
+        os.makedirs(self.cacheDir, exist_ok=True)
+        # Write next to the final file and swap, so a crash never leaves half a render
+        path = self.entryPath(key)
+        tempFile = path + '.tmp'
+        with open(tempFile, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tempFile, path)
+        self.evict()
+        return os.path.isfile(path)
+
+    def entries(self):
+        """(mtime, size, path) of every stored render, oldest first"""
+        if not os.path.isdir(self.cacheDir):
+            return []
+        found = []
+        for name in os.listdir(self.cacheDir):
+            if name.endswith('.npz'):
+                path = os.path.join(self.cacheDir, name)
+                stat = os.stat(path)
+                found.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(found)
+
+    def totalBytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Delete the least recently used renders until the cache fits maxBytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
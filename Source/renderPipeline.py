@@ -0,0 +1,53 @@
+"""
+Decoding and processing shared by the GUI (and its worker processes) and
+batchCli, so both render a file the same way. Nothing here imports Tk.
+
+decodeSegment reads uncompressed .wav files at their own sample rate
+natively (see wavReader) and decodes anything else with librosa.
+runUserCode calls userCode on a decoded signal with the list p1-p4 or
+the declared parameters, automation rendered for the samples it gets.
+"""
+import numpy as np
+
+from Source.automation import renderAutomation
+from Source.exceptions import UnsupportedWavException
+from Source.parameterSchema import splitParameters
+from Source.wavReader import readWavSegment
+
+
+def decodeSegment(path, offset, duration, mono, sampleRate=None):
+    """Decode duration secs of the audio file at path, starting at offset.
+    Resampled to sampleRate if it is not None. Returns (signal, sampleRate)"""
+    if sampleRate is None and path.lower().endswith('.wav'):
+        try:
+            return readWavSegment(path, offset, duration, mono)
+        except (UnsupportedWavException, OSError):
+            pass
+    # librosa is slow to import, only pay for it when needed
+    from librosa.core import load
+    return load(path, sr=sampleRate, offset=offset, mono=mono, duration=duration)
+
+
+def userCodeArguments(inS, numChannels, numSamples, sampleRate, parameters, offset=0):
+    """Positional and keyword arguments of userCode for numSamples samples
+    of the range, starting offset samples into it"""
+    parameters, kwargs = splitParameters(renderAutomation(parameters, numSamples,
+                                                          sampleRate, offset))
+    return (inS, numChannels, numSamples, sampleRate, *parameters), kwargs
+
+
+def checkOutput(output, shape):
+    """output of userCode as an array, raises ValueError if it is not shaped shape"""
+    output = np.asarray(output)
+    if output.shape != shape:
+        raise ValueError(f'userCode returned shape {output.shape}, expected {shape}')
+    return output
+
+
+def runUserCode(userCode, inS, sampleRate, parameters, offset=0):
+    """Run userCode on inS, shaped (numSamples,) or (numChannels, numSamples),
+    and return its output. userCode may edit inS in place"""
+    numChannels = 1 if inS.ndim == 1 else inS.shape[0]
+    args, kwargs = userCodeArguments(inS, numChannels, inS.shape[-1], sampleRate,
+                                     parameters, offset)
+    return checkOutput(userCode(*args, **kwargs), inS.shape)
@@ -0,0 +1,154 @@
+"""
+Spectrograms of the input and the processed output.
+
+stftPower computes the power STFT in batches of frames. Renders with
+more than maxColumns frames are max-pooled to maxColumns columns while
+they are computed (like the min/max decimation of the waveforms, so no
+transient gets lost), which keeps memory bounded for very long renders.
+
+SpectrogramCache keeps the last few results per (array, fftSize,
+hopSize, window), so changing the color range or zooming does not
+recompute anything. SpectrogramImage shows the columns of the visible
+range, pooled again to about one column per pixel.
+"""
+from collections import OrderedDict
+import weakref
+
+import numpy as np
+
+from Source.frequencyResponse import framedView
+from Source.gainAnalysis import frameStarts
+
+DEFAULT_FFT_SIZE = 2048
+DEFAULT_HOP_SIZE = 512
+MAX_COLUMNS = 8192
+
+# Samples transformed per batch (frames x fftSize x channels)
+BATCH_SAMPLES = 1 << 22
+
+WINDOWS = {'hann': np.hanning,
+           'hamming': np.hamming,
+           'blackman': np.blackman,
+           'rect': np.ones}
+
+
+def stftPower(signal, fftSize=DEFAULT_FFT_SIZE, hopSize=DEFAULT_HOP_SIZE,
+              window='hann', maxColumns=MAX_COLUMNS):
+    """Power spectrogram of signal, shaped (..., fftSize // 2 + 1, numColumns).
+    Every column is the maximum of framesPerColumn consecutive frames.
+    Returns the spectrogram and framesPerColumn"""
+    signal = np.asarray(signal)
+    if window not in WINDOWS:
+        raise ValueError(f'Unknown window: {window}')
+    starts, windowSize = frameStarts(signal.shape[-1], fftSize, hopSize)
+    frames = framedView(signal, len(starts), windowSize, hopSize)
+    taper = WINDOWS[window](windowSize + 1)[:-1].astype(np.result_type(signal, np.float32))
+
+    framesPerColumn = -(-len(starts) // maxColumns)
+    numChannels = 1 if signal.ndim == 1 else int(np.prod(signal.shape[:-1]))
+    # Whole columns per batch, so no column is split between two batches
+    batchSize = max(1, BATCH_SAMPLES // (fftSize * numChannels * framesPerColumn)) * framesPerColumn
+
+    numColumns = -(-len(starts) // framesPerColumn)
+    power = np.empty(signal.shape[:-1] + (numColumns, fftSize // 2 + 1), dtype=np.float32)
+    for first in range(0, len(starts), batchSize):
+        spectrum = np.fft.rfft(frames[..., first:first + batchSize, :] * taper, n=fftSize)
+        framePower = spectrum.real ** 2 + spectrum.imag ** 2
+        columns = np.arange(0, framePower.shape[-2], framesPerColumn)
+        column = first // framesPerColumn
+        power[..., column:column + len(columns), :] = np.maximum.reduceat(framePower, columns, axis=-2)
+    return np.swapaxes(power, -1, -2), framesPerColumn
+
+
+def toDb(power, floorDb=-200):
+    """Power to dB, with silence at floorDb instead of -inf"""
+    return 10 * np.log10(np.maximum(power, 10 ** (floorDb / 10)))
+
+
+def poolColumns(image, start, stop, numColumns):
+    """Max of image[..., start:stop] in at most numColumns groups of columns.
+    Returns the (fractional) center column of every group and the pooled image.
+    A range outside the image is moved to its nearest column"""
+    stop = min(max(stop, 1), image.shape[-1])
+    start = max(0, min(start, stop - 1))
+    edges = np.unique(np.linspace(start, stop, numColumns + 1).astype(np.int64))
+    pooled = np.maximum.reduceat(image[..., :stop], edges[:-1], axis=-1)
+    return (edges[:-1] + edges[1:] - 1) / 2, pooled
+
+
+class SpectrogramCache:
+    def __init__(self, maxEntries=4):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+
+    def get(self, signal, fftSize=DEFAULT_FFT_SIZE, hopSize=DEFAULT_HOP_SIZE,
+            window='hann', maxColumns=MAX_COLUMNS):
+        """stftPower of signal, computed only the first time it is asked for
+        this array object. Arrays must not be edited in place afterwards"""
+        key = (id(signal), fftSize, hopSize, window, maxColumns)
+        entry = self.entries.get(key)
+        # The id of a freed array can be reused, the weak reference tells
+        if entry is not None and entry[0]() is signal:
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        result = stftPower(signal, fftSize, hopSize, window, maxColumns)
+        try:
+            self.entries[key] = (weakref.ref(signal), result)
+        except TypeError:
+            # Not an ndarray (e.g. a list), it can't be told apart later
+            return result
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        self.entries.clear()
+
+
+class SpectrogramImage:
+    def __init__(self, ax, image, columnTime, maxFrequency, **imshowKwargs):
+        """Show image (numBins, numColumns) on ax, column i covering time
+        i * columnTime to (i + 1) * columnTime and the bins 0 to maxFrequency"""
+        self.ax = ax
+        self.image = image
+        self.columnTime = columnTime
+        self.maxFrequency = maxFrequency
+
+        self.visible = (0, image.shape[-1])
+        extent, pooled = self.pool(*self.visible)
+        self.artist = ax.imshow(pooled, origin='lower', aspect='auto',
+                                extent=extent, interpolation='nearest', **imshowKwargs)
+        # Otherwise set_extent in update moves the limits and calls update again
+        ax.set_autoscale_on(False)
+        # A lambda keeps this object alive for as long as the axes,
+        # matplotlib only holds weak references to bound methods
+        ax.callbacks.connect('xlim_changed', lambda axes: self.update())
+
+    def columnCount(self):
+        width = self.ax.get_window_extent().width
+        return int(width) if width > 1 else 2000
+
+    def pool(self, start, stop):
+        centers, pooled = poolColumns(self.image, start, stop, self.columnCount())
+        # Pooled columns have equal width, up to one column of rounding
+        extent = (start * self.columnTime, min(stop, self.image.shape[-1]) * self.columnTime,
+                  0, self.maxFrequency)
+        return extent, pooled
+
+    def update(self):
+        """Re-pool the columns that are currently visible"""
+        low, high = self.ax.get_xlim()
+        start = max(int(np.floor(low / self.columnTime)), 0)
+        stop = min(int(np.ceil(high / self.columnTime)) + 1, self.image.shape[-1])
+        # Panned past the image, keep showing what was pooled last
+        if stop <= 0 or start >= self.image.shape[-1]:
+            return
+        # Shared axes get a callback for every change of their siblings too
+        if (start, stop) == self.visible:
+            return
+        self.visible = (start, stop)
+        extent, pooled = self.pool(start, stop)
+        self.artist.set_data(pooled)
+        self.artist.set_extent(extent)
+        self.ax.figure.canvas.draw_idle()
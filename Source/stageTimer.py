@@ -0,0 +1,76 @@
+"""
+Per-stage wall time, CPU time and peak memory of a processing run.
+
+Wrap every stage of a run in StageTimer.stage(name). Stages measured in
+another process (the DSP worker or the legacy runner script) are recorded
+there with their own StageTimer and merged with addStages, so one run
+gives a single list showing where the time went.
+"""
+from contextlib import contextmanager
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is then reported as None
+    resource = None
+
+
+def peakRss(who=None):
+    """High-water mark of the resident set size in bytes, or None if unknown"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+class StageTimer:
+    def __init__(self, process='main'):
+        self.process = process
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of the with statement as the stage called name.
+        The stage is recorded even if the body raises"""
+        wallStart = time.perf_counter()
+        cpuStart = time.process_time()
+        try:
+            yield
+        finally:
+            self.stages.append({'stage': name,
+                                'process': self.process,
+                                'wallSeconds': time.perf_counter() - wallStart,
+                                'cpuSeconds': time.process_time() - cpuStart,
+                                'peakRssBytes': peakRss()})
+
+    def addStages(self, stages):
+        """Append stages recorded by another StageTimer, e.g. of a child process"""
+        self.stages.extend(stages)
+
+    def totals(self):
+        """Wall and CPU seconds summed over the stages of this process"""
+        own = [s for s in self.stages if s['process'] == self.process]
+        return {'wallSeconds': sum(s['wallSeconds'] for s in own),
+                'cpuSeconds': sum(s['cpuSeconds'] for s in own)}
+
+    def summary(self):
+        """One line per stage, values that were not measured are left out"""
+        lines = []
+        for s in self.stages:
+            line = f'{s["process"] + "." + s["stage"]:<28}{s["wallSeconds"] * 1000:>10.1f} ms wall'
+            if s['cpuSeconds'] is not None:
+                line += f'{s["cpuSeconds"] * 1000:>10.1f} ms cpu'
+            if s['peakRssBytes'] is not None:
+                line += f'{s["peakRssBytes"] / 2 ** 20:>9.1f} MiB peak'
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def writeJsonLine(self, path, **info):
+        """Append the stages of the run, plus info, as one JSON line to path"""
+        record = dict(info, time=time.time(), stages=self.stages, **self.totals())
+        with open(path, 'a') as log:
+            log.write(json.dumps(record) + '\n')
@@ -0,0 +1,138 @@
+"""
+Generated test signals and deconvolution, to measure the user's code in
+one short render instead of through minutes of music.
+
+Every signal is an excitation followed by a bit of silence, so the tail
+of the system's response (reverb, filter ringing) fits in the render.
+deconvolve divides the spectrum of the output by the spectrum of the
+excitation (with a little regularization where the excitation has no
+energy) and returns the impulse response of the system.
+
+    sweep      Exponential sine sweep, the most robust to noise and the
+               one that keeps harmonic distortion out of the response
+    mls        One period of a maximum length sequence (binary noise)
+    impulse    A single click, the response is the impulse response
+    multitone  Log spaced tones on exact FFT bins with Schroeder phases;
+               the response is only meaningful at the tone frequencies
+"""
+import numpy as np
+
+TEST_SIGNALS = ('sweep', 'mls', 'impulse', 'multitone')
+
+# Feedback taps of the maximum length sequences, by order
+MLS_TAPS = {2: [1], 3: [2], 4: [3], 5: [3], 6: [5], 7: [6], 8: [7, 6, 1],
+            9: [5], 10: [7], 11: [9], 12: [11, 10, 4], 13: [12, 11, 8],
+            14: [13, 12, 2], 15: [14], 16: [15, 13, 4], 17: [14], 18: [11]}
+
+
+def logSweep(numSamples, sampleRate, startFreq=20, stopFreq=None):
+    """Exponential sine sweep from startFreq to stopFreq (Hz), with short fades"""
+    if stopFreq is None:
+        stopFreq = 0.45 * sampleRate
+    t = np.arange(numSamples) / sampleRate
+    duration = numSamples / sampleRate
+    rate = np.log(stopFreq / startFreq)
+    sweep = np.sin(2 * np.pi * startFreq * duration / rate * (np.exp(t * rate / duration) - 1))
+    fade = min(numSamples // 10, int(0.005 * sampleRate))
+    if fade > 0:
+        ramp = 0.5 - 0.5 * np.cos(np.pi * np.arange(fade) / fade)
+        sweep[:fade] *= ramp
+        sweep[-fade:] *= ramp[::-1]
+    return sweep
+
+
+def maxLengthSequence(order):
+    """One period (2 ** order - 1 samples) of a maximum length sequence of +-1"""
+    if order not in MLS_TAPS:
+        raise ValueError(f'MLS order must be between {min(MLS_TAPS)} and {max(MLS_TAPS)}')
+    taps = MLS_TAPS[order]
+    state = [1] * order
+    sequence = np.empty(2 ** order - 1)
+    index = 0
+    for i in range(len(sequence)):
+        feedback = state[index]
+        sequence[i] = feedback
+        for tap in taps:
+            feedback ^= state[(index + tap) % order]
+        state[index] = feedback
+        index = (index + 1) % order
+    return 2 * sequence - 1
+
+
+def mlsSignal(numSamples):
+    """The longest maximum length sequence that fits in numSamples"""
+    order = min(max(MLS_TAPS), int(np.log2(numSamples + 1)))
+    sequence = maxLengthSequence(max(order, min(MLS_TAPS)))[:numSamples]
+    return np.pad(sequence, (0, numSamples - len(sequence)))
+
+
+def multitone(numSamples, sampleRate, numTones=32, startFreq=20, stopFreq=None):
+    """Sum of numTones log spaced tones, each on an exact bin of a numSamples
+    FFT. Schroeder phases keep the crest factor low"""
+    if stopFreq is None:
+        stopFreq = 0.45 * sampleRate
+    binWidth = sampleRate / numSamples
+    bins = np.unique(np.round(np.geomspace(max(startFreq, binWidth), stopFreq, numTones) / binWidth))
+    phases = -np.pi * np.arange(len(bins)) ** 2 / len(bins)
+    spectrum = np.zeros(numSamples // 2 + 1, dtype=np.complex128)
+    spectrum[bins.astype(int)] = np.exp(1j * phases)
+    signal = np.fft.irfft(spectrum, numSamples)
+    return signal / np.max(np.abs(signal))
+
+
+def generateTestSignal(kind, sampleRate, duration, numChannels=2, amplitude=0.5):
+    """Test signal of duration secs shaped like the input of userCode:
+    (numSamples,) if numChannels is 1, (numChannels, numSamples) otherwise.
+    The last quarter (at most 0.5 secs) is silence for the system's tail"""
+    numSamples = int(duration * sampleRate)
+    tail = min(numSamples // 4, sampleRate // 2)
+    active = numSamples - tail
+
+    if kind == 'sweep':
+        excitation = logSweep(active, sampleRate)
+    elif kind == 'mls':
+        excitation = mlsSignal(active)
+    elif kind == 'impulse':
+        excitation = np.zeros(active)
+        excitation[0] = 1
+    elif kind == 'multitone':
+        excitation = multitone(active, sampleRate)
+    else:
+        raise ValueError(f'Unknown test signal: {kind}')
+
+    signal = np.zeros(numSamples, dtype=np.float32)
+    signal[:active] = amplitude * excitation
+    if numChannels == 1:
+        return signal
+    return np.tile(signal, (numChannels, 1))
+
+
+def deconvolve(excitation, response, irLength=None, regularization=1e-6):
+    """Impulse response (..., irLength) of the system that turned excitation
+    into response. Bins where the excitation has less than regularization
+    times its peak power are attenuated instead of amplifying noise"""
+    excitation = np.asarray(excitation, dtype=np.float64)
+    response = np.asarray(response, dtype=np.float64)
+    if excitation.shape != response.shape:
+        raise ValueError(f'Excitation shape {excitation.shape} does not match '
+                         f'response shape {response.shape}')
+    numSamples = excitation.shape[-1]
+    if irLength is None:
+        irLength = numSamples
+    # Long enough for a linear (not circular) deconvolution
+    fftSize = 1 << int(np.ceil(np.log2(numSamples + irLength)))
+
+    x = np.fft.rfft(excitation, fftSize)
+    y = np.fft.rfft(response, fftSize)
+    power = x.real ** 2 + x.imag ** 2
+    floor = regularization * np.max(power, axis=-1, keepdims=True)
+    return np.fft.irfft(y * np.conj(x) / (power + floor), fftSize)[..., :irLength]
+
+
+def impulseResponseSpectrum(ir, sampleRate):
+    """Frequencies (Hz), magnitude (dB) and unwrapped phase (rad) of ir"""
+    spectrum = np.fft.rfft(ir)
+    with np.errstate(divide='ignore'):
+        magnitudeDb = 20 * np.log10(np.abs(spectrum))
+    return (np.fft.rfftfreq(np.shape(ir)[-1], 1 / sampleRate), magnitudeDb,
+            np.unwrap(np.angle(spectrum), axis=-1))
@@ -0,0 +1,90 @@
+"""
+Profiling of the user's DSP code.
+
+profileCall runs a function once under cProfile while also timing every
+line executed in the user script, and returns a text report: the hot
+spots sorted by cumulative time, and the source of the script annotated
+with the hits and time of each line. Line times are inclusive (a line
+calling another function of the script is charged for that call too).
+
+Both profilers slow the call down, so the absolute numbers are only
+good for comparing lines and functions with each other.
+"""
+import cProfile
+import io
+import linecache
+import os
+import pstats
+import sys
+import time
+
+
+class LineTimer:
+    """Trace function timing the lines of the functions defined in path"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.hits = {}
+        self.seconds = {}
+        # Line being executed and when it started, per active frame
+        self.current = {}
+
+    def trace(self, frame, event, arg):
+        if event == 'call' and os.path.abspath(frame.f_code.co_filename) == self.path:
+            return self.traceLines
+        return None
+
+    def traceLines(self, frame, event, arg):
+        now = time.perf_counter()
+        key = id(frame)
+        if key in self.current:
+            lineNo, started = self.current.pop(key)
+            self.seconds[lineNo] = self.seconds.get(lineNo, 0) + now - started
+        if event == 'line':
+            self.hits[frame.f_lineno] = self.hits.get(frame.f_lineno, 0) + 1
+            # Start the clock after the bookkeeping above
+            self.current[key] = (frame.f_lineno, time.perf_counter())
+        return self.traceLines
+
+    def report(self):
+        """The source of the script with the hits, total time and share of
+        the time of every executed line"""
+        total = sum(self.seconds.values()) or 1
+        lines = [f'Line timings of {self.path} (inclusive)',
+                 f'{"Line":>6}{"Hits":>10}{"Time (ms)":>12}{"%":>7}  Source']
+        linecache.checkcache(self.path)
+        for lineNo in range(1, len(linecache.getlines(self.path)) + 1):
+            source = linecache.getline(self.path, lineNo).rstrip()
+            if lineNo in self.hits:
+                seconds = self.seconds.get(lineNo, 0)
+                lines.append(f'{lineNo:>6}{self.hits[lineNo]:>10}{seconds * 1000:>12.3f}'
+                             f'{100 * seconds / total:>7.1f}  {source}')
+            else:
+                lines.append(f'{lineNo:>6}{"":>29}  {source}')
+        return '\n'.join(lines)
+
+
+def profileCall(func, args, kwargs=None, scriptPath=None, sortBy='cumulative',
+                limit=25):
+    """Call func(*args, **kwargs) under cProfile, timing the lines of
+    scriptPath as well if given. Returns (result, report)"""
+    profiler = cProfile.Profile()
+    lineTimer = LineTimer(scriptPath) if scriptPath is not None else None
+
+    previousTrace = sys.gettrace()
+    if lineTimer is not None:
+        sys.settrace(lineTimer.trace)
+    profiler.enable()
+    try:
+        result = func(*args, **(kwargs or {}))
+    finally:
+        profiler.disable()
+        sys.settrace(previousTrace)
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(sortBy).print_stats(limit)
+    report = 'Hot spots (sorted by ' + sortBy + ')\n' + stream.getvalue().strip()
+    if lineTimer is not None:
+        report += '\n\n' + lineTimer.report()
+    return result, report
@@ -0,0 +1,187 @@
+"""
+Native reader for uncompressed PCM and IEEE float .wav files.
+
+The sample data is memory-mapped, so opening even a multi-GB file is
+instant and only the requested range is ever converted to float32.
+Formats it does not understand raise UnsupportedWavException, and the
+caller falls back to librosa.
+
+WavWriter is the counterpart used to stream 32 bit float results to disk
+block by block.
+"""
+import os
+import struct
+
+import numpy as np
+
+from Source.exceptions import UnsupportedWavException
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavReader:
+    def __init__(self, path):
+        self.path = path
+        self.parseHeader()
+
+        if self.formatTag == WAVE_FORMAT_PCM and self.sampleWidth == 3:
+            # No 24 bit dtype, keep the raw bytes and convert on read
+            shape = (self.numFrames, self.numChannels, 3)
+            dtype = np.uint8
+        else:
+            shape = (self.numFrames, self.numChannels)
+            dtype = self.sampleDtype()
+        self.frames = np.memmap(path, dtype=dtype, mode='r',
+                                offset=self.dataOffset, shape=shape)
+
+    def parseHeader(self):
+        fileSize = os.path.getsize(self.path)
+        with open(self.path, 'rb') as wav:
+            riff = wav.read(12)
+            if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:] != b'WAVE':
+                raise UnsupportedWavException('Not a RIFF/WAVE file',
+                                              f'File: {self.path}')
+            fmt = None
+            while True:
+                chunkHeader = wav.read(8)
+                if len(chunkHeader) < 8:
+                    raise UnsupportedWavException('No data chunk found',
+                                                  f'File: {self.path}')
+                chunkId, chunkSize = struct.unpack('<4sI', chunkHeader)
+                if chunkId == b'fmt ':
+                    fmt = wav.read(chunkSize)
+                elif chunkId == b'data':
+                    self.dataOffset = wav.tell()
+                    # Streaming writers may leave the size unset
+                    dataSize = min(chunkSize, fileSize - self.dataOffset)
+                    break
+                else:
+                    wav.seek(chunkSize, os.SEEK_CUR)
+                # Chunks are word aligned
+                if chunkSize % 2:
+                    wav.seek(1, os.SEEK_CUR)
+
+        if fmt is None or len(fmt) < 16:
+            raise UnsupportedWavException('Missing fmt chunk', f'File: {self.path}')
+        (self.formatTag, self.numChannels, self.sampleRate, _,
+         self.blockAlign, bitsPerSample) = struct.unpack('<HHIIHH', fmt[:16])
+        if self.formatTag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            # The first two bytes of the sub-format GUID are the actual format
+            self.formatTag = struct.unpack('<H', fmt[24:26])[0]
+
+        self.sampleWidth = bitsPerSample // 8
+        supported = {WAVE_FORMAT_PCM: (1, 2, 3, 4),
+                     WAVE_FORMAT_IEEE_FLOAT: (4, 8)}
+        if (self.sampleWidth not in supported.get(self.formatTag, ())
+                or self.blockAlign != self.sampleWidth * self.numChannels):
+            raise UnsupportedWavException(
+                'Unsupported sample format',
+                f'Format: {self.formatTag}, bits: {bitsPerSample}, file: {self.path}')
+        self.numFrames = dataSize // self.blockAlign
+        if self.numFrames == 0:
+            raise UnsupportedWavException('No audio in data chunk', f'File: {self.path}')
+
+    def sampleDtype(self):
+        if self.formatTag == WAVE_FORMAT_IEEE_FLOAT:
+            return np.dtype(f'<f{self.sampleWidth}')
+        if self.sampleWidth == 1:
+            return np.dtype(np.uint8)
+        return np.dtype(f'<i{self.sampleWidth}')
+
+    def view(self):
+        """Return the samples of a 32 bit float file without copying them,
+        shaped like read() does"""
+        if self.formatTag != WAVE_FORMAT_IEEE_FLOAT or self.sampleWidth != 4:
+            raise UnsupportedWavException('Only 32 bit float files can be viewed',
+                                          f'File: {self.path}')
+        if self.numChannels == 1:
+            return self.frames[:, 0]
+        return self.frames.T
+
+    def read(self, start=0, stop=None, mono=False):
+        """Return frames start to stop as float32 in [-1, 1), shaped like
+        librosa's output: (numSamples,) for mono or single channel files,
+        (numChannels, numSamples) otherwise"""
+        if stop is None or stop > self.numFrames:
+            stop = self.numFrames
+        start = max(0, min(start, stop))
+        raw = self.frames[start:stop]
+
+        if self.formatTag == WAVE_FORMAT_IEEE_FLOAT:
+            samples = raw.astype(np.float32)
+        elif self.sampleWidth == 1:
+            # 8 bit wav is unsigned
+            samples = (raw.astype(np.float32) - 128) / 128
+        elif self.sampleWidth == 3:
+            # Place the 3 bytes in the top of an int32, the shift keeps the sign
+            wide = np.zeros(raw.shape[:-1] + (4,), dtype=np.uint8)
+            wide[..., 1:] = raw
+            samples = (wide.view('<i4')[..., 0] >> 8).astype(np.float32) / 2 ** 23
+        else:
+            samples = raw.astype(np.float32) / 2 ** (8 * self.sampleWidth - 1)
+
+        samples = samples.T
+        if mono and self.numChannels > 1:
+            return samples.mean(axis=0)
+        if self.numChannels == 1:
+            return np.ascontiguousarray(samples[0])
+        return np.ascontiguousarray(samples)
+
+
+class WavWriter:
+    def __init__(self, path, numChannels, sampleRate):
+        """Open path for writing 32 bit float frames. The sizes in the
+        header are filled in by close()"""
+        self.numChannels = numChannels
+        self.sampleRate = sampleRate
+        self.numFrames = 0
+        self.file = open(path, 'wb')
+        self.file.write(self.header())
+
+    def header(self):
+        dataSize = self.numFrames * 4 * self.numChannels
+        fmt = struct.pack('<HHIIHH', WAVE_FORMAT_IEEE_FLOAT, self.numChannels,
+                          self.sampleRate, self.sampleRate * 4 * self.numChannels,
+                          4 * self.numChannels, 32)
+        return (b'RIFF' + struct.pack('<I', 4 + 8 + len(fmt) + 8 + dataSize) + b'WAVE'
+                + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+                + b'data' + struct.pack('<I', dataSize))
+
+    def write(self, block):
+        """Append block, shaped (numSamples,) or (numChannels, numSamples)"""
+        frames = np.asarray(block, dtype='<f4').reshape(self.numChannels, -1).T
+        self.file.write(np.ascontiguousarray(frames).tobytes())
+        self.numFrames += frames.shape[0]
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.file.write(self.header())
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def secondsToFrames(sampleRate, offset=0, duration=None):
+    """Return the (start, stop) frames of a range in secs, truncated like
+    librosa.load does for offset and duration. stop is None when duration is None"""
+    start = int(offset * sampleRate)
+    stop = None
+    if duration is not None:
+        stop = start + int(duration * sampleRate)
+    return start, stop
+
+
+def readWavSegment(path, offset=0, duration=None, mono=False):
+    """Read duration secs of the .wav file at path starting at offset (secs).
+    Returns (signal, sampleRate)"""
+    reader = WavReader(path)
+    start, stop = secondsToFrames(reader.sampleRate, offset, duration)
+    return reader.read(start, stop, mono), reader.sampleRate
@@ -0,0 +1,95 @@
+"""
+Min/max decimation of long signals for plotting.
+
+Instead of handing matplotlib every sample, each trace is reduced to the
+minimum and maximum of a few thousand buckets (about one per pixel),
+which keeps every peak visible. DecimatedTrace re-decimates the visible
+range whenever the user zooms or pans.
+"""
+import numpy as np
+
+# Used when the axes size is not known yet
+DEFAULT_NUM_BUCKETS = 2000
+
+
+def reduceMinMax(lows, highs, start, stop, numBuckets):
+    """Reduce lows[..., start:stop] and highs[..., start:stop] to the min and
+    max of numBuckets buckets. Returns the (fractional) index of each point
+    and the values interleaved as min, max, min, max, ... along the last axis"""
+    edges = np.unique(np.linspace(start, stop, numBuckets + 1).astype(np.int64))
+    bucketStarts = edges[:-1]
+    # fmin/fmax skip NaN values, so gaps only show where a whole bucket is NaN
+    bucketLows = np.fmin.reduceat(lows, bucketStarts, axis=-1)
+    bucketHighs = np.fmax.reduceat(highs, bucketStarts, axis=-1)
+    if stop < lows.shape[-1]:
+        # reduceat runs the last bucket to the end of the array
+        bucketLows[..., -1] = np.fmin.reduce(lows[..., bucketStarts[-1]:stop], axis=-1)
+        bucketHighs[..., -1] = np.fmax.reduce(highs[..., bucketStarts[-1]:stop], axis=-1)
+
+    # Both points of a bucket sit at its center, drawing one vertical stroke
+    centers = (edges[:-1] + edges[1:] - 1) / 2
+    indices = np.repeat(centers, 2)
+    values = np.stack([bucketLows, bucketHighs], axis=-1)
+    return indices, values.reshape(lows.shape[:-1] + (-1,))
+
+
+def minMaxDecimate(signal, start=0, stop=None, numBuckets=DEFAULT_NUM_BUCKETS):
+    """Reduce signal[..., start:stop] to the min and max of numBuckets buckets.
+    Returns the sample index of each point and the values, shaped (..., numPoints).
+    Ranges short enough to plot as they are come back untouched, and
+    ranges outside the signal (panned past either end) come back empty"""
+    signal = np.asarray(signal)
+    numSamples = signal.shape[-1]
+    if stop is None:
+        stop = numSamples
+    start = min(max(start, 0), numSamples)
+    stop = max(min(max(stop, 0), numSamples), start)
+
+    if stop - start <= 2 * numBuckets:
+        return np.arange(start, stop), signal[..., start:stop]
+
+    return reduceMinMax(signal, signal, start, stop, numBuckets)
+
+
+class DecimatedTrace:
+    def __init__(self, ax, signal, timeStep, timeOffset=0, numBuckets=None,
+                 **plotKwargs):
+        """Plot signal (mono or (numChannels, numSamples)) on ax, where
+        sample i is drawn at timeOffset + i * timeStep"""
+        self.ax = ax
+        self.signal = np.asarray(signal)
+        self.timeStep = timeStep
+        self.timeOffset = timeOffset
+        self.numBuckets = numBuckets
+
+        x, y = self.decimate(0, self.totalSamples())
+        self.lines = ax.plot(x, np.transpose(y), **plotKwargs)
+        # A lambda keeps this object alive for as long as the axes,
+        # matplotlib only holds weak references to bound methods
+        ax.callbacks.connect('xlim_changed', lambda axes: self.update())
+
+    def totalSamples(self):
+        return self.signal.shape[-1]
+
+    def bucketCount(self):
+        if self.numBuckets is not None:
+            return self.numBuckets
+        width = self.ax.get_window_extent().width
+        if width > 1:
+            return int(width)
+        return DEFAULT_NUM_BUCKETS
+
+    def decimate(self, start, stop):
+        indices, values = minMaxDecimate(self.signal, start, stop,
+                                         self.bucketCount())
+        return self.timeOffset + indices * self.timeStep, values
+
+    def update(self):
+        """Re-decimate the part of the signal that is currently visible"""
+        low, high = self.ax.get_xlim()
+        start = int(np.floor((low - self.timeOffset) / self.timeStep)) - 1
+        stop = int(np.ceil((high - self.timeOffset) / self.timeStep)) + 2
+        x, y = self.decimate(max(start, 0), stop)
+        for line, channel in zip(self.lines, np.atleast_2d(y)):
+            line.set_data(x, channel)
+        self.ax.figure.canvas.draw_idle()
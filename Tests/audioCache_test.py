@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from Source.audioCache import DecodedAudioCache
+
+
+def fakeDecode(path, offset, duration, mono, sampleRate):
+    numSamples = int(duration * 1000)
+    shape = (numSamples,) if mono else (2, numSamples)
+    return np.full(shape, offset, dtype=np.float32), 1000
+
+
+class Test_DecodedAudioCache(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.audioPath = os.path.join(self.tempDir.name, 'audio.wav')
+        with open(self.audioPath, 'wb') as f:
+            f.write(b'audio')
+        self.decode = mock.Mock(side_effect=fakeDecode)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== load method =================
+
+    def test_load_decodesOncePer_segment(self):
+        cache = DecodedAudioCache(self.decode)
+        first, sr = cache.load(self.audioPath, 1, 2, False)
+        second, _ = cache.load(self.audioPath, 1, 2, False)
+        self.assertIs(first, second)
+        self.assertEqual(sr, 1000)
+        self.assertFalse(first.flags.writeable)
+        self.decode.assert_called_once_with(self.audioPath, 1, 2, False, None)
+
+        # Any part of the key changing means decoding again
+        cache.load(self.audioPath, 1, 2, True)
+        cache.load(self.audioPath, 0, 2, False)
+        cache.load(self.audioPath, 1, 2, False, 22050)
+        self.assertEqual(self.decode.call_count, 4)
+
+    def test_load_decodesAgainOn_modifiedFile(self):
+        cache = DecodedAudioCache(self.decode)
+        cache.load(self.audioPath, 0, 1, True)
+        stat = os.stat(self.audioPath)
+        os.utime(self.audioPath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        cache.load(self.audioPath, 0, 1, True)
+        self.assertEqual(self.decode.call_count, 2)
+
+    def test_load_evictsLeastRecentlyUsed(self):
+        # Room for two mono segments of 1 sec (1000 float32 samples)
+        cache = DecodedAudioCache(self.decode, maxBytes=8000)
+        cache.load(self.audioPath, 0, 1, True)
+        cache.load(self.audioPath, 1, 1, True)
+        cache.load(self.audioPath, 0, 1, True)
+        cache.load(self.audioPath, 2, 1, True)
+        self.assertEqual(cache.totalBytes, 8000)
+        self.assertEqual(len(cache.entries), 2)
+
+        # Offset 1 was the least recently used one
+        cache.load(self.audioPath, 0, 1, True)
+        self.assertEqual(self.decode.call_count, 3)
+        cache.load(self.audioPath, 1, 1, True)
+        self.assertEqual(self.decode.call_count, 4)
+
+    def test_load_bypassesCacheOn_missingFile(self):
+        cache = DecodedAudioCache(self.decode)
+        cache.load('missing.wav', 0, 1, True)
+        cache.load('missing.wav', 0, 1, True)
+        self.assertEqual(self.decode.call_count, 2)
+        self.assertEqual(len(cache.entries), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+from Source.automation import Envelope, parseEnvelopeText, renderAutomation
+from Source.blockRunner import runBlocks
+
+
+class Test_Automation(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.sampleRate = 1000
+        self.envelope = Envelope([(0.5, 1), (1, 10, 'exp'), (0, 1), (2, 100)])
+
+    #  =============== Tests =================
+
+    def test_valuesAt_linearExponentialAndHeld(self):
+        values = self.envelope.valuesAt([0, 0.25, 0.5, 1, 1.5, 2, 3])
+        np.testing.assert_allclose(values, [1, 1, 1, 10, np.sqrt(10) * 10, 100, 100])
+        # Linear from 0.5 to 1 secs, between 1 and 10
+        np.testing.assert_allclose(self.envelope.valuesAt(0.75), 5.5)
+
+    def test_valuesAt_stepOnSameTime(self):
+        envelope = Envelope([(0, 0), (1, 0), (1, 1), (2, 1)])
+        np.testing.assert_allclose(envelope.valuesAt([0.999, 1, 1.5]), [0, 1, 1])
+
+    def test_render_oneValuePerSampleOrBlock(self):
+        curve = self.envelope.render(2000, self.sampleRate)
+        self.assertEqual(curve.shape, (2000,))
+        self.assertAlmostEqual(curve[750], 5.5)
+        blocks = Envelope(self.envelope.points, 'block', 100).render(2000, self.sampleRate)
+        np.testing.assert_allclose(blocks, curve[::100])
+
+    def test_runBlocks_blocksSeeTheirPartOfTheCurve(self):
+        seen = []
+
+        def processBlock(block, numChannels, numSamples, sampleRate, state, gain, step):
+            seen.append((gain, step))
+            return block * gain
+
+        inS = np.ones((2, 2000))
+        blocks = Envelope(self.envelope.points, 'block', 64)
+        output = []
+        runBlocks(processBlock, lambda start, stop: inS[:, start:stop], output.append,
+                  0, 2000, 300, 2, self.sampleRate, {'gain': self.envelope, 'step': blocks})
+        # Sample-accurate across block boundaries
+        np.testing.assert_allclose(np.concatenate(output, axis=1)[0],
+                                   self.envelope.render(2000, self.sampleRate))
+        self.assertEqual([step for _, step in seen],
+                         [float(blocks.valuesAt(s / self.sampleRate)) for s in range(0, 2000, 300)])
+
+    def test_renderAutomation_leavesOtherParameters(self):
+        parameters = {'gain': 2.0, 'cutoff': self.envelope}
+        rendered = renderAutomation(parameters, 10, self.sampleRate, offset=500)
+        self.assertEqual(rendered['gain'], 2.0)
+        np.testing.assert_allclose(rendered['cutoff'], np.linspace(1, 1.162, 10))
+        self.assertIs(parameters['cutoff'], self.envelope)
+        self.assertEqual(renderAutomation([1, 0, 0, 0], 10, self.sampleRate), [1, 0, 0, 0])
+
+    def test_parseEnvelopeText_breakpointsAndConstants(self):
+        self.assertEqual(parseEnvelopeText('0:0.1 exp, 1.5:1, 3:0.5 lin').points,
+                         [(0, 0.1, 'exp'), (1.5, 1, 'linear'), (3, 0.5, 'linear')])
+        self.assertEqual(parseEnvelopeText(' 0.5 ').points, [(0, 0.5, 'linear')])
+
+    def test_raiseOn_invalidEnvelope(self):
+        for points, text in (([(0, 1, 'exp'), (1, -1)], '0:1 exp, 1:-1'),
+                             ([(-1, 1)], '-1:1'),
+                             ([], ''),
+                             ([(0, 1, 'cubic')], '0:1 cubic')):
+            with self.subTest(points=points):
+                with self.assertRaises(ValueError):
+                    Envelope(points)
+                with self.assertRaises(ValueError):
+                    parseEnvelopeText(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
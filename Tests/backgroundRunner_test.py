@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from Source.backgroundRunner import BackgroundRunner, Run
+from Source.exceptions import RunCancelledException
+
+
+class Test_BackgroundRunner(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.runner = BackgroundRunner()
+        self.done = []
+        self.errors = []
+        self.cancelled = []
+        self.progress = []
+        self.callbacks = {'onDone': self.done.append,
+                          'onError': lambda error, text: self.errors.append(error),
+                          'onCancelled': lambda run: self.cancelled.append(run.name),
+                          'onProgress': lambda run, fraction, message:
+                              self.progress.append((fraction, message))}
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def waitForRuns(self, timeout=10):
+        """Poll like the Tk mainloop would, until every run has finished"""
+        deadline = time.monotonic() + timeout
+        while self.runner.isBusy():
+            self.assertLess(time.monotonic(), deadline, 'Runs did not finish')
+            self.runner.poll()
+            time.sleep(0.01)
+
+    #  =============== Tests =================
+
+    def test_submit_deliversResultAndProgressOnPoll(self):
+        def task(run, value):
+            run.checkpoint(0.5, 'Halfway')
+            return value * 2
+
+        self.runner.submit('double', task, 21, **self.callbacks)
+        # Nothing is delivered before a poll
+        time.sleep(0.1)
+        self.assertEqual(self.done, [])
+        self.waitForRuns()
+        self.assertEqual(self.done, [42])
+        self.assertEqual(self.progress, [(0.5, 'Halfway')])
+
+    def test_submit_supersedesRunOfSameName(self):
+        started = threading.Event()
+
+        def slowTask(run):
+            started.set()
+            while True:
+                run.checkpoint()
+                time.sleep(0.01)
+
+        self.runner.submit('process', slowTask, **self.callbacks)
+        started.wait(5)
+        self.runner.submit('process', lambda run: 'new', **self.callbacks)
+        self.runner.submit('plot', lambda run: 'other', **self.callbacks)
+        self.waitForRuns()
+        # The superseded run is dropped quietly, other names are kept
+        self.assertEqual(self.done, ['new', 'other'])
+        self.assertEqual(self.cancelled, [])
+
+    def test_cancel_abortsBlockingCall(self):
+        release = threading.Event()
+
+        def blockingTask(run):
+            with run.cancelWith(release.set):
+                release.wait(10)
+                raise OSError('Pipe closed')
+
+        self.runner.submit('process', blockingTask, **self.callbacks)
+        time.sleep(0.1)
+        self.runner.cancel()
+        self.waitForRuns()
+        self.assertEqual(self.cancelled, ['process'])
+        self.assertEqual(self.errors, [])
+        self.assertEqual(self.done, [])
+
+    def test_poll_reportsErrors(self):
+        def failingTask(run):
+            raise ValueError('Bad input')
+
+        self.runner.submit('process', failingTask, **self.callbacks)
+        self.waitForRuns()
+        self.assertEqual(len(self.errors), 1)
+        self.assertIsInstance(self.errors[0], ValueError)
+
+    def test_run_checkpointRaisesOnceCancelled(self):
+        run = Run('direct')
+        run.checkpoint(0.1, 'No queue, progress is ignored')
+        run.cancel()
+        with self.assertRaises(RunCancelledException):
+            run.checkpoint()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from Source.batchCli import findInputFiles, main
+from Source.wavReader import WavReader, WavWriter
+
+
+class Test_BatchCli(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.inDir = os.path.join(self.tempDir.name, 'in')
+        self.outDir = os.path.join(self.tempDir.name, 'out')
+        os.makedirs(self.inDir)
+        rng = np.random.default_rng(8)
+        self.signals = {}
+        for name in ('a', 'b', 'c'):
+            signal = rng.uniform(-0.5, 0.5, (2, 8000)).astype(np.float32)
+            with WavWriter(os.path.join(self.inDir, name + '.wav'), 2, 4000) as writer:
+                writer.write(signal)
+            self.signals[name] = signal
+        with open(os.path.join(self.inDir, 'notes.txt'), 'w') as f:
+            f.write('not audio')
+
+        self.scriptPath = os.path.join(self.tempDir.name, 'userCode.py')
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+            userPy.write('    return input * p1\n')
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    def test_findInputFiles_expandsDirectoriesAndGlobs(self):
+        expected = [os.path.join(self.inDir, n + '.wav') for n in ('a', 'b', 'c')]
+        self.assertEqual(findInputFiles([self.inDir]), expected)
+        self.assertEqual(findInputFiles([os.path.join(self.inDir, '[ab].wav')]),
+                         expected[:2])
+
+    def test_main_processesEveryFile(self):
+        code = main([self.inDir, '--script', self.scriptPath, '--start', '0.5',
+                     '--end', '1.5', '--params', '0.5', '--out', self.outDir,
+                     '--jobs', '2'])
+        self.assertEqual(code, 0)
+        for name, signal in self.signals.items():
+            with self.subTest(file=name):
+                out = WavReader(os.path.join(self.outDir, name + '_processed.wav')).view()
+                np.testing.assert_allclose(out, signal[:, 2000:6000] * 0.5)
+                with open(os.path.join(self.outDir, name + '_report.json')) as f:
+                    report = json.load(f)
+                self.assertEqual(report['parameters'], [0.5, 0, 0, 0])
+                self.assertAlmostEqual(report['metrics']['meanGainDb'], -6.02, places=2)
+                self.assertEqual(len(report['gainReduction']['gainDb']), 2)
+
+        with open(os.path.join(self.outDir, 'report.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r['status'] for r in rows], ['ok'] * 3)
+
+    def test_main_reportsFailedFiles(self):
+        with open(os.path.join(self.inDir, 'broken.wav'), 'wb') as f:
+            f.write(b'RIFF....WAVEjunk')
+        code = main([self.inDir, '--script', self.scriptPath, '--params', '1',
+                     '--out', self.outDir, '--jobs', '1'])
+        self.assertEqual(code, 1)
+        with open(os.path.join(self.outDir, 'report.csv')) as f:
+            statuses = {os.path.basename(r['file']): r['status'] for r in csv.DictReader(f)}
+        self.assertEqual(statuses['broken.wav'], 'failed')
+        self.assertEqual(statuses['a.wav'], 'ok')
+
+    def test_main_nullTestsAgainstReference(self):
+        referenceDir = os.path.join(self.tempDir.name, 'reference')
+        self.assertEqual(main([self.inDir, '--script', self.scriptPath, '--params', '0.5',
+                               '--out', referenceDir, '--jobs', '1']), 0)
+        os.remove(os.path.join(referenceDir, 'c_processed.wav'))
+        code = main([self.inDir, '--script', self.scriptPath, '--params', '0.6',
+                     '--out', self.outDir, '--jobs', '1', '--reference', referenceDir])
+        self.assertEqual(code, 1)
+        with open(os.path.join(self.outDir, 'report.csv')) as f:
+            rows = {os.path.basename(r['file']): r for r in csv.DictReader(f)}
+        self.assertEqual(rows['a.wav']['status'], 'regression')
+        self.assertEqual(rows['a.wav']['nullTest'], 'failed')
+        self.assertEqual(rows['a.wav']['latencySamples'], '0')
+        self.assertEqual(rows['c.wav']['nullTest'], 'missing')
+        self.assertEqual(rows['c.wav']['status'], 'ok')
+        with open(os.path.join(self.outDir, 'a_report.json')) as f:
+            self.assertEqual(json.load(f)['nullTest']['nullTest'], 'failed')
+
+        code = main([self.inDir, '--script', self.scriptPath, '--params', '0.5',
+                     '--out', self.outDir, '--jobs', '1', '--reference', referenceDir])
+        self.assertEqual(code, 0)
+
+    def test_main_setsDeclaredParameters(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write("PARAMETERS = [{'name': 'gain', 'type': 'float', 'default': 1},\n")
+            userPy.write("              {'name': 'mix', 'type': 'array', 'shape': (2,), 'default': [1, 1]}]\n")
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, gain, mix):\n')
+            userPy.write('    return input * gain * mix[:, None]\n')
+        code = main([os.path.join(self.inDir, 'a.wav'), '--script', self.scriptPath,
+                     '--set', 'mix=0.5, 0.25', '--out', self.outDir])
+        self.assertEqual(code, 0)
+        out = WavReader(os.path.join(self.outDir, 'a_processed.wav')).view()
+        np.testing.assert_allclose(out, self.signals['a'] * [[0.5], [0.25]])
+        with open(os.path.join(self.outDir, 'a_report.json')) as f:
+            self.assertEqual(json.load(f)['parameters'], {'gain': 1.0, 'mix': [0.5, 0.25]})
+
+        for wrong in (['--set', 'volume=1'], ['--set', 'mix=1, 2, 3'], ['--params', '1']):
+            with self.subTest(arguments=wrong):
+                self.assertEqual(main([self.inDir, '--script', self.scriptPath,
+                                       '--out', self.outDir] + wrong), 2)
+
+    def test_main_rejectOn_invalidRange(self):
+        self.assertEqual(main([self.inDir, '--script', self.scriptPath,
+                               '--start', '2', '--end', '1']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from Benchmarks.benchmarkPipeline import (compareToBaseline, formatResult,
+                                          makeSignal, runCase)
+
+
+class Test_BenchmarkPipeline(unittest.TestCase):
+
+    #  =============== Tests =================
+
+    def test_makeSignal_shapes(self):
+        self.assertEqual(makeSignal(0.5, 8000, 1).shape, (4000,))
+        self.assertEqual(makeSignal(0.5, 8000, 2).shape, (2, 4000))
+
+    def test_runCase_timesEveryStage(self):
+        stages = ['decodeWavReader', 'computeGain', 'gainReductionRms']
+        results = runCase(0.1, 8000, 2, stages, repeats=1)
+
+        self.assertEqual([r['stage'] for r in results], stages)
+        for result in results:
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['samplesPerSecond'], 0)
+            self.assertGreater(result['peakBytes'], 0)
+            self.assertIn('MS/s', formatResult(result))
+
+    def test_compareToBaseline_flagsSlowStages(self):
+        base = {'duration': 1, 'sampleRate': 8000, 'numChannels': 1}
+        baseline = [dict(base, stage='fast', seconds=1.0),
+                    dict(base, stage='slow', seconds=1.0)]
+        results = [dict(base, stage='fast', seconds=1.1, samplesPerSecond=1, peakBytes=0),
+                   dict(base, stage='slow', seconds=1.5, samplesPerSecond=1, peakBytes=0),
+                   dict(base, stage='new', seconds=1.0, samplesPerSecond=1, peakBytes=0)]
+
+        lines, regressions = compareToBaseline(results, baseline, 0.2)
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(regressions, [('slow', 1, 8000, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
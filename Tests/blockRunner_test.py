@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+from Source.blockRunner import runBlocks
+
+
+def runningSum(block, numChannels, numSamples, sampleRate, state, p1, p2, p3, p4):
+    """Cumulative sum over the whole run, needs the state of the previous block"""
+    out = np.cumsum(block, axis=-1) + state.get('last', 0)
+    state['last'] = out[..., -1:]
+    state.setdefault('sizes', []).append(numSamples)
+    return out * p1
+
+
+class Test_BlockRunner(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.signal = np.random.default_rng(4).standard_normal((2, 10000))
+        self.blocks = []
+
+    #  =============== Tests =================
+
+    # =============== runBlocks function =================
+
+    def test_runBlocks_keepsStateBetweenBlocks(self):
+        state = runBlocks(runningSum,
+                          lambda a, b: self.signal[:, a:b],
+                          self.blocks.append,
+                          1000, 9500, 512, 2, 44100, [2, 0, 0, 0])
+        out = np.concatenate(self.blocks, axis=-1)
+        np.testing.assert_allclose(out, 2 * np.cumsum(self.signal[:, 1000:9500], axis=-1))
+        # Last block is the remainder
+        self.assertEqual(state['sizes'][-1], (9500 - 1000) % 512)
+        self.assertEqual(sum(state['sizes']), 8500)
+
+    def test_runBlocks_raiseOn_wrongBlockShape(self):
+        with self.assertRaises(ValueError):
+            runBlocks(lambda block, *args: block[0],
+                      lambda a, b: self.signal[:, a:b],
+                      self.blocks.append, 0, 1000, 256, 2, 44100, [0, 0, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+from Source.backgroundRunner import Run
+from Source.chunkRender import chunkBounds, renderChunked
+from Source.exceptions import RunCancelledException, ScriptReturnCodeException
+
+
+def writeScript(path, body):
+    with open(path, 'w') as userPy:
+        userPy.write('import numpy as np\n')
+        userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+        userPy.write(body)
+
+
+class Test_ChunkRender(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.scriptPath = os.path.join(self.tempDir.name, 'userCode.py')
+        self.inS = np.random.default_rng(7).uniform(-0.5, 0.5, (2, 20000))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def assertNoMappedFiles(self):
+        self.assertEqual([f for f in os.listdir(self.tempDir.name) if f.endswith('.mmap')], [])
+
+    #  =============== Tests =================
+
+    def test_chunkBounds_coverRangeWithPreRoll(self):
+        bounds = chunkBounds(1000, 300, 50)
+        self.assertEqual(bounds, [(0, 0, 300), (250, 300, 600),
+                                  (550, 600, 900), (850, 900, 1000)])
+
+    def test_renderChunked_matchesFullRenderOf_shortMemoryFilter(self):
+        # 64 tap moving average: settled after 63 samples of pre-roll
+        writeScript(self.scriptPath,
+                    '    taps = np.ones(int(p1)) / p1\n'
+                    '    return np.stack([np.convolve(c, taps)[:numSamples] for c in input])\n')
+        full = np.stack([np.convolve(c, np.ones(64) / 64)[:20000] for c in self.inS])
+        out = renderChunked(self.scriptPath, self.inS, 44100, [64, 0, 0, 0],
+                            self.tempDir.name, chunkSize=3000, overlap=256,
+                            crossfade=64, maxWorkers=3)
+        np.testing.assert_allclose(out, full, atol=1e-12)
+        self.assertNoMappedFiles()
+
+    def test_renderChunked_crossfadesSeams(self):
+        # Output depends on the chunk start, so seams are visible without a fade
+        writeScript(self.scriptPath, '    return input * 0 + input[..., :1]\n')
+        out = renderChunked(self.scriptPath, self.inS, 44100, [0, 0, 0, 0],
+                            self.tempDir.name, chunkSize=5000, overlap=100,
+                            crossfade=100, maxWorkers=2)
+        seam = out[0, 4900:5000]
+        before, after = self.inS[0, 0], self.inS[0, 4900]
+        # Monotonic blend from the previous chunk's value to the next one's
+        self.assertTrue(np.all(np.diff(seam) * np.sign(after - before) > 0))
+        self.assertEqual(out[0, 5000], after)
+
+    def test_renderChunked_cancelledBy_run(self):
+        writeScript(self.scriptPath, '    import time\n    time.sleep(60)\n    return input\n')
+        run = Run('renderChunked')
+        timer = threading.Timer(1, run.cancel)
+        timer.start()
+        started = time.perf_counter()
+        with self.assertRaises(RunCancelledException):
+            renderChunked(self.scriptPath, self.inS, 44100, [0, 0, 0, 0],
+                          self.tempDir.name, chunkSize=5000, maxWorkers=2, run=run)
+        timer.join()
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertNoMappedFiles()
+
+    def test_renderChunked_raiseOn_userCodeError(self):
+        writeScript(self.scriptPath, '    raise RuntimeError("chunk failed")\n')
+        with self.assertRaises(ScriptReturnCodeException) as cm:
+            renderChunked(self.scriptPath, self.inS, 44100, [0, 0, 0, 0],
+                          self.tempDir.name, chunkSize=10000, maxWorkers=1)
+        self.assertIn('chunk failed', cm.exception.error)
+        self.assertNoMappedFiles()
+
+
+if __name__ == '__main__':
+    unittest.main()
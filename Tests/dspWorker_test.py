@@ -0,0 +1,249 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+from Source.arrayTransport import ArrayTransport
+from Source.automation import Envelope
+from Source.dspWorker import DspWorker, loadUserFunction
+from Source.exceptions import ScriptReturnCodeException
+from Source.stageTimer import StageTimer
+from Source.wavReader import WavReader, WavWriter
+
+
+def writeScript(path, body):
+    with open(path, 'w') as userPy:
+        userPy.write('import os\n')
+        userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+        userPy.write(body)
+
+
+class Test_DspWorker(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.scriptPath = os.path.join(self.tempDir.name, 'userCode.py')
+        writeScript(self.scriptPath, '    return input * p1\n')
+        self.worker = DspWorker()
+        self.inS = np.ones((2, 16), dtype=np.float32)
+
+    def tearDown(self):
+        self.worker.stop()
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== loadUserFunction function =================
+
+    def test_loadUserFunction_reloadOnlyOn_changedSource(self):
+        cache = {}
+        first = loadUserFunction(self.scriptPath, cache)
+        self.assertIs(loadUserFunction(self.scriptPath, cache), first)
+
+        # Same context, new mtime: keep the already imported function
+        stat = os.stat(self.scriptPath)
+        writeScript(self.scriptPath, '    return input * p1\n')
+        os.utime(self.scriptPath, (stat.st_atime, stat.st_mtime + 1))
+        self.assertIs(loadUserFunction(self.scriptPath, cache), first)
+
+        writeScript(self.scriptPath, '    return input * p2\n')
+        os.utime(self.scriptPath, (stat.st_atime, stat.st_mtime + 2))
+        second = loadUserFunction(self.scriptPath, cache)
+        self.assertIsNot(second, first)
+
+        # New context saved within the same mtime: still reloaded
+        writeScript(self.scriptPath, '    return input * p3\n')
+        os.utime(self.scriptPath, (stat.st_atime, stat.st_mtime + 2))
+        self.assertIsNot(loadUserFunction(self.scriptPath, cache), second)
+
+    # =============== run method =================
+
+    def test_run_returnsUserCodeOutput(self):
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [3, 0, 0, 0])
+        np.testing.assert_array_equal(out, self.inS * 3)
+
+    def test_run_keepsWorkerAliveBetweenRuns(self):
+        self.worker.run(self.scriptPath, self.inS, 2, 16, 44100, [1, 0, 0, 0])
+        pid = self.worker.process.pid
+        self.worker.run(self.scriptPath, self.inS, 2, 16, 44100, [2, 0, 0, 0])
+        self.assertEqual(self.worker.process.pid, pid)
+
+    def test_run_picksUpEditedScript(self):
+        self.worker.run(self.scriptPath, self.inS, 2, 16, 44100, [1, 5, 0, 0])
+        # Make sure the new mtime differs on coarse grained filesystems
+        time.sleep(0.01)
+        writeScript(self.scriptPath, '    return input * p2\n')
+        stat = os.stat(self.scriptPath)
+        os.utime(self.scriptPath, (stat.st_atime, stat.st_mtime + 1))
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [1, 5, 0, 0])
+        np.testing.assert_array_equal(out, self.inS * 5)
+
+    def test_run_raiseOn_userCodeException(self):
+        writeScript(self.scriptPath, '    raise ValueError("bad dsp")\n')
+        with self.assertRaises(ScriptReturnCodeException) as cm:
+            self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                            [0, 0, 0, 0])
+        self.assertIn('bad dsp', cm.exception.error)
+
+    def test_run_recoversFrom_crashedWorker(self):
+        writeScript(self.scriptPath, '    os._exit(3)\n')
+        with self.assertRaises(ScriptReturnCodeException):
+            self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                            [0, 0, 0, 0])
+        self.assertFalse(self.worker.isAlive())
+
+        writeScript(self.scriptPath, '    return input\n')
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [0, 0, 0, 0])
+        np.testing.assert_array_equal(out, self.inS)
+
+    def test_cancel_abortsRunningJob(self):
+        writeScript(self.scriptPath, '    import time\n    time.sleep(60)\n')
+        self.worker.start()
+        timer = threading.Timer(1, self.worker.cancel)
+        timer.start()
+        started = time.perf_counter()
+        with self.assertRaises(ScriptReturnCodeException):
+            self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                            [0, 0, 0, 0])
+        timer.join()
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertFalse(self.worker.isAlive())
+
+    # =============== run method with an ArrayTransport =================
+
+    def test_runMapped_returnsUserCodeOutput(self):
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [3, 0, 0, 0])
+        np.testing.assert_array_equal(out, self.inS * 3)
+        self.assertNotIsInstance(out, np.memmap)
+
+    def test_runMapped_writesInto_outBuffer(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate,\n')
+            userPy.write('             p1, p2, p3, p4, outBuffer=None):\n')
+            userPy.write('    outBuffer[...] = input * p1\n')
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [-1, 0, 0, 0])
+        np.testing.assert_array_equal(out, -self.inS)
+
+    def test_runMapped_passesDeclaredParametersByName(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('import numpy as np\n')
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, gain, taps):\n')
+            userPy.write('    return gain * np.stack([np.convolve(c, taps)[:numSamples] for c in input])\n')
+        taps = np.array([0.5, 0.25, 0.25])
+        expected = 2 * np.stack([np.convolve(c, taps)[:16] for c in self.inS])
+        for transport in (None, ArrayTransport(self.tempDir.name)):
+            with self.subTest(transport=transport):
+                self.worker.transport = transport
+                out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                                      {'taps': taps, 'gain': 2.0})
+                np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+    def test_run_rendersAutomationInWorker(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, gain):\n')
+            userPy.write('    return input * gain\n')
+        envelope = Envelope([(0, 0), (15 / 1000, 1.5)])
+        for transport in (None, ArrayTransport(self.tempDir.name)):
+            with self.subTest(transport=transport):
+                self.worker.transport = transport
+                out = self.worker.run(self.scriptPath, self.inS, 2, 16, 1000,
+                                      {'gain': envelope})
+                np.testing.assert_allclose(out, self.inS * np.linspace(0, 1.5, 16), rtol=1e-6)
+
+    def test_runMapped_recordsStagesOfBothProcesses(self):
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        timer = StageTimer()
+        self.worker.run(self.scriptPath, self.inS, 2, 16, 44100, [3, 0, 0, 0],
+                        timer)
+        stages = [(s['process'], s['stage']) for s in timer.stages]
+        for stage in [('main', 'writeInput'), ('worker', 'loadScript'),
+                      ('worker', 'userCode'), ('worker', 'writeOutput'),
+                      ('main', 'worker'), ('main', 'readOutput')]:
+            self.assertIn(stage, stages)
+
+    def test_runMapped_profilesUserCodeOnRequest(self):
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        self.worker.run(self.scriptPath, self.inS, 2, 16, 44100, [3, 0, 0, 0])
+        self.assertIsNone(self.worker.lastProfile)
+
+        out = self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                              [3, 0, 0, 0], profile=True)
+        np.testing.assert_array_equal(out, self.inS * 3)
+        self.assertIn('Hot spots', self.worker.lastProfile)
+        self.assertIn('return input * p1', self.worker.lastProfile)
+
+    def test_runRealTime_fallsBackTo_userCodePerBlock(self):
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        reports = self.worker.runRealTime(
+            self.scriptPath, np.ones((2, 1000)), 48000, [2, 0, 0, 0], [64, 256])
+        self.assertEqual([r['blockSize'] for r in reports], [64, 256])
+        self.assertEqual(reports[0]['numBlocks'], 16)
+
+    def test_runMapped_raiseOn_wrongOutputShape(self):
+        writeScript(self.scriptPath, '    return input[0]\n')
+        self.worker.transport = ArrayTransport(self.tempDir.name)
+        with self.assertRaises(ScriptReturnCodeException):
+            self.worker.run(self.scriptPath, self.inS, 2, 16, 44100,
+                            [0, 0, 0, 0])
+
+    # =============== runStream method =================
+
+    def test_runStream_writesProcessedBlocks(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def processBlock(block, numChannels, numSamples, sampleRate,\n')
+            userPy.write('                 state, p1, p2, p3, p4):\n')
+            userPy.write('    state["calls"] = state.get("calls", 0) + 1\n')
+            userPy.write('    return block * p1 + state["calls"]\n')
+        inputPath = os.path.join(self.tempDir.name, 'in.wav')
+        outputPath = os.path.join(self.tempDir.name, 'out.wav')
+        signal = np.random.default_rng(5).uniform(-1, 1, (2, 5000)).astype(np.float32)
+        with WavWriter(inputPath, 2, 8000) as writer:
+            writer.write(signal)
+
+        self.worker.runStream(self.scriptPath, inputPath, 1000, 4000, False,
+                              1024, outputPath, [0.5, 0, 0, 0])
+        out = WavReader(outputPath).view()
+        # Blocks start at frame 1000, so the third one is the short remainder
+        blockNumber = np.arange(3000) // 1024 + 1
+        np.testing.assert_allclose(out, signal[:, 1000:4000] * 0.5 + blockNumber,
+                                   rtol=1e-6)
+
+        # Mono streams downmix the input
+        self.worker.runStream(self.scriptPath, inputPath, 0, None, True,
+                              8192, outputPath, [1, 0, 0, 0])
+        np.testing.assert_allclose(WavReader(outputPath).view(),
+                                   signal.mean(axis=0) + 1, rtol=1e-6)
+
+    def test_runStream_writesInputCopy(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def processBlock(block, numChannels, numSamples, sampleRate,\n')
+            userPy.write('                 state, p1, p2, p3, p4):\n')
+            userPy.write('    block *= p1\n')
+            userPy.write('    return block\n')
+        inputPath = os.path.join(self.tempDir.name, 'in.wav')
+        outputPath = os.path.join(self.tempDir.name, 'out.wav')
+        copyPath = os.path.join(self.tempDir.name, 'copy.wav')
+        signal = np.random.default_rng(6).uniform(-1, 1, (2, 5000)).astype(np.float32)
+        with WavWriter(inputPath, 2, 8000) as writer:
+            writer.write(signal)
+
+        # The copy is what processBlock was fed, before it scaled it in place
+        self.worker.runStream(self.scriptPath, inputPath, 1000, 4000, True,
+                              1024, outputPath, [2, 0, 0, 0], inputCopyPath=copyPath)
+        copy = WavReader(copyPath).view()
+        np.testing.assert_allclose(copy, signal[:, 1000:4000].mean(axis=0), rtol=1e-6)
+        np.testing.assert_allclose(WavReader(outputPath).view(), copy * 2, rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
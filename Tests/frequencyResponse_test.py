@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+from Source.frequencyResponse import averagedSpectra, selectFrames, transferFunction
+
+
+def fir(signal, taps):
+    """Filter every channel of signal with the FIR taps"""
+    return np.apply_along_axis(lambda x: np.convolve(x, taps)[:len(x)], -1, signal)
+
+
+class Test_FrequencyResponse(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.signal = np.random.default_rng(9).standard_normal((2, 200000))
+        self.taps = np.array([0.5, 0.3, -0.1])
+
+    #  =============== Tests =================
+
+    def test_transferFunction_matchesFilterResponse(self):
+        output = fir(self.signal, self.taps)
+        response = transferFunction(self.signal, output, 48000, fftSize=1024)
+        expected = np.fft.rfft(self.taps, 1024)
+
+        self.assertEqual(response['response'].shape, (2, 513))
+        np.testing.assert_allclose(response['magnitudeDb'],
+                                   np.broadcast_to(20 * np.log10(np.abs(expected)), (2, 513)),
+                                   atol=0.05)
+        np.testing.assert_allclose(response['phase'][0], np.unwrap(np.angle(expected)), atol=0.01)
+        self.assertGreater(np.min(response['coherence']), 0.99)
+        self.assertEqual(response['frequencies'][-1], 24000)
+
+    def test_transferFunction_lowCoherenceOn_noise(self):
+        output = self.signal[0] * 0.5 + np.random.default_rng(1).standard_normal(200000)
+        response = transferFunction(self.signal[0], output, 48000, fftSize=512)
+        # Signal to noise power is 0.25, so coherence is around 0.25 / 1.25
+        self.assertAlmostEqual(float(np.mean(response['coherence'])), 0.2, delta=0.03)
+        self.assertAlmostEqual(float(np.mean(np.abs(response['response']))), 0.5, delta=0.05)
+
+    def test_transferFunction_nanOn_silentInput(self):
+        silence = np.zeros(4096)
+        response = transferFunction(silence, silence, 48000, fftSize=1024)
+        self.assertTrue(np.all(np.isnan(response['magnitudeDb'])))
+        self.assertTrue(np.all(np.isnan(response['coherence'])))
+
+    def test_averagedSpectra_maxFramesSpreadsOverSignal(self):
+        np.testing.assert_array_equal(selectFrames(5, None), np.arange(5))
+        np.testing.assert_array_equal(selectFrames(9, 3), [0, 4, 8])
+        # Capped and full averages of a stationary signal agree
+        full = averagedSpectra(self.signal, self.signal, 256, maxFrames=None)[0]
+        capped = averagedSpectra(self.signal, self.signal, 256, maxFrames=400)[0]
+        np.testing.assert_allclose(capped.mean(axis=-1), full.mean(axis=-1), rtol=0.05)
+
+    def test_averagedSpectra_raiseOn_shapeMismatch(self):
+        with self.assertRaises(ValueError):
+            averagedSpectra(self.signal, self.signal[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
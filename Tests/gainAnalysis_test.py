@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+from Source.gainAnalysis import computeEnvelope, computeGain, computeGainReduction
+
+
+def loopGain(inS, outS):
+    """Reference implementation (the per-sample loop plotGain used to run)"""
+    g = np.zeros(len(inS))
+    for sample in range(len(inS)):
+        if inS[sample] != 0:
+            g[sample] = outS[sample] / inS[sample]
+        elif sample > 0:
+            g[sample] = g[sample - 1]
+    return g
+
+
+class Test_GainAnalysis(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.inS = rng.standard_normal(1000)
+        # Sprinkle exact zeros, including the first samples
+        self.inS[:3] = 0
+        self.inS[rng.integers(0, 1000, 100)] = 0
+        self.outS = self.inS * 0.5 + 0.01
+
+    #  =============== Tests =================
+
+    # =============== computeGain function =================
+
+    def test_computeGain_matchesLoopOn_mono(self):
+        np.testing.assert_allclose(computeGain(self.inS, self.outS),
+                                   loopGain(self.inS, self.outS))
+
+    def test_computeGain_fillsChannelsSeparatelyOn_stereo(self):
+        inS = np.stack([self.inS, self.inS[::-1]])
+        outS = np.stack([self.outS, self.outS[::-1] * 2])
+        g = computeGain(inS, outS)
+        self.assertEqual(g.shape, inS.shape)
+        for c in range(2):
+            with self.subTest(channel=c):
+                np.testing.assert_allclose(g[c], loopGain(inS[c], outS[c]))
+
+    def test_computeGain_keepsFloat32(self):
+        g = computeGain(self.inS.astype(np.float32),
+                        self.outS.astype(np.float32))
+        self.assertEqual(g.dtype, np.float32)
+
+    def test_computeGain_raiseOn_shapeMismatch(self):
+        with self.assertRaises(ValueError):
+            computeGain(self.inS, self.outS[:-1])
+
+    # =============== computeEnvelope function =================
+
+    def test_computeEnvelope_matchesFramedReference(self):
+        window, hop = 64, 16
+        starts = range(0, len(self.inS) - window + 1, hop)
+        frames = np.array([self.inS[s:s + window] for s in starts])
+        expected = {'rms': np.sqrt(np.mean(frames ** 2, axis=1)),
+                    'peak': np.max(np.abs(frames), axis=1)}
+        for mode in expected:
+            with self.subTest(mode=mode):
+                np.testing.assert_allclose(
+                    computeEnvelope(self.inS, window, hop, mode),
+                    expected[mode])
+
+    def test_computeEnvelope_shortSignalGivesOneFrame(self):
+        env = computeEnvelope(np.ones((2, 10)), 1024, 512, 'peak')
+        np.testing.assert_array_equal(env, np.ones((2, 1)))
+
+    def test_computeEnvelope_raiseOn_unknownMode(self):
+        with self.assertRaises(ValueError):
+            computeEnvelope(self.inS, 64, 16, 'median')
+
+    # =============== computeGainReduction function =================
+
+    def test_computeGainReduction_constantGainIn_dB(self):
+        inS = np.stack([self.inS, self.inS])
+        outS = inS * np.array([[0.5], [2.0]])
+        centers, gainDb = computeGainReduction(inS, outS, 100, 50)
+        self.assertEqual(gainDb.shape, (2, len(centers)))
+        self.assertEqual(centers[0], 50)
+        np.testing.assert_allclose(gainDb[0], 20 * np.log10(0.5))
+        np.testing.assert_allclose(gainDb[1], 20 * np.log10(2.0))
+
+    def test_computeGainReduction_nanOn_silentInput(self):
+        inS = np.concatenate([np.zeros(100), np.ones(100)])
+        _, gainDb = computeGainReduction(inS, inS * 0.1, 100, 100)
+        self.assertTrue(np.isnan(gainDb[0]))
+        self.assertAlmostEqual(gainDb[1], -20)
+
+
+if __name__ == '__main__':
+    unittest.main()
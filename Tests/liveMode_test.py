@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+from Source.liveMode import Debouncer, ResultCache, renderKey
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def makeResult(numSamples):
+    signal = np.zeros((2, numSamples), dtype=np.float32)
+    return {'inputS': signal, 'output': signal.copy()}
+
+
+class Test_LiveMode(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.clock = FakeClock()
+        self.debouncer = Debouncer(0.5, self.clock)
+
+    def feed(self, key, seconds):
+        """Feed key every 0.1 secs for seconds, return what came back"""
+        returned = []
+        for _ in range(int(round(seconds / 0.1))):
+            returned.append(self.debouncer.update(key))
+            self.clock.now += 0.1
+        return [k for k in returned if k is not None]
+
+    #  =============== Tests =================
+
+    def test_renderKey_changesWithEveryInput(self):
+        base = ('code', [1, 0.5, 0, 0], 0, 10, False, 'a.wav', 1, 'whole')
+        key = renderKey(*base)
+        self.assertEqual(key, renderKey(*base))
+        for i, changed in enumerate(['code ', [1, 0.6, 0, 0], 1, 11, True, 'b.wav', 2,
+                                     'stream:512']):
+            with self.subTest(field=key._fields[i]):
+                args = list(base)
+                args[i] = changed
+                self.assertNotEqual(renderKey(*args), key)
+
+    def test_debouncer_waitsUntilStable(self):
+        # Typing: a new key every poll never gets through
+        for text in ('d', 'de', 'def'):
+            self.assertEqual(self.feed(text, 0.1), [])
+        self.assertEqual(self.feed('def', 1), ['def'])
+        # Only once, until it changes
+        self.assertEqual(self.feed('def', 1), [])
+
+    def test_debouncer_returnsPreviousKeyAgainAfterChange(self):
+        self.feed('a', 1)
+        self.assertEqual(self.feed('b', 1), ['b'])
+        self.assertEqual(self.feed('a', 1), ['a'])
+        self.debouncer.reset()
+        self.assertEqual(self.feed('a', 1), ['a'])
+
+    def test_resultCache_evictsLeastRecentlyUsed(self):
+        cache = ResultCache(maxEntries=2, maxBytes=10 ** 6)
+        cache.put('a', makeResult(100))
+        cache.put('b', makeResult(100))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', makeResult(100))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+        # 2 arrays of 2 x 62450 float32, the others don't fit next to it
+        cache.put('d', makeResult(62450))
+        self.assertEqual(list(cache.entries), ['d'])
+        self.assertEqual(cache.totalBytes, 999200)
+        self.assertFalse(cache.put('e', makeResult(200000)))
+
+    def test_resultCache_skipsMemoryMappedOutputs(self):
+        cache = ResultCache()
+        result = makeResult(10)
+        result['output'] = result['output'].view(np.memmap)
+        self.assertFalse(cache.put('a', result))
+        self.assertIsNone(cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
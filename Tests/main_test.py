@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 import unittest
 from tkinter import Tk
 from tkinter.scrolledtext import ScrolledText
@@ -8,6 +9,8 @@ from unittest import mock
 import numpy as np
 from Source.main import DspVisualiser
 import Source.main
+from Source.renderPipeline import decodeSegment
+from Source.wavReader import WavWriter
 
 
 class Test_Main(unittest.TestCase):
@@ -44,6 +47,20 @@ class Test_Main(unittest.TestCase):
     def tearDown(self):
         del self.d
 
+    def importTestFile(self, tempDir):
+        """Import a 1 sec stereo file in tempDir, processed by doubling it"""
+        os.mkdir(tempDir + '/Assets')
+        self.d.srcTopLvlPath = tempDir
+        self.d.userCodePath = tempDir + '/Assets/userCode.py'
+        self.d.useRenderCache = False
+        self.d.importPath = tempDir + '/audio.wav'
+        self.d.fileImported = True
+        signal = np.random.default_rng(1).uniform(-0.5, 0.5, (2, 8000))
+        with WavWriter(self.d.importPath, 2, 8000) as writer:
+            writer.write(signal)
+        self.d.runAssetScript = mock.Mock(side_effect=lambda inS, *args: inS * 2)
+        return signal
+
     #  =============== Tests =================
 
     # =============== initGUI method =================
@@ -269,11 +286,11 @@ class Test_Main(unittest.TestCase):
 
     @mock.patch('Source.main.pack_ndarray_to_file')
     @mock.patch('Source.main.unpack_ndarray_from_file')
-    @mock.patch('Source.main.load',
+    @mock.patch('Source.main.decodeSegment',
                 side_effect=None,
                 return_value=([1, 2, 3, 4], 4434))
     def test_processAudio_exceptionsHandled(self,
-                                            mock_load,
+                                            mock_decode,
                                             mock_unpack, mock_pack):
 
         argset = [['invalid.rew', None, 1, 2, True],
@@ -291,11 +308,11 @@ class Test_Main(unittest.TestCase):
     @mock.patch('Source.main.pack_ndarray_to_file')
     @mock.patch('Source.main.unpack_ndarray_from_file',
                 return_value=[1, 2, 3, 4])
-    @mock.patch('Source.main.load',
+    @mock.patch('Source.main.decodeSegment',
                 side_effect=None,
                 return_value=([1, 2, 3, 4], 4434))
     def test_processAudio_rejectedProcessingAudio_invalidInput(self,
-                                                               mock_load,
+                                                               mock_decode,
                                                                mock_unpack,
                                                                mock_pack):
         # FIXME: mock RangeFrame.getValues() to isolate the test
@@ -317,11 +334,11 @@ class Test_Main(unittest.TestCase):
     @mock.patch('Source.main.pack_ndarray_to_file')
     @mock.patch('Source.main.unpack_ndarray_from_file',
                 return_value=[1, 2, 3, 4])
-    @mock.patch('Source.main.load',
+    @mock.patch('Source.main.decodeSegment',
                 side_effect=None,
                 return_value=([1, 2, 3, 4], 4434))
     def test_processAudio_processedAudioOn_validInputs(self,
-                                                       mock_load,
+                                                       mock_decode,
                                                        mock_unpack,
                                                        mock_pack):
 
@@ -350,6 +367,44 @@ class Test_Main(unittest.TestCase):
                 self.d.processAudio(arg[0], arg[1], arg[2], arg[3], arg[4])
                 self.assertEqual(self.d.inputS, [1, 2, 3, 4])
 
+    def test_processAudio_decodesOncePer_range(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            signal = self.importTestFile(tempDir)
+
+            with mock.patch('Source.main.decodeSegment',
+                            wraps=decodeSegment) as mock_decode:
+                for _ in range(2):
+                    self.assertTrue(self.d.processAudio(self.d.importPath, None,
+                                                        0.25, 0.75, False, [0, 0, 0, 0]))
+                # A different range is decoded again
+                self.assertTrue(self.d.processAudio(self.d.importPath, None,
+                                                    0.5, 0.75, False, [0, 0, 0, 0]))
+
+            self.assertEqual(mock_decode.call_count, 2)
+            self.assertEqual(self.d.runAssetScript.call_count, 3)
+            np.testing.assert_allclose(self.d.inputS, signal[:, 4000:6000], rtol=1e-6)
+            np.testing.assert_allclose(self.d.output, self.d.inputS * 2)
+
+    # =============== processInBackground method =================
+
+    def test_processInBackground_onlyReturnsResult(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            signal = self.importTestFile(tempDir)
+            inputS, output = self.d.inputS, self.d.output
+
+            result = self.d.processInBackground(Source.main.Run('Process Part'),
+                                                0, 0.5, True, [0, 0, 0, 0])
+            # Applied by onDone on the Tk thread, not by the background task
+            self.assertIs(self.d.inputS, inputS)
+            self.assertIs(self.d.output, output)
+
+            self.d.useResult(result)
+            np.testing.assert_allclose(self.d.inputS, signal[:, :4000].mean(axis=0),
+                                       atol=1e-7)
+            np.testing.assert_allclose(self.d.output, self.d.inputS * 2)
+            self.assertTrue(self.d.convertToMono)
+            self.assertEqual(self.d.sampleRate, 8000)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from Source.nullTest import (NullTest, compareFiles, compareSignals,
+                             correlationLatency, main, passesNullTest)
+from Source.wavReader import WavReader, WavWriter
+
+
+class Test_NullTest(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(20)
+        self.reference = rng.uniform(-0.5, 0.5, (2, 50000)).astype(np.float32)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def writeWav(self, name, signal):
+        path = os.path.join(self.tempDir.name, name)
+        with WavWriter(path, 2, 8000) as writer:
+            writer.write(signal)
+        return path
+
+    #  =============== Tests =================
+
+    def test_compareSignals_identicalRendersNull(self):
+        result, difference = compareSignals(self.reference, self.reference.copy())
+        self.assertFalse(difference.any())
+        self.assertEqual(result['peakErrorDb'], -np.inf)
+        self.assertEqual(result['snrDb'], np.inf)
+        self.assertEqual(result['latencySamples'], 0)
+        self.assertAlmostEqual(result['correlation'], 1)
+        self.assertTrue(passesNullTest(result))
+
+    def test_compareSignals_metricsOfKnownError(self):
+        test = self.reference.copy()
+        test[1, 30000] += 0.01
+        test += np.float32(1e-3)
+        result, difference = compareSignals(self.reference, test, blockSize=4096)
+        np.testing.assert_allclose(difference, test - self.reference, atol=1e-7)
+        self.assertAlmostEqual(result['maxSampleOffset'], 0.011, places=6)
+        self.assertEqual(result['maxOffsetFrame'], 30000)
+        self.assertAlmostEqual(result['peakErrorDb'], 20 * np.log10(0.011), places=3)
+        expectedRms = np.sqrt(np.mean((test.astype(np.float64) - self.reference) ** 2))
+        self.assertAlmostEqual(result['rmsErrorDb'], 20 * np.log10(expectedRms), places=3)
+        self.assertFalse(passesNullTest(result, thresholdDb=-60))
+
+    def test_correlationLatency_findsDelayAndPolarity(self):
+        for delay in (-37, 0, 120):
+            with self.subTest(delay=delay):
+                test = -np.roll(self.reference[0], delay)
+                latency, correlation = correlationLatency(self.reference[0], test, 500)
+                self.assertEqual(latency, delay)
+                self.assertLess(correlation, -0.99)
+        self.assertEqual(correlationLatency(np.zeros(100), self.reference[0, :100])[0], None)
+
+    def test_nullTest_blocksMatchOnePass(self):
+        test = np.roll(self.reference, 5, axis=-1) * 0.9
+        whole = NullTest()
+        whole.update(self.reference, test)
+        blocks = NullTest()
+        for start in range(0, 50000, 7000):
+            blocks.update(self.reference[:, start:start + 7000], test[:, start:start + 7000])
+        for key, value in whole.result().items():
+            with self.subTest(key=key):
+                self.assertAlmostEqual(blocks.result()[key], value, places=6)
+        self.assertEqual(whole.result()['latencySamples'], 5)
+
+    def test_compareFiles_streamsAndWritesDifference(self):
+        test = self.reference * np.float32(0.5)
+        referencePath = self.writeWav('reference.wav', self.reference)
+        testPath = self.writeWav('test.wav', test)
+        differencePath = os.path.join(self.tempDir.name, 'difference.wav')
+        result = compareFiles(referencePath, testPath, differencePath, blockSize=3000)
+        expected, difference = compareSignals(self.reference, test)
+        self.assertAlmostEqual(result['snrDb'], expected['snrDb'], places=6)
+        self.assertAlmostEqual(result['snrDb'], 20 * np.log10(2), places=4)
+        np.testing.assert_allclose(WavReader(differencePath).view(), difference)
+
+    def test_compareFiles_rejectOn_differentLength(self):
+        referencePath = self.writeWav('reference.wav', self.reference)
+        testPath = self.writeWav('test.wav', self.reference[:, :1000])
+        with self.assertRaises(ValueError):
+            compareFiles(referencePath, testPath)
+
+    def test_main_exitCode(self):
+        referencePath = self.writeWav('reference.wav', self.reference)
+        quieter = self.writeWav('quieter.wav', self.reference * np.float32(0.99))
+        self.assertEqual(main([referencePath, referencePath]), 0)
+        self.assertEqual(main([referencePath, quieter]), 1)
+        self.assertEqual(main([referencePath, quieter, '--threshold', '-20']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from Source.overviewCache import OverviewCache, WaveformOverview
+
+
+class Test_OverviewCache(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.signal = rng.uniform(-0.5, 0.5, (2, 300000)).astype(np.float32)
+        self.signal[1, 123456] = 1
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.audioPath = os.path.join(self.tempDir.name, 'audio.wav')
+        with open(self.audioPath, 'wb') as f:
+            f.write(b'not really audio')
+        self.loadAudio = mock.Mock(return_value=(self.signal, 44100))
+        self.cacheDir = os.path.join(self.tempDir.name, 'cache')
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== WaveformOverview class =================
+
+    def test_fromSignal_levelsMatchBlockStatistics(self):
+        overview = WaveformOverview.fromSignal(self.signal, 44100)
+        self.assertEqual(sorted(overview.levels), [256, 4096, 65536])
+        for blockSize, level in overview.levels.items():
+            with self.subTest(blockSize=blockSize):
+                numBlocks = -(-self.signal.shape[-1] // blockSize)
+                self.assertEqual(level['min'].shape, (2, numBlocks))
+                block = self.signal[:, blockSize:2 * blockSize]
+                np.testing.assert_allclose(level['min'][:, 1], block.min(axis=1))
+                np.testing.assert_allclose(level['max'][:, 1], block.max(axis=1))
+                np.testing.assert_allclose(level['rms'][:, 1],
+                                           np.sqrt(np.mean(block.astype(np.float64) ** 2, axis=1)),
+                                           rtol=1e-5)
+                # Last, partial block
+                tail = self.signal[:, (numBlocks - 1) * blockSize:]
+                np.testing.assert_allclose(level['max'][:, -1], tail.max(axis=1))
+
+    def test_getRange_usesCoarseLevelsAndKeepsPeaks(self):
+        overview = WaveformOverview.fromSignal(self.signal, 44100)
+        self.assertEqual(overview.chooseBlockSize(0, 300000, 50), 4096)
+        indices, values = overview.getRange(0, 300000, 50)
+        self.assertEqual(values.shape[0], 2)
+        self.assertEqual(values[1].max(), 1)
+        self.assertLessEqual(indices[-1], 300000)
+
+        # Zoomed in below the finest level
+        indices, values = overview.getRange(123000, 124000, 1000)
+        self.assertEqual(overview.chooseBlockSize(123000, 124000, 1000), 256)
+        self.assertEqual(values[1].max(), 1)
+
+    # =============== OverviewCache class =================
+
+    def test_get_buildsOnceAndReusesCacheFile(self):
+        cache = OverviewCache(self.cacheDir, self.loadAudio)
+        first = cache.get(self.audioPath)
+        self.assertTrue(os.path.isfile(cache.cacheFilePath(self.audioPath)))
+
+        # A new session reads the cache file instead of decoding again
+        cache = OverviewCache(self.cacheDir, self.loadAudio)
+        second = cache.get(self.audioPath)
+        self.loadAudio.assert_called_once()
+        self.assertEqual(second.numSamples, first.numSamples)
+        np.testing.assert_array_equal(second.levels[4096]['max'],
+                                      first.levels[4096]['max'])
+
+    def test_get_rebuildsOn_modifiedFile(self):
+        cache = OverviewCache(self.cacheDir, self.loadAudio)
+        cache.get(self.audioPath)
+        with open(self.audioPath, 'ab') as f:
+            f.write(b'changed')
+        cache.get(self.audioPath)
+        self.assertEqual(self.loadAudio.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+from Source.automation import Envelope
+from Source.parameterSchema import (parameterDigest, parseSweepText, parseText, readSchema,
+                                    resolveValues, splitParameters)
+
+SCRIPT = '''import numpy as np
+
+PARAMETERS = [
+    {'name': 'gain', 'type': 'float', 'range': (0, 2), 'default': 1},
+    {'name': 'order', 'type': 'int', 'range': (1, 8)},
+    {'name': 'bypass', 'type': 'bool'},
+    {'name': 'taps', 'type': 'array', 'default': [0.5, 0.5]},
+    {'name': 'bands', 'type': 'array', 'shape': (None, 3)},
+    {'name': 'cutoff', 'type': 'float', 'range': (20, 20000), 'default': 1000, 'automation': 'block'},
+]
+
+def userCode(input, numChannels, numSamples, sampleRate, gain, order, bypass, taps, bands):
+    return input * gain
+'''
+
+
+class Test_ParameterSchema(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.schema = readSchema(SCRIPT)
+        self.specs = {spec['name']: spec for spec in self.schema}
+
+    #  =============== Tests =================
+
+    def test_readSchema_fillsDefaults(self):
+        self.assertEqual([spec['name'] for spec in self.schema],
+                         ['gain', 'order', 'bypass', 'taps', 'bands', 'cutoff'])
+        values = resolveValues(self.schema)
+        self.assertEqual(values['gain'], 1.0)
+        # Without a default a scalar starts at the bottom of its range
+        self.assertEqual(values['order'], 1)
+        self.assertIs(values['bypass'], False)
+        np.testing.assert_array_equal(values['taps'], [0.5, 0.5])
+        self.assertEqual(values['bands'].shape, (0, 3))
+
+    def test_readSchema_noneWithout_PARAMETERS(self):
+        self.assertIsNone(readSchema('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n'
+                                     '    return input\n'))
+
+    def test_readSchema_raiseOn_invalidDeclaration(self):
+        for declaration in ("PARAMETERS = [{'name': 'a b'}]",
+                            "PARAMETERS = [{'name': 'a'}, {'name': 'a'}]",
+                            "PARAMETERS = [{'name': 'a', 'type': 'complex'}]",
+                            "PARAMETERS = [{'name': 'a', 'range': (2, 1)}]",
+                            "PARAMETERS = [{'name': 'a', 'default': np.pi}]",
+                            "PARAMETERS = [{'name': 'a', 'type': 'int', 'automation': 'sample'}]",
+                            "PARAMETERS = [{'name': 'a', 'automation': 'audio'}]"):
+            with self.subTest(declaration=declaration):
+                with self.assertRaises(ValueError):
+                    readSchema(declaration)
+
+    def test_parseText_typesAndArrays(self):
+        self.assertEqual(parseText(self.specs['order'], ' 3 '), 3)
+        self.assertIs(parseText(self.specs['bypass'], 'On'), True)
+        np.testing.assert_array_equal(parseText(self.specs['taps'], '0.25, 0.5 0.25'),
+                                      [0.25, 0.5, 0.25])
+        bands = parseText(self.specs['bands'], '100, -3, 0.7; 1000, 2, 1')
+        self.assertEqual(bands.shape, (2, 3))
+        # A single row of a 2-D parameter is still 2-D
+        self.assertEqual(parseText(self.specs['bands'], '100, -3, 0.7').shape, (1, 3))
+        self.assertEqual(parseText(self.specs['gain'], ''), 1.0)
+
+    def test_parseText_raiseOn_invalidValue(self):
+        for name, text in (('gain', '3'), ('order', '2.5'), ('bypass', 'maybe'),
+                           ('bands', '1, 2'), ('taps', 'a, b')):
+            with self.subTest(name=name, text=text):
+                with self.assertRaises(ValueError):
+                    parseText(self.specs[name], text)
+
+    def test_parseSweepText_listsRangesAndArrays(self):
+        self.assertEqual(parseSweepText(self.specs['gain'], '0.5, 1'), [0.5, 1.0])
+        self.assertEqual(parseSweepText(self.specs['order'], '1:3:5'), [1, 2, 3])
+        values = parseSweepText(self.specs['taps'], '1, 2, 3')
+        self.assertEqual(len(values), 1)
+        np.testing.assert_array_equal(values[0], [1, 2, 3])
+
+    def test_automatedParameters_takeEnvelopes(self):
+        spec = self.specs['cutoff']
+        self.assertEqual(resolveValues(self.schema)['cutoff'],
+                         Envelope([(0, 1000)], 'block', 64))
+        envelope = parseText(spec, '0:100 exp, 2:10000')
+        self.assertEqual((envelope.mode, envelope.blockSize), ('block', 64))
+        self.assertEqual(parseSweepText(spec, '0:100, 1:200'), [parseText(spec, '0:100, 1:200')])
+        # Constants and breakpoints are taken as well
+        self.assertEqual(resolveValues(self.schema, {'cutoff': 500})['cutoff'].points,
+                         [(0, 500, 'linear')])
+        with self.assertRaises(ValueError):
+            parseText(spec, '0:10, 1:1000')
+
+    def test_resolveValues_raiseOn_unknownName(self):
+        with self.assertRaises(ValueError):
+            resolveValues(self.schema, {'volume': 1})
+
+    def test_splitParameters_listsPositional_dictsByName(self):
+        self.assertEqual(splitParameters([1, 2, 0, 0]), ((1, 2, 0, 0), {}))
+        self.assertEqual(splitParameters({'gain': 2.0}), ((), {'gain': 2.0}))
+
+    def test_parameterDigest_changesWith_arrayContent(self):
+        values = resolveValues(self.schema)
+        digest = parameterDigest(values)
+        self.assertEqual(parameterDigest(resolveValues(self.schema)), digest)
+        values['taps'] = np.array([0.5, 0.6])
+        self.assertNotEqual(parameterDigest(values), digest)
+        self.assertNotEqual(parameterDigest([1, 0, 0, 0]), parameterDigest([1.0, 0, 0, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+from Source.backgroundRunner import Run
+from Source.exceptions import RunCancelledException, ScriptReturnCodeException
+from Source.parameterSweep import formatSweepTable, parameterGrid, runSweep
+
+
+class Test_ParameterSweep(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.scriptPath = os.path.join(self.tempDir.name, 'userCode.py')
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+            userPy.write('    if p3 < 0:\n')
+            userPy.write('        raise ValueError("negative p3")\n')
+            userPy.write('    return input * p1 + p2\n')
+        self.inS = np.random.default_rng(6).uniform(-0.5, 0.5, (2, 4096)).astype(np.float32)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def assertNoMappedFiles(self):
+        self.assertEqual([f for f in os.listdir(self.tempDir.name) if f.endswith('.mmap')], [])
+
+    #  =============== Tests =================
+
+    def test_parameterGrid_allCombinations(self):
+        grid = parameterGrid([[1, 2], [0], [3, 4, 5], [0]])
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[0], [1, 0, 3, 0])
+        self.assertEqual(grid[-1], [2, 0, 5, 0])
+
+    def test_runSweep_outputsAndMetricsPerCombination(self):
+        table, outputs = runSweep(self.scriptPath, self.inS, 2, 4096, 44100,
+                                  [[0.5, 1, 2], [0, 0.1], [0], [0]],
+                                  self.tempDir.name, maxWorkers=2)
+        self.assertEqual(len(table), 6)
+        self.assertEqual(outputs.shape, (6, 2, 4096))
+        for row, output in zip(table, outputs):
+            p1, p2 = row['parameters'][:2]
+            with self.subTest(parameters=row['parameters']):
+                np.testing.assert_allclose(output, self.inS * p1 + p2, rtol=1e-6)
+                if p2 == 0:
+                    self.assertAlmostEqual(row['meanGainDb'], 20 * np.log10(p1), places=4)
+        self.assertIn('peakDb', formatSweepTable(table).splitlines()[0])
+        self.assertNoMappedFiles()
+
+    def test_runSweep_declaredParametersByName(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, gain, offset):\n')
+            userPy.write('    return input * gain + offset\n')
+        self.assertEqual(parameterGrid({'gain': [1, 2], 'offset': [0]}),
+                         [{'gain': 1, 'offset': 0}, {'gain': 2, 'offset': 0}])
+        table, outputs = runSweep(self.scriptPath, self.inS, 2, 4096, 44100,
+                                  {'gain': [0.5, 2], 'offset': [0, 0.1]},
+                                  self.tempDir.name, maxWorkers=2)
+        self.assertEqual(len(table), 4)
+        for row, output in zip(table, outputs):
+            with self.subTest(parameters=row['parameters']):
+                np.testing.assert_allclose(
+                    output, self.inS * row['parameters']['gain'] + row['parameters']['offset'],
+                    rtol=1e-6)
+        self.assertTrue(formatSweepTable(table).startswith('gain, offset'))
+
+    def test_runSweep_cancelledBy_run(self):
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('import time\n')
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+            userPy.write('    time.sleep(60)\n')
+            userPy.write('    return input\n')
+        events = queue.Queue()
+        run = Run('runSweep', events)
+        timer = threading.Timer(1, run.cancel)
+        timer.start()
+        started = time.perf_counter()
+        with self.assertRaises(RunCancelledException):
+            runSweep(self.scriptPath, self.inS, 2, 4096, 44100,
+                     [[1, 2, 3, 4], [0], [0], [0]], self.tempDir.name, maxWorkers=2, run=run)
+        timer.join()
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertEqual(events.get_nowait()[2], (0, 'Sweep run 1 of 4'))
+        self.assertNoMappedFiles()
+
+    def test_runSweep_raiseOn_failingRun(self):
+        with self.assertRaises(ScriptReturnCodeException) as cm:
+            runSweep(self.scriptPath, self.inS, 2, 4096, 44100,
+                     [[1], [0], [1, -1], [0]], self.tempDir.name, maxWorkers=1)
+        self.assertIn('negative p3', cm.exception.error)
+        self.assertNoMappedFiles()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+from Source.arrayTransport import openArray
+from Source.backgroundRunner import Run
+from Source.exceptions import RunCancelledException
+from Source.processPool import runOnPool
+
+# Per process state of the pool, set by initScaleWorker
+scaleState = {}
+
+
+def initScaleWorker(inputDesc, outputDesc, gain):
+    scaleState['input'] = openArray(inputDesc, 'r')
+    scaleState['output'] = openArray(outputDesc, 'r+')
+    scaleState['gain'] = gain
+
+
+def scaleTask(start, stop, sleep=0):
+    time.sleep(sleep)
+    scaleState['output'][..., start:stop] = scaleState['input'][..., start:stop] * scaleState['gain']
+    scaleState['output'].flush()
+    return start
+
+
+class Test_ProcessPool(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.inS = np.random.default_rng(8).uniform(-0.5, 0.5, (2, 1000))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== runOnPool function =================
+
+    def test_runOnPool_resultsInOrderAndFilesRemoved(self):
+        events = queue.Queue()
+        results, output = runOnPool(self.inS, self.inS.shape, self.tempDir.name, 'test',
+                                    initScaleWorker, (3,), scaleTask,
+                                    [(0, 400), (400, 800), (800, 1000)], 'Part',
+                                    maxWorkers=2, run=Run('runOnPool', events))
+        self.assertEqual(results, [0, 400, 800])
+        np.testing.assert_allclose(output, self.inS * 3)
+        self.assertNotIsInstance(output, np.memmap)
+        self.assertEqual(events.get_nowait()[2], (0, 'Part 1 of 3'))
+        self.assertEqual(os.listdir(self.tempDir.name), [])
+
+    def test_runOnPool_cancelledBy_run(self):
+        run = Run('runOnPool')
+        timer = threading.Timer(1, run.cancel)
+        timer.start()
+        started = time.perf_counter()
+        with self.assertRaises(RunCancelledException):
+            runOnPool(self.inS, self.inS.shape, self.tempDir.name, 'test',
+                      initScaleWorker, (3,), scaleTask, [(0, 500, 60), (500, 1000, 60)],
+                      'Part', maxWorkers=2, run=run)
+        timer.join()
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertEqual(os.listdir(self.tempDir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+import numpy as np
+from Source.realtimeCheck import (asBlockFunction, formatRealTimeTable,
+                                  measureRealTime, realTimeReport, timeBlocks)
+
+
+def gain(block, numChannels, numSamples, sampleRate, state, p1, p2, p3, p4):
+    return block * p1
+
+
+class Test_RealtimeCheck(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.signal = np.random.default_rng(5).standard_normal((2, 5000))
+
+    #  =============== Tests =================
+
+    def test_timeBlocks_timesEveryBlock(self):
+        times, sizes = timeBlocks(gain, self.signal, 512, 48000, [2, 0, 0, 0])
+        self.assertEqual(len(times), 10)
+        self.assertEqual(sizes.sum(), 5000)
+        self.assertEqual(sizes[-1], 5000 % 512)
+        self.assertTrue(np.all(times > 0))
+
+    def test_timeBlocks_neverEditsInput(self):
+        def inPlace(block, *args):
+            block *= 0
+            return block
+        before = self.signal.copy()
+        timeBlocks(inPlace, self.signal, 256, 48000, [0, 0, 0, 0])
+        np.testing.assert_array_equal(self.signal, before)
+
+    def test_realTimeReport_countsOverruns(self):
+        # Budget of a 100 sample block at 1000Hz is 0.1 sec, the last block 0.05
+        times = np.array([0.05, 0.2, 0.05, 0.06])
+        sizes = np.array([100, 100, 100, 50])
+        report = realTimeReport(times, sizes, 100, 1000)
+
+        self.assertEqual(report['overruns'], 2)
+        self.assertEqual(report['overrunRatio'], 0.5)
+        self.assertAlmostEqual(report['budgetMs'], 100)
+        self.assertAlmostEqual(report['realTimeFactor'], 0.36 / 0.35)
+        self.assertAlmostEqual(report['maxMs'], 200)
+
+    def test_measureRealTime_slowCodeOverruns(self):
+        def slow(block, *args):
+            time.sleep(0.002)
+            return block
+        fast, = measureRealTime(gain, self.signal, 48000, [1, 0, 0, 0], [1024])
+        slow, = measureRealTime(slow, self.signal, 48000, [1, 0, 0, 0], [64])
+
+        self.assertLess(fast['realTimeFactor'], 1)
+        self.assertGreater(slow['realTimeFactor'], 1)
+        self.assertEqual(slow['overruns'], slow['numBlocks'])
+        self.assertEqual(len(formatRealTimeTable([fast, slow]).splitlines()), 3)
+
+    def test_asBlockFunction_dropsState(self):
+        userCode = asBlockFunction(lambda x, nC, nS, sR, p1, p2, p3, p4: x * p1)
+        np.testing.assert_array_equal(userCode(np.ones(4), 1, 4, 48000, {}, 3, 0, 0, 0),
+                                      np.full(4, 3.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
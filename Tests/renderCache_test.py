@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from Source.renderCache import RenderCache
+
+
+class Test_RenderCache(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.cacheDir = os.path.join(self.tempDir.name, 'renders')
+        self.cache = RenderCache(self.cacheDir, chunkFrames=1000)
+        self.audioPath = os.path.join(self.tempDir.name, 'a.wav')
+        with open(self.audioPath, 'wb') as f:
+            f.write(b'RIFF' + bytes(range(256)) * 10)
+        rng = np.random.default_rng(23)
+        self.output = rng.uniform(-1, 1, (2, 4500)).astype(np.float32)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def key(self, **changes):
+        args = {'audioPath': self.audioPath, 'start': 0, 'end': 10, 'mono': False,
+                'code': 'def userCode(): pass', 'parameters': [1, 0.5, 0, 0]}
+        args.update(changes)
+        return self.cache.key(**args)
+
+    #  =============== Tests =================
+
+    def test_key_dependsOnEveryInput(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+        for changes in ({'start': 1}, {'end': 11}, {'mono': True}, {'code': 'other'},
+                        {'parameters': [1, 0.6, 0, 0]}, {'mode': 'chunked'}):
+            with self.subTest(changes=changes):
+                self.assertNotEqual(self.key(**changes), key)
+
+    def test_key_followsAudioContent(self):
+        key = self.key()
+        copyPath = os.path.join(self.tempDir.name, 'copy.wav')
+        shutil.copy(self.audioPath, copyPath)
+        self.assertEqual(self.key(audioPath=copyPath), key)
+
+        with open(self.audioPath, 'ab') as f:
+            f.write(b'more')
+        self.assertNotEqual(self.key(), key)
+        # Fingerprints are kept for the next session
+        self.assertEqual(RenderCache(self.cacheDir).key(
+            copyPath, 0, 10, False, 'def userCode(): pass', [1, 0.5, 0, 0]), key)
+
+    def test_putAndGet_roundTripChunks(self):
+        for output in (self.output, self.output[0].astype(np.float64), self.output[:, :999]):
+            with self.subTest(shape=output.shape, dtype=output.dtype):
+                key = self.key(start=output.shape[-1], code=str(output.dtype))
+                self.assertIsNone(self.cache.get(key))
+                self.assertTrue(self.cache.put(key, output))
+                restored = self.cache.get(key)
+                self.assertEqual(restored.dtype, output.dtype)
+                np.testing.assert_array_equal(restored, output)
+
+    def test_get_dropsCorruptEntry(self):
+        key = self.key()
+        self.cache.put(key, self.output)
+        with open(self.cache.entryPath(key), 'wb') as f:
+            f.write(b'not a render')
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.isfile(self.cache.entryPath(key)))
+
+    def test_put_evictsLeastRecentlyUsed(self):
+        keys = [self.key(start=i) for i in range(3)]
+        for key in keys:
+            self.cache.put(key, self.output)
+            time.sleep(0.01)
+        entrySize = os.path.getsize(self.cache.entryPath(keys[0]))
+        # Reading keys[0] makes keys[1] the oldest
+        self.cache.get(keys[0])
+        self.cache.maxBytes = 3 * entrySize - 1
+        self.cache.put(self.key(start=3), self.output)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertLessEqual(self.cache.totalBytes(), self.cache.maxBytes)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.totalBytes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import soundfile as sf
+from Source.automation import Envelope
+from Source.renderPipeline import decodeSegment, runUserCode, userCodeArguments
+
+
+def scaleByGain(input, numChannels, numSamples, sampleRate, gain):
+    return input * gain
+
+
+class Test_RenderPipeline(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.signal = np.random.default_rng(7).uniform(-0.5, 0.5, (8000, 2))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== decodeSegment function =================
+
+    def test_decodeSegment_wavAndLibrosaAgree(self):
+        wavPath = os.path.join(self.tempDir.name, 'audio.wav')
+        flacPath = os.path.join(self.tempDir.name, 'audio.flac')
+        sf.write(wavPath, self.signal, 8000, subtype='PCM_16')
+        sf.write(flacPath, self.signal, 8000, subtype='PCM_16')
+
+        for mono in (False, True):
+            with self.subTest(mono=mono):
+                native, sr = decodeSegment(wavPath, 0.25, 0.5, mono)
+                decoded, flacSr = decodeSegment(flacPath, 0.25, 0.5, mono)
+                self.assertEqual((sr, flacSr), (8000, 8000))
+                self.assertEqual(native.shape, (4000,) if mono else (2, 4000))
+                # Within an LSB of 16 bit, the codecs round differently
+                np.testing.assert_allclose(native, decoded, atol=2 ** -14)
+
+    def test_decodeSegment_resamplesWithLibrosa(self):
+        wavPath = os.path.join(self.tempDir.name, 'audio.wav')
+        sf.write(wavPath, self.signal, 8000, subtype='FLOAT')
+        out, sr = decodeSegment(wavPath, 0, 0.5, True, 4000)
+        self.assertEqual(sr, 4000)
+        self.assertEqual(out.shape, (2000,))
+
+    # =============== runUserCode function =================
+
+    def test_runUserCode_passesDeclaredParameters(self):
+        inS = self.signal.T.copy()
+        out = runUserCode(scaleByGain, inS, 8000, {'gain': 0.5})
+        np.testing.assert_allclose(out, self.signal.T * 0.5)
+
+        # Automation is rendered for the samples userCode gets
+        ramp = Envelope([(0, 0), (1, 1)])
+        out = runUserCode(scaleByGain, np.ones(8000), 8000, {'gain': ramp})
+        np.testing.assert_allclose(out, np.arange(8000) / 8000)
+
+    def test_runUserCode_raiseOn_wrongShape(self):
+        with self.assertRaises(ValueError):
+            runUserCode(lambda input, *args: input[:-1], np.ones(100), 8000, [0, 0, 0, 0])
+
+    def test_userCodeArguments_offsetsAutomation(self):
+        ramp = Envelope([(0, 0), (1, 1)])
+        args, kwargs = userCodeArguments(np.ones(10), 1, 10, 1000, {'gain': ramp}, 500)
+        self.assertEqual(args[1:], (1, 10, 1000))
+        np.testing.assert_allclose(kwargs['gain'], (500 + np.arange(10)) / 1000)
+
+        args, kwargs = userCodeArguments(np.ones(10), 1, 10, 1000, [1, 2, 3, 4])
+        self.assertEqual((args[1:], kwargs), ((1, 10, 1000, 1, 2, 3, 4), {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from Source import spectrogram
+from Source.spectrogram import (SpectrogramCache, SpectrogramImage, poolColumns,
+                                stftPower, toDb)
+
+
+def naiveStft(signal, fftSize, hopSize):
+    window = np.hanning(fftSize + 1)[:-1]
+    starts = range(0, len(signal) - fftSize + 1, hopSize)
+    return np.stack([np.abs(np.fft.rfft(signal[s:s + fftSize] * window)) ** 2
+                     for s in starts], axis=-1)
+
+
+class Test_Spectrogram(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.signal = np.random.default_rng(3).standard_normal((2, 20000)).astype(np.float32)
+
+    def tearDown(self):
+        plt.close('all')
+
+    #  =============== Tests =================
+
+    def test_stftPower_matchesFrameByFrame(self):
+        power, framesPerColumn = stftPower(self.signal, 512, 128)
+        self.assertEqual(framesPerColumn, 1)
+        self.assertEqual(power.shape, (2, 257, 153))
+        np.testing.assert_allclose(power[1], naiveStft(self.signal[1], 512, 128), rtol=1e-3, atol=1e-3)
+
+    def test_stftPower_poolsLongSignalsKeepingPeaks(self):
+        signal = np.zeros(100000, dtype=np.float32)
+        signal[50000] = 1
+        full, _ = stftPower(signal, 256, 64)
+        pooled, framesPerColumn = stftPower(signal, 256, 64, maxColumns=100)
+
+        self.assertEqual(framesPerColumn, -(-full.shape[-1] // 100))
+        self.assertLessEqual(pooled.shape[-1], 100)
+        np.testing.assert_allclose(pooled.max(), full.max(), rtol=1e-6)
+        np.testing.assert_allclose(pooled[:, 3], full[:, 3 * framesPerColumn:4 * framesPerColumn].max(axis=-1))
+
+    def test_stftPower_batchesMatchSingleBatch(self):
+        expected, _ = stftPower(self.signal, 256, 64, maxColumns=50)
+        with mock.patch.object(spectrogram, 'BATCH_SAMPLES', 256 * 2 * 7):
+            batched, _ = stftPower(self.signal, 256, 64, maxColumns=50)
+        np.testing.assert_array_equal(batched, expected)
+
+    def test_stftPower_raiseOn_unknownWindow(self):
+        with self.assertRaises(ValueError):
+            stftPower(self.signal, window='kaiser')
+
+    def test_poolColumns_maxOfEveryGroup(self):
+        image = np.arange(20.0).reshape(2, 10)
+        centers, pooled = poolColumns(image, 2, 8, 3)
+        np.testing.assert_array_equal(pooled, [[3, 5, 7], [13, 15, 17]])
+        np.testing.assert_array_equal(centers, [2.5, 4.5, 6.5])
+
+    def test_poolColumns_rangeOutsideImage(self):
+        image = np.arange(20.0).reshape(2, 10)
+        _, pooled = poolColumns(image, -3, -1, 3)
+        np.testing.assert_array_equal(pooled, [[0], [10]])
+        _, pooled = poolColumns(image, 12, 15, 3)
+        np.testing.assert_array_equal(pooled, [[9], [19]])
+
+    def test_cache_computesOncePerArray(self):
+        cache = SpectrogramCache(maxEntries=2)
+        with mock.patch.object(spectrogram, 'stftPower', wraps=stftPower) as compute:
+            first = cache.get(self.signal, 512, 128)
+            self.assertIs(cache.get(self.signal, 512, 128), first)
+            self.assertEqual(compute.call_count, 1)
+
+            # Other settings or an equal copy are new entries
+            cache.get(self.signal, 1024, 128)
+            cache.get(self.signal.copy(), 512, 128)
+            self.assertEqual(compute.call_count, 3)
+            self.assertEqual(len(cache.entries), 2)
+
+    def test_cache_notFooledBy_reusedId(self):
+        cache = SpectrogramCache()
+        signal = np.ones(4096)
+        cache.get(signal, 512, 128)
+        key = next(iter(cache.entries))
+        # Simulate a new array getting the id of a freed one
+        other = np.zeros(4096)
+        cache.entries[(id(other),) + key[1:]] = cache.entries.pop(key)
+        power, _ = cache.get(other, 512, 128)
+        self.assertEqual(power.max(), 0)
+
+    def test_spectrogramImage_repoolsVisibleRange(self):
+        fig, ax = plt.subplots()
+        image = toDb(stftPower(self.signal[0], 256, 64)[0])
+        trace = SpectrogramImage(ax, image, 64 / 8000, 4000)
+        fig.canvas.draw()
+        ax.set_xlim(0.5, 1.0)
+        self.assertEqual(trace.visible, (62, 126))
+        self.assertAlmostEqual(trace.artist.get_extent()[0], 0.496)
+
+    def test_spectrogramImage_viewLeftOfData(self):
+        fig, ax = plt.subplots()
+        image = toDb(stftPower(self.signal[0], 256, 64)[0])
+        trace = SpectrogramImage(ax, image, 64 / 8000, 4000)
+        ax.set_xlim(-3, -1)
+        fig.canvas.draw()
+        self.assertEqual(trace.visible, (0, image.shape[-1]))
+        ax.set_xlim(-1, 0.5)
+        fig.canvas.draw()
+        self.assertEqual(trace.visible, (0, 64))
+
+
+if __name__ == '__main__':
+    unittest.main()
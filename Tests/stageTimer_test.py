@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from Source.stageTimer import StageTimer
+
+
+class Test_StageTimer(unittest.TestCase):
+
+    #  =============== Tests =================
+
+    def test_stage_recordsWallAndCpuTime(self):
+        timer = StageTimer()
+        with timer.stage('sleep'):
+            time.sleep(0.05)
+        with timer.stage('spin'):
+            sum(range(200000))
+
+        sleep, spin = timer.stages
+        self.assertEqual(sleep['stage'], 'sleep')
+        self.assertEqual(sleep['process'], 'main')
+        self.assertGreaterEqual(sleep['wallSeconds'], 0.04)
+        self.assertLess(sleep['cpuSeconds'], sleep['wallSeconds'])
+        self.assertGreater(spin['cpuSeconds'], 0)
+
+    def test_stage_recordedOn_exception(self):
+        timer = StageTimer()
+        with self.assertRaises(ValueError):
+            with timer.stage('failing'):
+                raise ValueError()
+        self.assertEqual([s['stage'] for s in timer.stages], ['failing'])
+
+    def test_totals_onlyCountOwnProcess(self):
+        timer = StageTimer()
+        with timer.stage('parent'):
+            pass
+        child = {'stage': 'userCode', 'process': 'child', 'wallSeconds': 100.0,
+                 'cpuSeconds': 100.0, 'peakRssBytes': None}
+        timer.addStages([child])
+
+        self.assertLess(timer.totals()['wallSeconds'], 100)
+        self.assertIn('child.userCode', timer.summary())
+
+    def test_writeJsonLine_appendsOneRecordPerRun(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = os.path.join(tempDir, 'stages.jsonl')
+            for run in range(2):
+                timer = StageTimer()
+                with timer.stage('decode'):
+                    pass
+                timer.writeJsonLine(path, run=run)
+
+            with open(path) as log:
+                records = [json.loads(line) for line in log]
+        self.assertEqual([r['run'] for r in records], [0, 1])
+        self.assertEqual(records[0]['stages'][0]['stage'], 'decode')
+        self.assertIn('wallSeconds', records[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
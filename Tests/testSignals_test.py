@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+from Source.testSignals import (TEST_SIGNALS, deconvolve, generateTestSignal,
+                                impulseResponseSpectrum, maxLengthSequence, multitone)
+
+
+class Test_TestSignals(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        # Decaying echo, an IIR-like response longer than one sample
+        self.ir = np.zeros(300)
+        self.ir[[0, 50, 299]] = [0.8, -0.4, 0.1]
+
+    def process(self, signal):
+        return np.apply_along_axis(lambda x: np.convolve(x, self.ir)[:len(x)], -1, signal)
+
+    #  =============== Tests =================
+
+    def test_generateTestSignal_shapesAndTail(self):
+        for kind in TEST_SIGNALS:
+            with self.subTest(kind=kind):
+                stereo = generateTestSignal(kind, 8000, 2)
+                mono = generateTestSignal(kind, 8000, 2, numChannels=1, amplitude=0.25)
+                self.assertEqual(stereo.shape, (2, 16000))
+                self.assertEqual(mono.shape, (16000,))
+                self.assertEqual(mono.dtype, np.float32)
+                self.assertLessEqual(np.max(np.abs(mono)), 0.25 + 1e-6)
+                # Silence at the end for the tail of the response
+                self.assertFalse(np.any(stereo[:, -4000:]))
+        with self.assertRaises(ValueError):
+            generateTestSignal('pinkNoise', 8000, 1)
+
+    def test_maxLengthSequence_hasFlatAutocorrelation(self):
+        sequence = maxLengthSequence(10)
+        self.assertEqual(len(sequence), 1023)
+        spectrum = np.fft.fft(sequence)
+        autocorrelation = np.fft.ifft(spectrum * np.conj(spectrum)).real
+        self.assertAlmostEqual(autocorrelation[0], 1023)
+        np.testing.assert_allclose(autocorrelation[1:], -1, atol=1e-9)
+
+    def test_multitone_onlyHasEnergyOnTones(self):
+        signal = multitone(4800, 48000, numTones=8)
+        spectrum = np.abs(np.fft.rfft(signal))
+        self.assertEqual(np.sum(spectrum > 1e-6), 8)
+
+    def test_deconvolve_recoversImpulseResponse(self):
+        for kind in ['mls', 'impulse']:
+            with self.subTest(kind=kind):
+                excitation = generateTestSignal(kind, 8000, 1)
+                ir = deconvolve(excitation, self.process(excitation), 400)
+                self.assertEqual(ir.shape, (2, 400))
+                np.testing.assert_allclose(ir[:, :300], np.tile(self.ir, (2, 1)), atol=1e-3)
+                np.testing.assert_allclose(ir[:, 300:], 0, atol=1e-3)
+
+    def test_deconvolve_sweepMatchesInBand(self):
+        excitation = generateTestSignal('sweep', 8000, 2, numChannels=1)
+        ir = deconvolve(excitation, self.process(excitation), 1024)
+        freqs, magnitudeDb, _ = impulseResponseSpectrum(ir, 8000)
+        _, expectedDb, _ = impulseResponseSpectrum(np.pad(self.ir, (0, 724)), 8000)
+        inBand = (freqs > 100) & (freqs < 3000)
+        np.testing.assert_allclose(10 ** (magnitudeDb[inBand] / 20),
+                                   10 ** (expectedDb[inBand] / 20), atol=0.05)
+
+    def test_deconvolve_raiseOn_shapeMismatch(self):
+        with self.assertRaises(ValueError):
+            deconvolve(np.ones(10), np.ones(11))
+
+
+if __name__ == '__main__':
+    unittest.main()
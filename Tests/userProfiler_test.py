@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from Source.dspWorker import loadUserFunction
+from Source.userProfiler import profileCall
+
+
+class Test_UserProfiler(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.scriptPath = os.path.join(self.tempDir.name, 'userCode.py')
+        with open(self.scriptPath, 'w') as userPy:
+            userPy.write('import numpy as np\n\n')
+            userPy.write('def smooth(x):\n')
+            userPy.write('    return np.convolve(x, np.ones(64) / 64, mode="same")\n\n')
+            userPy.write('def userCode(input, numChannels, numSamples, sampleRate, p1, p2, p3, p4):\n')
+            userPy.write('    output = input.copy()\n')
+            userPy.write('    for i in range(3):\n')
+            userPy.write('        output = smooth(output)\n')
+            userPy.write('    return output * p1\n')
+        self.userCode = loadUserFunction(self.scriptPath, {})
+        self.args = (np.ones(1000), 1, 1000, 44100, 2, 0, 0, 0)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    def test_profileCall_returnsResultOfCall(self):
+        result, _ = profileCall(self.userCode, self.args)
+        np.testing.assert_allclose(result, self.userCode(*self.args))
+
+    def test_profileCall_reportsHotSpots(self):
+        _, report = profileCall(self.userCode, self.args)
+        self.assertIn('Hot spots', report)
+        self.assertIn('smooth', report)
+        self.assertIn('convolve', report)
+        self.assertNotIn('Line timings', report)
+
+    def test_profileCall_timesLinesOfScript(self):
+        _, report = profileCall(self.userCode, self.args, scriptPath=self.scriptPath)
+        lines = report.split('Line timings of')[1].splitlines()
+        # Loop body runs 3 times, smooth's body once per call
+        loopLine = next(line for line in lines if 'output = smooth(output)' in line)
+        self.assertEqual(loopLine.split()[:2], ['9', '3'])
+        smoothLine = next(line for line in lines if 'np.convolve' in line)
+        self.assertEqual(smoothLine.split()[:2], ['4', '3'])
+        # Lines that never ran have no hits
+        self.assertEqual(lines[2].split(), ['1', 'import', 'numpy', 'as', 'np'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import struct
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+from librosa.core import load
+from Source.exceptions import UnsupportedWavException
+from Source.wavReader import WavReader, WavWriter, readWavSegment
+
+
+def writePcmWav(path, frames, sampleWidth, sampleRate=8000):
+    """frames are integers shaped (numFrames, numChannels)"""
+    if sampleWidth == 1:
+        raw = (frames + 128).astype(np.uint8).tobytes()
+    elif sampleWidth == 3:
+        raw = frames.astype('<i4').view(np.uint8).reshape(frames.shape + (4,))[..., :3].tobytes()
+    else:
+        raw = frames.astype(f'<i{sampleWidth}').tobytes()
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(frames.shape[1])
+        wav.setsampwidth(sampleWidth)
+        wav.setframerate(sampleRate)
+        wav.writeframes(raw)
+
+
+def writeFloatWav(path, frames, sampleRate=8000):
+    data = frames.astype('<f4').tobytes()
+    numChannels = frames.shape[1]
+    fmt = struct.pack('<HHIIHH', 3, numChannels, sampleRate,
+                      sampleRate * 4 * numChannels, 4 * numChannels, 32)
+    with open(path, 'wb') as wav:
+        wav.write(b'RIFF' + struct.pack('<I', 4 + 8 + len(fmt) + 8 + 3 + 1 + 8 + len(data)) + b'WAVE')
+        wav.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+        # Odd sized chunk, followed by its pad byte
+        wav.write(b'junk' + struct.pack('<I', 3) + b'abc\x00')
+        wav.write(b'data' + struct.pack('<I', len(data)) + data)
+
+
+class Test_WavReader(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempDir.name, 'audio.wav')
+        self.rng = np.random.default_rng(3)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    #  =============== Tests =================
+
+    # =============== read method =================
+
+    def test_read_scalesIntegerFormats(self):
+        for sampleWidth in (1, 2, 3, 4):
+            with self.subTest(sampleWidth=sampleWidth):
+                fullScale = 2 ** (8 * sampleWidth - 1)
+                frames = self.rng.integers(-fullScale, fullScale, (1000, 2))
+                frames[0] = [-fullScale, fullScale - 1]
+                writePcmWav(self.path, frames, sampleWidth)
+
+                reader = WavReader(self.path)
+                self.assertEqual((reader.numFrames, reader.numChannels), (1000, 2))
+                out = reader.read(100, 300)
+                self.assertEqual(out.shape, (2, 200))
+                self.assertEqual(out.dtype, np.float32)
+                np.testing.assert_allclose(out, frames[100:300].T / fullScale, rtol=1e-6)
+                self.assertEqual(reader.read(0, 1)[0, 0], -1)
+                del reader, out
+
+    def test_read_floatFileAndMonoDownmix(self):
+        frames = self.rng.uniform(-1, 1, (500, 2)).astype(np.float32)
+        writeFloatWav(self.path, frames)
+        reader = WavReader(self.path)
+        np.testing.assert_array_equal(reader.read(), frames.T)
+        np.testing.assert_allclose(reader.read(mono=True), frames.mean(axis=1), rtol=1e-6)
+
+    def test_read_singleChannelIs1D(self):
+        frames = self.rng.integers(-100, 100, (50, 1))
+        writePcmWav(self.path, frames, 2)
+        self.assertEqual(WavReader(self.path).read().shape, (50,))
+
+    def test_readWavSegment_secondsToFrames(self):
+        frames = self.rng.integers(-1000, 1000, (8000, 2))
+        writePcmWav(self.path, frames, 2, sampleRate=8000)
+        out, sr = readWavSegment(self.path, offset=0.25, duration=0.5)
+        self.assertEqual(sr, 8000)
+        np.testing.assert_allclose(out, frames[2000:6000].T / 2 ** 15)
+
+        # Ranges past the end are clipped like librosa does
+        out, _ = readWavSegment(self.path, offset=0.75, duration=10)
+        self.assertEqual(out.shape, (2, 2000))
+
+    def test_readWavSegment_matchesLibrosaLoad(self):
+        frames = self.rng.integers(-1000, 1000, (8000, 2))
+        writePcmWav(self.path, frames, 2, sampleRate=8000)
+        # 1.52 and 801.52 frames, which librosa truncates rather than rounds
+        for mono in (False, True):
+            with self.subTest(mono=mono):
+                expected, _ = load(self.path, sr=None, offset=0.00019,
+                                   duration=0.10019, mono=mono)
+                out, sr = readWavSegment(self.path, offset=0.00019,
+                                         duration=0.10019, mono=mono)
+                self.assertEqual(sr, 8000)
+                self.assertEqual(out.shape, expected.shape)
+                np.testing.assert_allclose(out, expected, rtol=1e-6, atol=1e-7)
+
+    # =============== WavWriter class =================
+
+    def test_wavWriter_roundTripsThroughView(self):
+        frames = self.rng.uniform(-1, 1, (2, 3000)).astype(np.float32)
+        with WavWriter(self.path, 2, 22050) as writer:
+            writer.write(frames[:, :1000])
+            writer.write(frames[:, 1000:])
+        reader = WavReader(self.path)
+        self.assertEqual((reader.numFrames, reader.sampleRate), (3000, 22050))
+        np.testing.assert_array_equal(reader.view(), frames)
+        self.assertIsInstance(reader.view(), np.memmap)
+
+    def test_init_raiseOn_unsupportedFile(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'ID3 this is an mp3')
+        with self.assertRaises(UnsupportedWavException):
+            WavReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
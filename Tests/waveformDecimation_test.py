@@ -0,0 +1,84 @@
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from Source.waveformDecimation import DecimatedTrace, minMaxDecimate
+
+
+class Test_WaveformDecimation(unittest.TestCase):
+
+    # setUp and tearDown
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.signal = rng.uniform(-0.5, 0.5, (2, 200000))
+        # Single sample peaks must survive decimation
+        self.signal[0, 12345] = 1
+        self.signal[1, 150001] = -1
+
+    def tearDown(self):
+        plt.close('all')
+
+    #  =============== Tests =================
+
+    # =============== minMaxDecimate function =================
+
+    def test_minMaxDecimate_keepsPeaks(self):
+        indices, values = minMaxDecimate(self.signal, numBuckets=1000)
+        self.assertEqual(values.shape, (2, 2000))
+        self.assertEqual(len(indices), 2000)
+        self.assertEqual(values[0].max(), 1)
+        self.assertEqual(values[1].min(), -1)
+
+    def test_minMaxDecimate_respectsRange(self):
+        indices, values = minMaxDecimate(self.signal, 1000, 5000, 100)
+        self.assertGreaterEqual(indices[0], 1000)
+        self.assertLess(indices[-1], 5000)
+        self.assertEqual(values[0].max(), self.signal[0, 1000:5000].max())
+        self.assertEqual(values[1].min(), self.signal[1, 1000:5000].min())
+
+    def test_minMaxDecimate_shortRangeUntouched(self):
+        indices, values = minMaxDecimate(self.signal[0], 10, 60, 100)
+        np.testing.assert_array_equal(indices, np.arange(10, 60))
+        np.testing.assert_array_equal(values, self.signal[0, 10:60])
+
+    def test_minMaxDecimate_emptyOutsideSignal(self):
+        for start, stop in ((0, -5), (-500, -100), (250000, 260000)):
+            with self.subTest(start=start, stop=stop):
+                indices, values = minMaxDecimate(self.signal, start, stop, 100)
+                self.assertEqual(indices.shape, (0,))
+                self.assertEqual(values.shape, (2, 0))
+
+    # =============== DecimatedTrace class =================
+
+    def test_decimatedTrace_redecimatesOnZoom(self):
+        fig, ax = plt.subplots()
+        trace = DecimatedTrace(ax, self.signal, 1 / 44100, numBuckets=500)
+        self.assertEqual(len(trace.lines), 2)
+        self.assertEqual(len(trace.lines[0].get_xdata()), 1000)
+
+        # Zooming into 100 samples shows them as they are
+        ax.set_xlim(12300 / 44100, 12400 / 44100)
+        x = trace.lines[0].get_xdata()
+        self.assertLess(len(x), 1000)
+        self.assertIn(1, trace.lines[0].get_ydata())
+        self.assertLessEqual(x[0], 12300 / 44100)
+        self.assertGreaterEqual(x[-1], 12400 / 44100)
+
+    def test_decimatedTrace_pansPastEitherEnd(self):
+        fig, ax = plt.subplots()
+        trace = DecimatedTrace(ax, self.signal, 1 / 44100, numBuckets=500)
+        for low, high in ((-500, -100), (10, 20)):
+            with self.subTest(xlim=(low, high)):
+                ax.set_xlim(low, high)
+                fig.canvas.draw()
+                self.assertEqual(len(trace.lines[0].get_xdata()), 0)
+        # Back over the data the trace shows up again
+        ax.set_xlim(-1, 1)
+        fig.canvas.draw()
+        self.assertEqual(len(trace.lines[0].get_xdata()), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()